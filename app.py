@@ -1707,9 +1707,9 @@ def execute_sql_query(db_path, query, params=()):
         raise
 
 
-def execute_speakquery(speak_query: str):
+def execute_speakquery(speak_query: str, use_cache: bool = True):
     try:
-        return process_query(speak_query)
+        return process_query(speak_query, use_cache=use_cache)
     except Exception as e:
         logging.error(f"[x] Error executing speak query: {str(e)}")
 
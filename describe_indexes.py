@@ -12,6 +12,8 @@ from typing import Generator
 
 import pyarrow.parquet as pq
 
+from utils.parquet_footer_cache import get_footer
+
 logger = logging.getLogger(__name__)
 
 
@@ -53,11 +55,17 @@ def find_parquet_files(base_dir: str | None = None) -> Generator[str, None, None
 
 
 def read_parquet_preview(filepath: str, max_rows: int = 20) -> str:
-    """Read and format parquet file contents with preview."""
+    """Read and format parquet file contents with preview.
+
+    The row count comes from the cached footer and only the first
+    ``max_rows`` rows are decoded.
+    """
     try:
-        df = pq.read_table(filepath).to_pandas()
-        total_rows = len(df)
-        preview = df.head(max_rows)
+        footer = get_footer(filepath)
+        total_rows = footer.num_rows
+        batches = pq.ParquetFile(filepath, metadata=footer.metadata).iter_batches(batch_size=max_rows)
+        first = next(batches, None)
+        preview = first.to_pandas() if first is not None else footer.schema.empty_table().to_pandas()
 
         output = [f"\n=== PARQUET FILE: {filepath} ==="]
         output.append(str(preview))
@@ -2,10 +2,14 @@
 
 import os
 import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.parquet as pq
-# import r_datetime_parser
 import logging
 
+from utils.epoch_utils import parse_date_strings
+from utils.index_layout import profile_for_path
+from utils.parquet_writer import write_table
+
 # Configure logging for this module
 logger = logging.getLogger(__name__)
 
@@ -70,28 +74,21 @@ class ParquetEpochAdder:
         try:
             # Handle different date field types
             if pa.types.is_timestamp(date_type):
-                # Convert timestamp to epoch in seconds
+                # Convert timestamp to epoch in seconds without leaving Arrow
                 unit = date_type.unit
-                timestamp_array = date_column.cast(pa.int64())
-                if unit == 's':
-                    epoch_timestamps = timestamp_array.to_pylist()
-                elif unit == 'ms':
-                    epoch_timestamps = [int(ts / 1_000) for ts in timestamp_array.to_pylist()]
-                elif unit == 'us':
-                    epoch_timestamps = [int(ts / 1_000_000) for ts in timestamp_array.to_pylist()]
-                elif unit == 'ns':
-                    epoch_timestamps = [int(ts / 1_000_000_000) for ts in timestamp_array.to_pylist()]
-                else:
+                per_second = {'s': 1, 'ms': 1_000, 'us': 1_000_000, 'ns': 1_000_000_000}.get(unit)
+                if per_second is None:
                     logger.error(f"[x] Unsupported timestamp unit: {unit}")
                     raise ValueError(f"Unsupported timestamp unit: {unit}")
+                epoch_column = pc.divide(date_column.cast(pa.int64()), per_second)
 
             elif pa.types.is_integer(date_type) or pa.types.is_floating(date_type):
                 # Assume integers/floats are epoch timestamps
-                epoch_timestamps = date_column.cast(pa.int64()).to_pylist()
+                epoch_column = date_column.cast(pa.int64())
 
             elif pa.types.is_string(date_type) or pa.types.is_large_string(date_type):
-                date_strings = date_column.to_pylist()
-                epoch_timestamps = r_datetime_parser.parse_dates_to_epoch(date_strings)
+                # The compiled parser reads the Arrow string buffers directly
+                epoch_column = pa.array(parse_date_strings(date_column), type=pa.int64())
 
             else:
                 logger.error(
@@ -101,8 +98,8 @@ class ParquetEpochAdder:
                     f"Field '{self.date_field_name}' must be of string, timestamp, integer, or float type."
                 )
 
-            # Add the '_epoch' column
-            epoch_column = pa.array(epoch_timestamps, type=pa.int64())
+            # Add the '_epoch' column as a typed int64 with unparseable values as 0
+            epoch_column = pc.fill_null(epoch_column, 0)
             self.table = self.table.append_column('_epoch', epoch_column)
             logger.info("[i] Added '_epoch' column to the table.")
 
@@ -118,7 +115,7 @@ class ParquetEpochAdder:
         """
         if output_file_path is None:
             output_file_path = self.parquet_file_path  # Overwrite the original file
-        pq.write_table(self.table, output_file_path)
+        write_table(self.table, output_file_path, profile_for_path(output_file_path))
         logger.info(f"[i] Parquet file written to: {output_file_path}")
 
     def process(self, output_file_path=None):
@@ -0,0 +1,11 @@
+file(REMOVE_RECURSE
+  "CMakeFiles/cpp_datetime_parser.dir/src/cpp_datetime_parser.cpp.o"
+  "CMakeFiles/cpp_datetime_parser.dir/src/cpp_datetime_parser.cpp.o.d"
+  "cpp_datetime_parser.cpython-311-x86_64-linux-gnu.so"
+  "cpp_datetime_parser.pdb"
+)
+
+# Per-language clean rules from dependency scanning.
+foreach(lang CXX)
+  include(CMakeFiles/cpp_datetime_parser.dir/cmake_clean_${lang}.cmake OPTIONAL)
+endforeach()
@@ -1,73 +1,490 @@
 #include <pybind11/pybind11.h>
+#include <pybind11/numpy.h>
 #include <pybind11/stl.h>
 #include <ctime>
 #include <string>
+#include <string_view>
 #include <vector>
 #include <iostream>
-#include <optional>
 #include <algorithm>
+#include <array>
+#include <atomic>
+#include <mutex>
+#include <thread>
 
 namespace py = pybind11;
 
-// Attempts to parse a single date string using multiple formats.
-// Returns 0 if parsing fails for all formats.
-static long long parse_single_date(const std::string &date_str) {
-    std::vector<std::string> formats = {
-        "%Y-%m-%d %H:%M:%S", "%m/%d/%Y %H:%M:%S", "%m-%d-%Y %H:%M:%S",
-        "%m/%d/%Y", "%m-%d-%Y", "%m/%d/%y", "%m-%d-%y",
-        "%d-%m-%Y %H:%M:%S", "%d/%m/%Y %H:%M:%S",
-        "%Y/%m/%d %H:%M:%S",
-        "%Y-%m-%d", // Date only
-        "%Y-%m-%dT%H:%M:%S",
-        "%B %d, %Y %H:%M:%S", "%d %B %Y %H:%M:%S",
-        "%m/%d/%Y %I:%M:%S %p", "%m-%d-%Y %I:%M:%S %p",
-        "%Y%m%d%H%M%S",
-        "%Y-W%W-%w %H:%M:%S", "%Y-W%U-%w %H:%M:%S"
-    };
+// strptime formats tried after the ISO-8601 fast path, in priority order.
+static const std::array<const char *, 19> kFormats = {
+    "%Y-%m-%d %H:%M:%S", "%m/%d/%Y %H:%M:%S", "%m-%d-%Y %H:%M:%S",
+    "%m/%d/%Y", "%m-%d-%Y", "%m/%d/%y", "%m-%d-%y",
+    "%d-%m-%Y %H:%M:%S", "%d/%m/%Y %H:%M:%S",
+    "%Y/%m/%d %H:%M:%S",
+    "%Y-%m-%d", // Date only
+    "%Y-%m-%dT%H:%M:%S",
+    "%B %d, %Y %H:%M:%S", "%d %B %Y %H:%M:%S",
+    "%m/%d/%Y %I:%M:%S %p", "%m-%d-%Y %I:%M:%S %p",
+    "%Y%m%d%H%M%S",
+    "%Y-W%W-%w %H:%M:%S", "%Y-W%U-%w %H:%M:%S"
+};
 
-    auto strip_fractional = [](const std::string &in) {
-        size_t pos = in.find('.');
-        if (pos != std::string::npos) {
-            return in.substr(0, pos);
+// Format ids: kIsoFormat for the fast path, 0..kFormats.size()-1 for strptime.
+static constexpr int kNoFormat = -2;
+static constexpr int kIsoFormat = -1;
+
+// Rows per thread below which spawning workers costs more than it saves.
+static constexpr size_t kMinRowsPerThread = 50000;
+
+// Non-null values inspected to detect a column's format.
+static constexpr size_t kDetectValues = 1000;
+
+// Days since 1970-01-01 for a proleptic Gregorian date (Howard Hinnant's algorithm).
+// Linear in the day, so out-of-range days roll over the same way timegm does.
+static long long days_from_civil(long long y, unsigned m, unsigned d) {
+    y -= m <= 2;
+    const long long era = (y >= 0 ? y : y - 399) / 400;
+    const unsigned yoe = static_cast<unsigned>(y - era * 400);
+    const unsigned doy = (153 * (m + (m > 2 ? -3 : 9)) + 2) / 5 + d - 1;
+    const unsigned doe = yoe * 365 + yoe / 4 - yoe / 100 + doy;
+    return era * 146097 + static_cast<long long>(doe) - 719468;
+}
+
+static inline bool read_digits(const char *s, size_t count, int &out) {
+    int value = 0;
+    for (size_t i = 0; i < count; ++i) {
+        const char c = s[i];
+        if (c < '0' || c > '9') {
+            return false;
+        }
+        value = value * 10 + (c - '0');
+    }
+    out = value;
+    return true;
+}
+
+// Parses YYYY-MM-DD with an optional [T ]HH:MM:SS[.fraction][Z|+HH:MM|+HHMM].
+// Offsets are applied so the result is always UTC; fractions are truncated.
+static bool parse_iso8601(std::string_view s, long long &out) {
+    int year, month, day, hour = 0, minute = 0, second = 0;
+    if (s.size() < 10 || s[4] != '-' || s[7] != '-' ||
+        !read_digits(s.data(), 4, year) || !read_digits(s.data() + 5, 2, month) ||
+        !read_digits(s.data() + 8, 2, day)) {
+        return false;
+    }
+    if (month < 1 || month > 12 || day < 1 || day > 31) {
+        return false;
+    }
+
+    size_t pos = 10;
+    long long offset = 0;
+    if (pos < s.size()) {
+        if ((s[pos] != 'T' && s[pos] != ' ') || s.size() < pos + 9 ||
+            s[pos + 3] != ':' || s[pos + 6] != ':' ||
+            !read_digits(s.data() + pos + 1, 2, hour) ||
+            !read_digits(s.data() + pos + 4, 2, minute) ||
+            !read_digits(s.data() + pos + 7, 2, second)) {
+            return false;
+        }
+        if (hour > 23 || minute > 59 || second > 61) {
+            return false;
+        }
+        pos += 9;
+        if (pos < s.size() && (s[pos] == '.' || s[pos] == ',')) {
+            ++pos;
+            const size_t start = pos;
+            while (pos < s.size() && s[pos] >= '0' && s[pos] <= '9') {
+                ++pos;
+            }
+            if (pos == start) {
+                return false;
+            }
+        }
+        if (pos < s.size()) {
+            const char sign = s[pos];
+            if ((sign == 'Z' || sign == 'z') && pos + 1 == s.size()) {
+                pos += 1;
+            } else if (sign == '+' || sign == '-') {
+                // Accepts +HH:MM, +HHMM and +HH.
+                int off_h = 0, off_m = 0;
+                const std::string_view tz = s.substr(pos + 1);
+                const size_t minutes_at = tz.size() == 5 && tz[2] == ':' ? 3 : 2;
+                if ((tz.size() != 2 && tz.size() != 4 && minutes_at != 3) ||
+                    !read_digits(tz.data(), 2, off_h) ||
+                    (tz.size() > 2 && !read_digits(tz.data() + minutes_at, 2, off_m))) {
+                    return false;
+                }
+                offset = (off_h * 3600LL + off_m * 60LL) * (sign == '+' ? 1 : -1);
+                pos = s.size();
+            } else {
+                return false;
+            }
+        }
+    }
+
+    out = days_from_civil(year, static_cast<unsigned>(month), static_cast<unsigned>(day)) * 86400LL +
+          hour * 3600LL + minute * 60LL + second - offset;
+    return true;
+}
+
+// Parses with one of kFormats.  Anything after the first '.' is dropped, as
+// strptime has no directive for fractional seconds.
+static bool parse_strptime(int format, std::string_view s, std::string &scratch, long long &out) {
+    const size_t dot = s.find('.');
+    scratch.assign(s.data(), dot == std::string_view::npos ? s.size() : dot);
+    struct tm tm = {};
+    const char *res = strptime(scratch.c_str(), kFormats[format], &tm);
+    if (!res || *res != '\0') {
+        return false;
+    }
+    out = static_cast<long long>(timegm(&tm)); // timegm converts tm to time_t as UTC
+    return true;
+}
+
+static bool parse_with_format(int format, std::string_view s, std::string &scratch, long long &out) {
+    if (format == kIsoFormat) {
+        return parse_iso8601(s, out);
+    }
+    return parse_strptime(format, s, scratch, out);
+}
+
+// Returns the first format, in priority order, that parses ``s``, or kNoFormat.
+static int find_format(std::string_view s, std::string &scratch, long long &out) {
+    for (int format = kIsoFormat; format < static_cast<int>(kFormats.size()); ++format) {
+        if (parse_with_format(format, s, scratch, out)) {
+            return format;
+        }
+    }
+    return kNoFormat;
+}
+
+// Parses ``s`` with the column's format, falling back to a search of its own
+// that leaves ``format`` alone, so a value's result never depends on which
+// rows were parsed before it.  Returns false when no format matches.
+static bool parse_with_column_format(std::string_view s, int format, std::string &scratch, long long &out) {
+    if (format != kNoFormat && parse_with_format(format, s, scratch, out)) {
+        return true;
+    }
+    return find_format(s, scratch, out) != kNoFormat;
+}
+
+// Shared bookkeeping for a batch so failures are reported once, not per row.
+struct ParseStats {
+    // Detected once per batch, before any worker starts, and shared by every chunk.
+    int format = kNoFormat;
+    std::atomic<size_t> failures{0};
+    std::mutex mutex;
+    std::string first_failure;
+
+    void record_failure(std::string_view value) {
+        if (failures.fetch_add(1) == 0) {
+            std::lock_guard<std::mutex> lock(mutex);
+            first_failure.assign(value.data(), value.size());
+        }
+    }
+
+    void report() const {
+        const size_t count = failures.load();
+        if (count) {
+            std::cerr << "Failed to parse " << count << " value(s) using given formats; first: '"
+                      << first_failure << "'.\n";
+        }
+    }
+};
+
+// Accessor over string_views gathered from Python objects.
+struct ViewSource {
+    const std::vector<std::string_view> &views;
+    const std::vector<bool> &valid;
+    bool get(size_t i, std::string_view &out) const {
+        if (!valid[i]) {
+            return false;
+        }
+        out = views[i];
+        return true;
+    }
+};
+
+// Accessor over an Arrow (large_)string array's validity/offsets/data buffers.
+template <typename Offset>
+struct ArrowSource {
+    const uint8_t *validity;
+    const Offset *offsets;
+    const char *data;
+    int64_t offset;
+    bool get(size_t i, std::string_view &out) const {
+        const int64_t j = offset + static_cast<int64_t>(i);
+        if (validity && !((validity[j >> 3] >> (j & 7)) & 1)) {
+            return false;
+        }
+        out = std::string_view(data + offsets[j], static_cast<size_t>(offsets[j + 1] - offsets[j]));
+        return true;
+    }
+};
+
+// Accessor over a NumPy fixed-width bytes ('S') buffer; trailing NULs are padding.
+struct FixedBytesSource {
+    const char *data;
+    size_t itemsize;
+    bool get(size_t i, std::string_view &out) const {
+        const char *item = data + i * itemsize;
+        size_t len = itemsize;
+        while (len && item[len - 1] == '\0') {
+            --len;
+        }
+        out = std::string_view(item, len);
+        return len != 0;
+    }
+};
+
+// Accessor over a NumPy unicode ('U') buffer.  Dates are ASCII, so each
+// UCS-4 item is narrowed into a per-thread buffer; other text fails to parse.
+struct UnicodeSource {
+    const uint32_t *data;
+    size_t width;
+    mutable std::string buffer;
+    bool get(size_t i, std::string_view &out) const {
+        const uint32_t *item = data + i * width;
+        size_t len = width;
+        while (len && item[len - 1] == 0) {
+            --len;
+        }
+        buffer.resize(len);
+        for (size_t k = 0; k < len; ++k) {
+            buffer[k] = item[k] < 128 ? static_cast<char>(item[k]) : '\x01';
+        }
+        out = buffer;
+        return len != 0;
+    }
+};
+
+// Sets ``stats.format`` from the first of ``source``'s non-null values that
+// parses, unless an earlier chunk of the batch already did.
+template <typename Source>
+static void detect_format(Source source, size_t rows, ParseStats &stats) {
+    std::string scratch;
+    std::string_view value;
+    long long parsed = 0;
+    for (size_t i = 0, seen = 0; i < rows && seen < kDetectValues && stats.format == kNoFormat; ++i) {
+        if (source.get(i, value) && !value.empty()) {
+            stats.format = find_format(value, scratch, parsed);
+            ++seen;
+        }
+    }
+}
+
+template <typename Source>
+static void parse_range(Source source, size_t begin, size_t end, int64_t *out, ParseStats &stats) {
+    const int format = stats.format;
+    std::string scratch;
+    std::string_view value;
+    for (size_t i = begin; i < end; ++i) {
+        long long parsed = 0;
+        if (source.get(i, value) && !value.empty() &&
+            !parse_with_column_format(value, format, scratch, parsed)) {
+            stats.record_failure(value);
+            parsed = 0;
         }
-        return in;
-    };
-    std::string candidate = strip_fractional(date_str);
+        out[i] = parsed;
+    }
+}
+
+static size_t resolve_threads(size_t rows, int num_threads) {
+    size_t threads = num_threads > 0 ? static_cast<size_t>(num_threads)
+                                     : std::max(1u, std::min(std::thread::hardware_concurrency(), 8u));
+    threads = std::min(threads, std::max<size_t>(1, rows / kMinRowsPerThread));
+    return std::max<size_t>(1, threads);
+}
+
+// Parses rows [0, rows) of ``source`` into ``out`` over contiguous chunks.
+// Every chunk uses the batch's format, so results do not depend on the
+// thread count.  Callers must not hold the GIL.
+template <typename Source>
+static void parse_parallel(const Source &source, size_t rows, int64_t *out, int num_threads, ParseStats &stats) {
+    detect_format(source, rows, stats);
+    const size_t threads = resolve_threads(rows, num_threads);
+    if (threads == 1) {
+        parse_range(source, 0, rows, out, stats);
+        return;
+    }
+    std::vector<std::thread> workers;
+    workers.reserve(threads);
+    const size_t chunk = (rows + threads - 1) / threads;
+    for (size_t t = 0; t < threads; ++t) {
+        const size_t begin = t * chunk;
+        const size_t end = std::min(rows, begin + chunk);
+        if (begin >= end) {
+            break;
+        }
+        workers.emplace_back([&source, begin, end, out, &stats]() {
+            parse_range(source, begin, end, out, stats);
+        });
+    }
+    for (auto &worker : workers) {
+        worker.join();
+    }
+}
+
+static const uint8_t *buffer_address(const py::handle &buffer) {
+    if (buffer.is_none()) {
+        return nullptr;
+    }
+    return reinterpret_cast<const uint8_t *>(buffer.attr("address").cast<uintptr_t>());
+}
+
+// Parses one Arrow string/large_string array directly from its buffers.
+static void parse_arrow_array(const py::handle &array, int64_t *out, int num_threads, ParseStats &stats) {
+    const size_t rows = py::len(array);
+    if (rows == 0) {
+        return;
+    }
+    const std::string type_id = py::str(array.attr("type"));
+    py::list buffers = array.attr("buffers")();
+    const uint8_t *validity = buffer_address(buffers[0]);
+    const uint8_t *offsets = buffer_address(buffers[1]);
+    const uint8_t *data_ptr = buffer_address(buffers[2]);
+    const char *data = data_ptr ? reinterpret_cast<const char *>(data_ptr) : "";
+    const int64_t offset = array.attr("offset").cast<int64_t>();
+
+    py::gil_scoped_release release;
+    if (type_id == "large_string" || type_id == "large_utf8" || type_id == "large_binary") {
+        ArrowSource<int64_t> source{validity, reinterpret_cast<const int64_t *>(offsets), data, offset};
+        parse_parallel(source, rows, out, num_threads, stats);
+    } else {
+        ArrowSource<int32_t> source{validity, reinterpret_cast<const int32_t *>(offsets), data, offset};
+        parse_parallel(source, rows, out, num_threads, stats);
+    }
+}
+
+static bool is_arrow_string_type(const std::string &type_id) {
+    return type_id == "string" || type_id == "utf8" || type_id == "large_string" ||
+           type_id == "large_utf8" || type_id == "binary" || type_id == "large_binary";
+}
 
-    auto try_parse = [&](const std::string &fmt, const std::string &inp) -> std::optional<long long> {
-        struct tm tm = {};
-        char *res = strptime(inp.c_str(), fmt.c_str(), &tm);
-        if (!res || *res != '\0') {
-            return std::nullopt;
+// Borrows UTF-8 views of Python str/bytes objects; ``items`` keeps them alive.
+static void collect_object_views(const py::sequence &items, std::vector<std::string_view> &views,
+                                 std::vector<bool> &valid) {
+    const size_t rows = items.size();
+    views.resize(rows);
+    valid.assign(rows, false);
+    for (size_t i = 0; i < rows; ++i) {
+        PyObject *item = PySequence_Fast_GET_ITEM(items.ptr(), static_cast<Py_ssize_t>(i));
+        if (PyUnicode_Check(item)) {
+            Py_ssize_t size = 0;
+            const char *text = PyUnicode_AsUTF8AndSize(item, &size);
+            if (!text) {
+                PyErr_Clear();
+                continue;
+            }
+            views[i] = std::string_view(text, static_cast<size_t>(size));
+            valid[i] = true;
+        } else if (PyBytes_Check(item)) {
+            views[i] = std::string_view(PyBytes_AS_STRING(item), static_cast<size_t>(PyBytes_GET_SIZE(item)));
+            valid[i] = true;
         }
+        // None, NaN and other non-string values are treated as missing.
+    }
+}
 
-        time_t t = timegm(&tm); // timegm converts tm to time_t as UTC
-        return (long long)t;
-    };
+// Vectorised entry point: parses a column of date strings into int64 epoch
+// seconds.  Arrow (chunked) string arrays and NumPy 'S'/'U' arrays are read
+// from their buffers without copying; object arrays and lists borrow each
+// string's UTF-8 data.  Missing and unparseable values become 0.
+static py::array_t<int64_t> parse_dates_to_epoch_array(const py::object &values, int num_threads) {
+    ParseStats stats;
 
-    for (auto &fmt : formats) {
-        auto val = try_parse(fmt, candidate);
-        if (val.has_value()) {
-            return val.value();
+    py::object items_source = values;
+    if (py::hasattr(values, "chunks") && py::hasattr(values, "type")) {
+        const std::string type_id = py::str(values.attr("type"));
+        if (is_arrow_string_type(type_id)) {
+            py::array_t<int64_t> result(static_cast<py::ssize_t>(py::len(values)));
+            int64_t *out = result.mutable_data();
+            for (const auto &chunk : values.attr("chunks")) {
+                parse_arrow_array(chunk, out, num_threads, stats);
+                out += py::len(chunk);
+            }
+            stats.report();
+            return result;
+        }
+    } else if (py::hasattr(values, "buffers") && py::hasattr(values, "type")) {
+        const std::string type_id = py::str(values.attr("type"));
+        if (is_arrow_string_type(type_id)) {
+            py::array_t<int64_t> result(static_cast<py::ssize_t>(py::len(values)));
+            parse_arrow_array(values, result.mutable_data(), num_threads, stats);
+            stats.report();
+            return result;
         }
     }
+    if (py::hasattr(values, "to_pylist") && py::hasattr(values, "type")) {
+        // Dictionary-encoded and other Arrow types go through Python strings.
+        items_source = values.attr("to_pylist")();
+    }
 
-    std::cerr << "Failed to parse: '" << date_str << "' using given formats.\n";
-    return 0;
+    if (py::isinstance<py::array>(values)) {
+        py::array array = py::array::ensure(values);
+        const char kind = array.dtype().kind();
+        if ((kind == 'S' || kind == 'U') && array.ndim() == 1) {
+            array = py::array::ensure(array, py::array::c_style);
+            const size_t rows = static_cast<size_t>(array.size());
+            py::array_t<int64_t> result(static_cast<py::ssize_t>(rows));
+            int64_t *out = result.mutable_data();
+            const size_t itemsize = static_cast<size_t>(array.itemsize());
+            const void *data = array.data();
+            {
+                py::gil_scoped_release release;
+                if (kind == 'S') {
+                    FixedBytesSource source{static_cast<const char *>(data), itemsize};
+                    parse_parallel(source, rows, out, num_threads, stats);
+                } else {
+                    UnicodeSource source{static_cast<const uint32_t *>(data), itemsize / 4, {}};
+                    parse_parallel(source, rows, out, num_threads, stats);
+                }
+            }
+            stats.report();
+            return result;
+        }
+    }
+
+    // Object arrays, lists and anything else iterable of str/bytes.
+    py::sequence items = py::reinterpret_steal<py::sequence>(
+        PySequence_Fast(items_source.ptr(), "values must be a sequence of date strings"));
+    if (!items) {
+        throw py::error_already_set();
+    }
+    std::vector<std::string_view> views;
+    std::vector<bool> valid;
+    collect_object_views(items, views, valid);
+    const size_t rows = views.size();
+    py::array_t<int64_t> result(static_cast<py::ssize_t>(rows));
+    int64_t *out = result.mutable_data();
+    {
+        py::gil_scoped_release release;
+        ViewSource source{views, valid};
+        parse_parallel(source, rows, out, num_threads, stats);
+    }
+    stats.report();
+    return result;
 }
 
 // Takes a list of date strings and returns a list of corresponding epoch timestamps.
-static std::vector<long long> parse_dates_to_epoch(const std::vector<std::string> &dates) {
-    std::vector<long long> result;
-    result.reserve(dates.size());
-    for (auto &d: dates) {
-        result.push_back(parse_single_date(d));
+static std::vector<int64_t> parse_dates_to_epoch(const std::vector<std::string> &dates) {
+    std::vector<int64_t> result(dates.size());
+    std::vector<std::string_view> views(dates.begin(), dates.end());
+    std::vector<bool> valid(dates.size(), true);
+    ParseStats stats;
+    {
+        py::gil_scoped_release release;
+        ViewSource source{views, valid};
+        parse_parallel(source, views.size(), result.data(), 0, stats);
     }
+    stats.report();
     return result;
 }
 
 PYBIND11_MODULE(cpp_datetime_parser, m) {
     m.doc() = "C++ translation of datetime_parser functionality";
     m.def("parse_dates_to_epoch", &parse_dates_to_epoch, "Parse a list of date strings into epoch timestamps");
+    m.def("parse_dates_to_epoch_array", &parse_dates_to_epoch_array,
+          "Parse a column of date strings (Arrow array, NumPy array or sequence) into an int64 "
+          "NumPy array of epoch timestamps, using multiple threads with the GIL released",
+          py::arg("values"), py::arg("num_threads") = 0);
 }
-
@@ -0,0 +1,11 @@
+file(REMOVE_RECURSE
+  "CMakeFiles/cpp_index_call.dir/src/cpp_index_call.cpp.o"
+  "CMakeFiles/cpp_index_call.dir/src/cpp_index_call.cpp.o.d"
+  "cpp_index_call.cpython-311-x86_64-linux-gnu.so"
+  "cpp_index_call.pdb"
+)
+
+# Per-language clean rules from dependency scanning.
+foreach(lang CXX)
+  include(CMakeFiles/cpp_index_call.dir/cmake_clean_${lang}.cmake OPTIONAL)
+endforeach()
@@ -7,25 +7,37 @@
 #include <string>
 #include <vector>
 #include <deque>
+#include <queue>
 #include <regex>
 #include <stdexcept>
 #include <iostream>
 #include <optional>
 #include <ctime>
 #include <algorithm>
+#include <numeric>
 #include <sys/stat.h>
 #include <glob.h>
 #include <filesystem>
 #include <unordered_set>
+#include <unordered_map>
+#include <atomic>
+#include <functional>
+#include <mutex>
+#include <thread>
 
 namespace py = pybind11;
 using namespace std::filesystem;
 
 namespace {
-// Logging functions for consistent console output with flush
-inline void log_info(const std::string &msg) { std::cerr << "[i] " << msg << "\n" << std::flush; }
-inline void log_warning(const std::string &msg) { std::cerr << "[!] " << msg << "\n" << std::flush; }
-inline void log_error(const std::string &msg) { std::cerr << "[x] " << msg << "\n" << std::flush; }
+// Logging functions for consistent console output with flush (safe to call from scan threads)
+std::mutex log_mutex;
+inline void log_line(const char *prefix, const std::string &msg) {
+    std::lock_guard<std::mutex> lock(log_mutex);
+    std::cerr << prefix << msg << "\n" << std::flush;
+}
+inline void log_info(const std::string &msg) { log_line("[i] ", msg); }
+inline void log_warning(const std::string &msg) { log_line("[!] ", msg); }
+inline void log_error(const std::string &msg) { log_line("[x] ", msg); }
 
 // Parse dates: attempts to convert a date string into epoch time
 static long long parse_date_to_epoch_single(const std::string &date_str) {
@@ -190,7 +202,9 @@ private:
         }
 
         ASTNode left = parse_operand();
-        if (!tokens.empty() && tokens.front().type == TokenType::Operator) {
+        // AND/OR after a bare operand (e.g. a free-text term) belong to the enclosing expression
+        if (!tokens.empty() && tokens.front().type == TokenType::Operator &&
+            tokens.front().value != "AND" && tokens.front().value != "OR") {
             std::string op = tokens.front().value;
             tokens.pop_front();
             if (op == "IN") {
@@ -269,9 +283,7 @@ private:
         } else if (tk.type == TokenType::StringLiteral) {
             ASTNode node;
             node.type = ASTNodeType::Literal;
-            std::string s = tk.value;
-            for (auto &ch : s) { if (ch == '\'') ch = '\\'; }
-            node.literal_or_ident = "'" + s + "'";
+            node.literal_or_ident = "'" + tk.value + "'";
             return node;
         } else if (tk.type == TokenType::NumberLiteral) {
             ASTNode node;
@@ -293,43 +305,34 @@ private:
     }
 };
 
-// Convert the AST into a string-based query
-static std::string ast_to_query(const ASTNode &ast) {
+// Convert a literal as stored in the AST ('quoted' string, digits or True/False) to a Python value
+static py::object literal_to_py(const std::string &literal) {
+    if (literal == "True") return py::bool_(true);
+    if (literal == "False") return py::bool_(false);
+    if (literal.size() >= 2 && literal.front() == '\'' && literal.back() == '\'')
+        return py::str(literal.substr(1, literal.size() - 2));
+    if (!literal.empty() && std::all_of(literal.begin(), literal.end(), [](char c) { return isdigit((unsigned char)c); }))
+        return py::module_::import("builtins").attr("int")(literal);
+    return py::str(literal);
+}
+
+// Convert the AST into the expression tree evaluated by utils.filter_mask
+static py::object filter_expression(const ASTNode &ast) {
     switch (ast.type) {
-        case ASTNodeType::Comparison: {
-            std::string op;
-            if (ast.operator_ == "=") op = "==";
-            else if (ast.operator_ == "!=") op = "!=";
-            else if (ast.operator_ == "<") op = "<";
-            else if (ast.operator_ == ">") op = ">";
-            else if (ast.operator_ == "<=") op = "<=";
-            else if (ast.operator_ == ">=") op = ">=";
-            else throw std::runtime_error("Unknown operator: " + ast.operator_);
-
-            std::string left_str = ast_to_query(*ast.left);
-            std::string right_str = ast_to_query(*ast.right);
-            return "(" + left_str + " " + op + " " + right_str + ")";
-        }
-        case ASTNodeType::LogicalOp: {
-            std::string op = (ast.operator_ == "|") ? "|" : "&";
-            std::string left_str = ast_to_query(*ast.left);
-            std::string right_str = ast_to_query(*ast.right);
-            return "(" + left_str + " " + op + " " + right_str + ")";
-        }
+        case ASTNodeType::Comparison:
+            return py::make_tuple("cmp", ast.operator_, filter_expression(*ast.left), filter_expression(*ast.right));
+        case ASTNodeType::LogicalOp:
+            return py::make_tuple(ast.operator_ == "|" ? "or" : "and", filter_expression(*ast.left),
+                                  filter_expression(*ast.right));
         case ASTNodeType::InClause: {
-            std::string values_str;
-            for (size_t i = 0; i < ast.values.size(); i++) {
-                if (i > 0) values_str += ", ";
-                values_str += ast.values[i];
-            }
-            return "(" + ast.identifier + " in [" + values_str + "])";
+            py::list values;
+            for (auto &v : ast.values) values.append(literal_to_py(v));
+            return py::make_tuple("in", ast.identifier, values);
         }
         case ASTNodeType::Identifier:
-            return ast.literal_or_ident;
+            return py::make_tuple("field", ast.literal_or_ident);
         case ASTNodeType::Literal:
-            if (ast.literal_or_ident == "True") return "True";
-            if (ast.literal_or_ident == "False") return "False";
-            return ast.literal_or_ident;
+            return py::make_tuple("value", literal_to_py(ast.literal_or_ident));
     }
     throw std::runtime_error("Unknown AST node type");
 }
@@ -359,6 +362,79 @@ static void collect_identifiers(const ASTNode &ast, std::vector<std::string> &co
     }
 }
 
+// Column value of a literal operand for Bloom filter lookups; nullopt for booleans
+static std::optional<std::string> literal_value(const std::string &literal) {
+    if (literal.size() >= 2 && literal.front() == '\'' && literal.back() == '\'') {
+        return literal.substr(1, literal.size() - 2);
+    }
+    if (!literal.empty() && std::all_of(literal.begin(), literal.end(), [](char c) { return isdigit((unsigned char)c); }))
+        return literal;
+    return std::nullopt;
+}
+
+// Translate the AST into the predicate tree understood by utils.bloom_filters and
+// utils.token_index: ("and"|"or", left, right), ("eq", column, [values]) for equality
+// conditions and ("term", text) for free-text terms, with None wherever neither can decide
+static py::object pruning_predicate(const ASTNode &ast) {
+    switch (ast.type) {
+        case ASTNodeType::LogicalOp: {
+            py::object left = pruning_predicate(*ast.left);
+            py::object right = pruning_predicate(*ast.right);
+            if (ast.operator_ == "&") {
+                if (left.is_none()) return right;
+                if (right.is_none()) return left;
+                return py::make_tuple("and", left, right);
+            }
+            if (left.is_none() || right.is_none()) return py::none();
+            return py::make_tuple("or", left, right);
+        }
+        case ASTNodeType::Comparison: {
+            if (ast.operator_ != "=") return py::none();
+            const ASTNode *ident = ast.left.get(), *literal = ast.right.get();
+            if (ident->type == ASTNodeType::Literal) std::swap(ident, literal);
+            if (ident->type != ASTNodeType::Identifier || literal->type != ASTNodeType::Literal) return py::none();
+            auto value = literal_value(literal->literal_or_ident);
+            if (!value.has_value()) return py::none();
+            py::list values;
+            values.append(value.value());
+            return py::make_tuple("eq", ident->literal_or_ident, values);
+        }
+        case ASTNodeType::InClause: {
+            py::list values;
+            for (auto &v : ast.values) {
+                auto value = literal_value(v);
+                if (!value.has_value()) return py::none();
+                values.append(value.value());
+            }
+            if (values.empty()) return py::none();
+            return py::make_tuple("eq", ast.identifier, values);
+        }
+        case ASTNodeType::Literal: {
+            // Only reached for operands of AND/OR or a lone literal: a free-text term
+            const std::string &lit = ast.literal_or_ident;
+            if (lit.size() < 2 || lit.front() != '\'' || lit.back() != '\'') return py::none();
+            return py::make_tuple("term", lit.substr(1, lit.size() - 2));
+        }
+        default:
+            return py::none();
+    }
+}
+
+// Replace free-text terms (quoted strings standing alone as conditions) with references to
+// boolean "_term_<n>" columns that the scan computes, collecting the term texts
+static void extract_terms(ASTNode &ast, std::vector<std::string> &terms) {
+    if (ast.type == ASTNodeType::LogicalOp) {
+        extract_terms(*ast.left, terms);
+        extract_terms(*ast.right, terms);
+        return;
+    }
+    const std::string &lit = ast.literal_or_ident;
+    if (ast.type != ASTNodeType::Literal || lit.size() < 2 || lit.front() != '\'' || lit.back() != '\'') return;
+    terms.push_back(lit.substr(1, lit.size() - 2));
+    ast.type = ASTNodeType::Identifier;
+    ast.literal_or_ident = "_term_" + std::to_string(terms.size() - 1);
+}
+
 // Parse the AST from the given token vector
 static std::optional<ASTNode> parse_ast(const std::vector<std::string> &tokens) {
     if (tokens.empty()) return std::nullopt;
@@ -388,19 +464,308 @@ static std::filesystem::path get_project_root() {
 #endif
 }
 
-// Load and filter data from parquet files based on provided criteria
-static py::object load_and_filter_data(
-    const std::string &index_pattern,
-    bool need_epoch,
-    const std::optional<std::string> &pandas_query,
+// Where the event time of a parquet file comes from
+enum class EpochSource { None, StoredEpoch, TypedTimestamp, StringTimestamp };
+
+// Prefer a stored integer _epoch, then a typed timestamp column, then legacy strings
+static EpochSource detect_epoch_source(const py::object &schema, const std::unordered_set<std::string> &col_set) {
+    py::object pa_types = py::module_::import("pyarrow.types");
+    if (col_set.count("_epoch")) {
+        py::object type = schema.attr("field")("_epoch").attr("type");
+        if (pa_types.attr("is_integer")(type).cast<bool>()) return EpochSource::StoredEpoch;
+    }
+    if (col_set.count("timestamp")) {
+        py::object type = schema.attr("field")("timestamp").attr("type");
+        if (pa_types.attr("is_timestamp")(type).cast<bool>()) return EpochSource::TypedTimestamp;
+        return EpochSource::StringTimestamp;
+    }
+    return EpochSource::None;
+}
+
+// Convert a parquet statistics value (integer epoch or datetime) into epoch seconds
+static std::optional<long long> statistic_to_epoch(const py::object &value) {
+    if (value.is_none()) return std::nullopt;
+    if (py::isinstance<py::int_>(value)) return value.cast<long long>();
+    if (py::isinstance<py::float_>(value)) return (long long)value.cast<double>();
+    if (py::hasattr(value, "utctimetuple")) {
+        py::object calendar = py::module_::import("calendar");
+        return calendar.attr("timegm")(value.attr("utctimetuple")()).cast<long long>();
+    }
+    return std::nullopt;
+}
+
+// Return the [min, max] statistics of time_column in one row group, if they are usable
+static std::optional<std::pair<long long, long long>> row_group_epoch_range(
+    const py::object &metadata, int rg, const std::string &time_column
+) {
+    py::object row_group = metadata.attr("row_group")(rg);
+    int num_columns = row_group.attr("num_columns").cast<int>();
+    for (int ci = 0; ci < num_columns; ci++) {
+        py::object column = row_group.attr("column")(ci);
+        if (column.attr("path_in_schema").cast<std::string>() != time_column) continue;
+        py::object stats = column.attr("statistics");
+        if (stats.is_none() || !stats.attr("has_min_max").cast<bool>()) return std::nullopt;
+        auto min_epoch = statistic_to_epoch(stats.attr("min"));
+        auto max_epoch = statistic_to_epoch(stats.attr("max"));
+        if (!min_epoch.has_value() || !max_epoch.has_value()) return std::nullopt;
+        return std::make_pair(min_epoch.value(), max_epoch.value());
+    }
+    return std::nullopt;
+}
+
+// Return the row groups whose [min, max] statistics overlap the requested window.
+// Row groups without usable statistics are always kept.
+static std::vector<int> select_row_groups(
+    const py::object &metadata,
+    const std::string &time_column,
+    const std::optional<long long> &earliest_epoch,
+    const std::optional<long long> &latest_epoch
+) {
+    std::vector<int> selected;
+    int num_row_groups = metadata.attr("num_row_groups").cast<int>();
+    for (int rg = 0; rg < num_row_groups; rg++) {
+        auto range = row_group_epoch_range(metadata, rg, time_column);
+        bool keep = true;
+        if (range.has_value()) {
+            if (earliest_epoch.has_value() && range->second < earliest_epoch.value()) keep = false;
+            if (latest_epoch.has_value() && range->first > latest_epoch.value()) keep = false;
+        }
+        if (keep) selected.push_back(rg);
+    }
+    return selected;
+}
+
+// Convert a typed Arrow timestamp column into int64 epoch seconds without string parsing
+static py::object typed_timestamp_to_epoch(const py::object &column) {
+    py::object pa = py::module_::import("pyarrow");
+    py::object pc = py::module_::import("pyarrow.compute");
+    std::string unit = column.attr("type").attr("unit").cast<std::string>();
+    long long per_second = 1;
+    if (unit == "ms") per_second = 1000LL;
+    else if (unit == "us") per_second = 1000000LL;
+    else if (unit == "ns") per_second = 1000000000LL;
+    py::object raw = column.attr("cast")(pa.attr("int64")());
+    if (per_second == 1) return raw;
+    return pc.attr("divide")(raw, per_second);
+}
+
+// Parse the value of a Hive-style "key=value" directory name; nullopt if it has another key
+static std::optional<std::string> partition_value(const std::string &dir_name, const std::string &key) {
+    std::string prefix = key + "=";
+    if (dir_name.compare(0, prefix.size(), prefix) != 0) return std::nullopt;
+    return dir_name.substr(prefix.size());
+}
+
+// True if [start, start + span) may contain events inside the requested window
+static bool window_overlaps(long long start, long long span,
+                            const std::optional<long long> &earliest_epoch,
+                            const std::optional<long long> &latest_epoch) {
+    if (earliest_epoch.has_value() && start + span - 1 < earliest_epoch.value()) return false;
+    if (latest_epoch.has_value() && start > latest_epoch.value()) return false;
+    return true;
+}
+
+// Sorted regular .parquet files directly inside dir
+static std::vector<std::string> list_parquet_files(const path &dir) {
+    std::vector<std::string> found;
+    std::error_code ec;
+    for (auto &entry : directory_iterator(dir, ec)) {
+        if (entry.is_regular_file(ec) && entry.path().extension() == ".parquet") found.push_back(entry.path().string());
+    }
+    std::sort(found.begin(), found.end());
+    return found;
+}
+
+// Collect the files of a time-partitioned index laid out as
+// <root>/date=YYYY-MM-DD[/hour=HH]/*.parquet. Partitions outside the requested
+// window are skipped by name, so their directories are never listed. Every date
+// directory seen is added to date_dirs so glob matches inside them can be dropped.
+static std::vector<std::string> expand_time_partitions(
+    const path &root,
     const std::optional<long long> &earliest_epoch,
     const std::optional<long long> &latest_epoch,
-    const path &indexes_dir,
-    const std::vector<std::string> &filter_columns // all non-earliest/latest identifiers
+    std::unordered_set<std::string> &date_dirs
 ) {
-    py::object pandas = py::module_::import("pandas");
-    py::object empty_df = pandas.attr("DataFrame")();
+    std::vector<path> dates;
+    std::error_code ec;
+    for (auto &entry : directory_iterator(root, ec)) {
+        if (entry.is_directory(ec) && partition_value(entry.path().filename().string(), "date").has_value()) {
+            dates.push_back(entry.path());
+        }
+    }
+    std::sort(dates.begin(), dates.end());
+
+    std::vector<std::string> files;
+    size_t kept_dates = 0;
+    for (auto &date_dir : dates) {
+        date_dirs.insert(date_dir.string());
+        std::string day = partition_value(date_dir.filename().string(), "date").value();
+        struct tm tm = {};
+        char *end = strptime(day.c_str(), "%Y-%m-%d", &tm);
+        bool parsed = end && *end == '\0';
+        long long day_start = parsed ? (long long)timegm(&tm) : 0;
+        if (parsed && !window_overlaps(day_start, 86400, earliest_epoch, latest_epoch)) continue;
+        kept_dates++;
+
+        auto direct = list_parquet_files(date_dir);
+        files.insert(files.end(), direct.begin(), direct.end());
+
+        std::vector<path> hours;
+        for (auto &entry : directory_iterator(date_dir, ec)) {
+            if (entry.is_directory(ec) && partition_value(entry.path().filename().string(), "hour").has_value()) {
+                hours.push_back(entry.path());
+            }
+        }
+        std::sort(hours.begin(), hours.end());
+        for (auto &hour_dir : hours) {
+            std::string hour = partition_value(hour_dir.filename().string(), "hour").value();
+            if (parsed && !hour.empty() && std::all_of(hour.begin(), hour.end(), ::isdigit) && hour.size() <= 2) {
+                long long hour_start = day_start + std::stoll(hour) * 3600;
+                if (!window_overlaps(hour_start, 3600, earliest_epoch, latest_epoch)) continue;
+            }
+            auto in_hour = list_parquet_files(hour_dir);
+            files.insert(files.end(), in_hour.begin(), in_hour.end());
+        }
+    }
+    if (!dates.empty()) {
+        log_info("Partition pruning kept " + std::to_string(kept_dates) + " of " + std::to_string(dates.size()) +
+                 " date partition(s) under " + root.string());
+    }
+    return files;
+}
 
+// Set or replace a column on an Arrow table (append_column would duplicate an existing name)
+static py::object with_column(const py::object &table, const std::string &name, const py::object &values) {
+    py::list names = table.attr("column_names");
+    if (names.contains(py::str(name))) {
+        int idx = table.attr("schema").attr("get_field_index")(name).cast<int>();
+        return table.attr("set_column")(idx, name, values);
+    }
+    return table.attr("append_column")(name, values);
+}
+
+// A dictionary-encoded column repeating value for every row (one dictionary entry, int32 codes)
+static py::object constant_dictionary_column(const std::string &value, size_t length) {
+    py::object pa = py::module_::import("pyarrow");
+    py::array_t<int32_t> codes(static_cast<py::ssize_t>(length));
+    std::fill(codes.mutable_data(), codes.mutable_data() + length, 0);
+    py::list dictionary;
+    dictionary.append(py::str(value));
+    return pa.attr("DictionaryArray").attr("from_arrays")(codes, pa.attr("array")(dictionary, pa.attr("string")()));
+}
+
+// Parse legacy string timestamps with the GIL released; missing values become 0
+static py::object string_timestamp_to_epoch(const py::object &column) {
+    py::object pa = py::module_::import("pyarrow");
+    py::object pc = py::module_::import("pyarrow.compute");
+    py::object strings = pc.attr("fill_null")(column.attr("cast")(pa.attr("string")()), "");
+    auto datetime_strings = strings.attr("to_pylist")().cast<std::vector<std::string>>();
+    std::vector<long long> epochs(datetime_strings.size(), 0);
+    {
+        // Pure C++ parsing: let other scan threads use the interpreter meanwhile
+        py::gil_scoped_release release;
+        for (size_t ii = 0; ii < datetime_strings.size(); ii++) {
+            if (!datetime_strings[ii].empty()) epochs[ii] = parse_date_to_epoch_single(datetime_strings[ii]);
+        }
+    }
+    return pa.attr("array")(py::array_t<long long>(epochs.size(), epochs.data()), pa.attr("int64")());
+}
+
+// Decide from a manifest entry alone whether a file can be skipped; returns the reason if so
+static std::optional<std::string> manifest_skip_reason(
+    const py::handle &entry,
+    const std::vector<std::string> &filter_columns,
+    bool need_epoch,
+    const std::optional<long long> &earliest_epoch,
+    const std::optional<long long> &latest_epoch
+) {
+    py::dict columns = entry["columns"];
+    for (auto &c : filter_columns) {
+        if (!columns.contains(c)) return "missing required column " + c;
+    }
+    if (need_epoch && !columns.contains("_epoch") && !columns.contains("timestamp")) {
+        return std::string("no '_epoch'/'timestamp' column for earliest/latest");
+    }
+    py::object min_epoch = entry["min_epoch"];
+    py::object max_epoch = entry["max_epoch"];
+    if (!min_epoch.is_none() && !max_epoch.is_none()) {
+        if (earliest_epoch.has_value() && max_epoch.cast<long long>() < earliest_epoch.value())
+            return std::string("time range ends before earliest");
+        if (latest_epoch.has_value() && min_epoch.cast<long long>() > latest_epoch.value())
+            return std::string("time range starts after latest");
+    }
+    return std::nullopt;
+}
+
+// A candidate file that survived pruning, with everything needed to read it
+struct ScanTask {
+    std::string path;
+    py::object metadata; // parsed footer, reused when the file is opened for reading
+    std::vector<int> row_groups;
+    bool pruned = false;
+    py::object read_columns;
+    EpochSource epoch_source = EpochSource::None;
+    std::optional<long long> max_epoch; // newest _epoch according to the manifest, if known
+    py::object read_dictionary = py::none(); // string columns read as dictionaries (pandas categoricals)
+    py::object category_columns = py::none(); // the index's category_columns, kept whatever their cardinality
+};
+
+// Run scan over every task on a bounded pool of threads and return the results in
+// task order (null where a file failed). Must be called with the GIL held; workers
+// re-acquire it around Python calls, and pyarrow releases it again while reading
+// and decoding.
+static std::vector<py::object> run_scan_tasks(
+    const std::vector<ScanTask> &tasks,
+    size_t max_workers,
+    const std::function<py::object(const ScanTask &)> &scan
+) {
+    std::vector<py::object> results(tasks.size());
+    auto scan_one = [&](size_t i) {
+        try {
+            results[i] = scan(tasks[i]);
+        } catch (py::error_already_set &e) {
+            log_error("Failed to scan " + tasks[i].path + ": " + std::string(e.what()));
+        } catch (const std::exception &e) {
+            log_error("Failed to scan " + tasks[i].path + ": " + std::string(e.what()));
+        }
+    };
+
+    size_t workers = std::min(max_workers, tasks.size());
+    if (workers <= 1) {
+        for (size_t i = 0; i < tasks.size(); i++) scan_one(i);
+    } else {
+        log_info("Scanning " + std::to_string(tasks.size()) + " file(s) on " + std::to_string(workers) + " thread(s).");
+        std::atomic<size_t> next{0};
+        py::gil_scoped_release release;
+        std::vector<std::thread> pool;
+        for (size_t w = 0; w < workers; w++) {
+            pool.emplace_back([&]() {
+                for (size_t i = next.fetch_add(1); i < tasks.size(); i = next.fetch_add(1)) {
+                    py::gil_scoped_acquire acquire;
+                    scan_one(i);
+                }
+            });
+        }
+        for (auto &t : pool) t.join();
+    }
+    return results;
+}
+
+// Default number of scan threads when the caller does not specify one
+static size_t default_scan_workers() {
+    size_t hw = std::thread::hardware_concurrency();
+    if (hw == 0) hw = 1;
+    return std::min<size_t>(hw, 8);
+}
+
+// Expand one index pattern into the parquet files it names. Time-partitioned indexes stored
+// as date=/hour= subdirectories only contribute the partitions overlapping the time window.
+static std::vector<std::string> expand_index_pattern(
+    const std::string &index_pattern,
+    const std::optional<long long> &earliest_epoch,
+    const std::optional<long long> &latest_epoch,
+    const path &indexes_dir
+) {
     auto adjust_pattern = [&](const std::string &p) -> std::string {
         std::string cpat = p;
         while (!cpat.empty() && (cpat.front() == '"' || cpat.front() == ',')) cpat.erase(cpat.begin());
@@ -446,9 +811,135 @@ static py::object load_and_filter_data(
         return results;
     }();
 
+    // Directories the pattern names, for time-partitioned indexes stored as date=/hour= subdirectories
+    auto partition_roots = [&]() {
+        std::vector<std::string> roots;
+        std::string cpat = index_pattern;
+        cpat.erase(std::remove(cpat.begin(), cpat.end(), '"'), cpat.end());
+        while (!cpat.empty() && (cpat.front() == ',' || cpat.front() == '(')) cpat.erase(cpat.begin());
+        while (!cpat.empty() && (cpat.back() == ',' || cpat.back() == ')')) cpat.pop_back();
+        if (cpat.size() >= 3 && cpat.substr(cpat.size() - 3) == "/**") cpat = cpat.substr(0, cpat.size() - 3);
+        else if (cpat.size() >= 2 && cpat.substr(cpat.size() - 2) == "/*") cpat = cpat.substr(0, cpat.size() - 2);
+        std::string root_pattern = indexes_dir.string() + "/" + cpat;
+        glob_t g;
+        if (glob(root_pattern.c_str(), GLOB_TILDE | GLOB_ONLYDIR, NULL, &g) == 0) {
+            for (size_t i = 0; i < g.gl_pathc; i++) roots.push_back(g.gl_pathv[i]);
+        }
+        globfree(&g);
+        return roots;
+    }();
+
+    std::unordered_set<std::string> date_dirs;
+    std::vector<std::string> partitioned_files;
+    for (auto &root : partition_roots) {
+        auto found = expand_time_partitions(root, earliest_epoch, latest_epoch, date_dirs);
+        partitioned_files.insert(partitioned_files.end(), found.begin(), found.end());
+    }
+    if (!date_dirs.empty()) {
+        // Partition files come from the pruned expansion above, not from the glob
+        auto inside_partition = [&](const std::string &file) {
+            for (auto parent = path(file).parent_path(); parent.has_relative_path(); parent = parent.parent_path()) {
+                if (date_dirs.count(parent.string())) return true;
+                if (parent == parent.parent_path()) break;
+            }
+            return false;
+        };
+        files.erase(std::remove_if(files.begin(), files.end(), inside_partition), files.end());
+        std::unordered_set<std::string> seen(files.begin(), files.end());
+        for (auto &file : partitioned_files) {
+            if (seen.insert(file).second) files.push_back(file);
+        }
+    }
+
     log_info("Found " + std::to_string(files.size()) + " candidate file(s) using pattern.");
+    return files;
+}
+
+// Plan the read of the candidate files, applying file and row-group pruning from the
+// manifest, footer statistics, Bloom filters and the token index. Nothing beyond the
+// (usually cached) footers is read here.
+static std::vector<ScanTask> plan_index_scan(
+    const std::vector<std::string> &files,
+    bool need_epoch,
+    const std::optional<long long> &earliest_epoch,
+    const std::optional<long long> &latest_epoch,
+    const path &indexes_dir,
+    const std::vector<std::string> &filter_columns, // all non-earliest/latest identifiers
+    const std::optional<std::vector<std::string>> &projection, // pipeline fields, nullopt = all
+    const py::object &pruning_pred // conditions for Bloom filter / token index pruning, None = no pruning
+) {
+    py::object pq = py::module_::import("pyarrow.parquet");
+
+    // Consult the index manifest so files with the wrong schema or time range are never opened
+    py::dict manifest;
+    auto manifest_db = indexes_dir.parent_path() / "index_manifest.db";
+    try {
+        py::object index_manifest = py::module_::import("utils.index_manifest");
+        manifest = index_manifest.attr("lookup_files")(py::cast(files), py::arg("db_path") = manifest_db.string());
+    } catch (py::error_already_set &e) {
+        log_warning("Index manifest unavailable; inspecting every candidate file: " + std::string(e.what()));
+    }
+
+    // Files merged by compaction stay on disk for a grace period; skip them whenever the
+    // compacted file that replaced them is also a candidate so no row is read twice
+    std::unordered_set<std::string> superseded;
+    {
+        std::unordered_set<std::string> candidates;
+        for (auto item : manifest) candidates.insert(item.second["path"].cast<std::string>());
+        for (auto item : manifest) {
+            py::object replacement = item.second.attr("get")("superseded_by");
+            if (!replacement.is_none() && candidates.count(replacement.cast<std::string>())) {
+                superseded.insert(item.first.cast<std::string>());
+            }
+        }
+    }
+
+    // Row groups that may satisfy the filter according to the Bloom filters (equality
+    // conditions) and the token index (free-text terms); each answer is a superset of the
+    // matching row groups, so their intersection is too
+    std::unordered_map<std::string, std::vector<int>> index_row_groups;
+    if (!pruning_pred.is_none()) {
+        for (const char *module_name : {"utils.bloom_filters", "utils.token_index"}) {
+            try {
+                py::object source = py::module_::import(module_name);
+                py::dict found = source.attr("lookup_row_groups")(py::cast(files), pruning_pred, manifest_db.string());
+                for (auto item : found) {
+                    auto file = item.first.cast<std::string>();
+                    auto groups = item.second.cast<std::vector<int>>();
+                    auto existing = index_row_groups.find(file);
+                    if (existing == index_row_groups.end()) {
+                        index_row_groups.emplace(file, std::move(groups));
+                    } else {
+                        std::vector<int> kept;
+                        std::set_intersection(existing->second.begin(), existing->second.end(),
+                                              groups.begin(), groups.end(), std::back_inserter(kept));
+                        existing->second = std::move(kept);
+                    }
+                }
+            } catch (py::error_already_set &e) {
+                log_warning(std::string(module_name) + " unavailable; reading every row group: " + std::string(e.what()));
+            }
+        }
+    }
 
-    std::vector<py::object> dataframes;
+    // Low-cardinality string columns are read as dictionaries so they become pandas categoricals
+    py::object categoricals = py::module_::import("utils.categoricals");
+    py::dict category_columns;
+    try {
+        category_columns = categoricals.attr("forced_columns")(py::cast(files), indexes_dir.string());
+    } catch (py::error_already_set &e) {
+        log_warning("Index settings unavailable; choosing categorical columns automatically: " + std::string(e.what()));
+    }
+
+    // Parsed footers are shared process-wide and keyed by (path, size, mtime)
+    py::object footer_cache = py::none();
+    try {
+        footer_cache = py::module_::import("utils.parquet_footer_cache");
+    } catch (py::error_already_set &e) {
+        log_warning("Parquet footer cache unavailable; reading every footer: " + std::string(e.what()));
+    }
+
+    std::vector<ScanTask> tasks;
 
     for (auto &path_str : files) {
         log_info("Evaluating candidate file: " + path_str);
@@ -461,14 +952,30 @@ static py::object load_and_filter_data(
             struct stat stbuf;
             if (stat(path_str.c_str(), &stbuf) == 0 && S_ISREG(stbuf.st_mode)) {
                 log_info("Found target parquet file: " + path_str);
-                // Load all columns from the parquet file
-                py::object df = pandas.attr("read_parquet")(path_str);
-
-                auto rel_path = std::filesystem::relative(path_str, indexes_dir);
-                df = df.attr("assign")(py::arg("_source_file") = py::str(rel_path.string()));
-
-                py::object cols = df.attr("columns").attr("tolist")();
-                auto col_list = cols.cast<std::vector<std::string>>();
+                if (superseded.count(path_str)) {
+                    log_info("Skipping file " + path_str + " because it has been compacted into another candidate.");
+                    continue;
+                }
+                if (manifest.contains(path_str)) {
+                    auto reason = manifest_skip_reason(manifest[py::str(path_str)], filter_columns, need_epoch,
+                                                       earliest_epoch, latest_epoch);
+                    if (reason.has_value()) {
+                        log_info("Skipping file " + path_str + " per index manifest: " + reason.value());
+                        continue;
+                    }
+                }
+                // Only the footer is needed to plan the read, and it is usually cached
+                py::object metadata, schema;
+                if (!footer_cache.is_none()) {
+                    py::object footer = footer_cache.attr("get_footer")(path_str);
+                    metadata = footer.attr("metadata");
+                    schema = footer.attr("schema");
+                } else {
+                    py::object pf = pq.attr("ParquetFile")(path_str);
+                    metadata = pf.attr("metadata");
+                    schema = pf.attr("schema_arrow");
+                }
+                auto col_list = schema.attr("names").cast<std::vector<std::string>>();
                 std::unordered_set<std::string> col_set(col_list.begin(), col_list.end());
 
                 // Check if all filter columns exist
@@ -482,13 +989,10 @@ static py::object load_and_filter_data(
                     }
                 }
 
-                if (need_epoch) {
-                    // Ensure timestamp column is loaded
-                    bool has_timestamp = (col_set.find("timestamp") != col_set.end());
-                    if (!has_timestamp) {
-                        log_info("Skipping file " + path_str + " because it lacks 'timestamp' needed for earliest/latest.");
-                        continue;
-                    }
+                EpochSource epoch_source = detect_epoch_source(schema, col_set);
+                if (need_epoch && epoch_source == EpochSource::None) {
+                    log_info("Skipping file " + path_str + " because it lacks '_epoch'/'timestamp' needed for earliest/latest.");
+                    continue;
                 }
 
                 if (!all_cols_exist) {
@@ -496,53 +1000,77 @@ static py::object load_and_filter_data(
                     continue;
                 }
 
-                if (need_epoch) {
-                    df = df.attr("assign")(py::arg("timestamp") = df["timestamp"].attr("astype")("str"));
-                    size_t length = df.attr("shape").cast<py::tuple>()[0].cast<size_t>();
-                    std::vector<long long> epochs(length, 0);
-                    if (length > 0) {
-                        py::object list_obj = df["timestamp"].attr("tolist")();
-                        auto datetime_strings = list_obj.cast<std::vector<std::string>>();
-                        for (size_t ii = 0; ii < datetime_strings.size(); ii++) {
-                            epochs[ii] = parse_date_to_epoch_single(datetime_strings[ii]);
-                        }
-                    }
-                    auto epoch_array = py::array_t<long long>(epochs.size(), epochs.data());
-                    df = df.attr("assign")(py::arg("_epoch") = epoch_array);
-                    col_set.insert("_epoch");
+                ScanTask task;
+                task.path = path_str;
+                task.metadata = metadata;
+                task.epoch_source = epoch_source;
+                if (epoch_source == EpochSource::StoredEpoch && manifest.contains(path_str)) {
+                    py::object max_epoch = manifest[py::str(path_str)]["max_epoch"];
+                    if (!max_epoch.is_none()) task.max_epoch = max_epoch.cast<long long>();
                 }
 
-                // Build final query
-                std::string final_query = "True";
-                if (earliest_epoch.has_value() || latest_epoch.has_value()) {
-                    std::string epoch_cond = "True";
-                    if (earliest_epoch.has_value()) {
-                        epoch_cond = "(_epoch >= " + std::to_string(earliest_epoch.value()) + ")";
+                // Prune row groups (and whole files) using footer min/max statistics
+                int num_row_groups = metadata.attr("num_row_groups").cast<int>();
+                if ((earliest_epoch.has_value() || latest_epoch.has_value()) &&
+                    (epoch_source == EpochSource::StoredEpoch || epoch_source == EpochSource::TypedTimestamp)) {
+                    std::string time_col = (epoch_source == EpochSource::StoredEpoch) ? "_epoch" : "timestamp";
+                    task.row_groups = select_row_groups(metadata, time_col, earliest_epoch, latest_epoch);
+                    task.pruned = ((int)task.row_groups.size() != num_row_groups);
+                    if (task.row_groups.empty()) {
+                        log_info("Skipping file " + path_str + " because its '" + time_col +
+                                 "' statistics fall outside the requested time range.");
+                        continue;
                     }
-                    if (latest_epoch.has_value()) {
-                        std::string lc = "(_epoch <= " + std::to_string(latest_epoch.value()) + ")";
-                        if (epoch_cond == "True") epoch_cond = lc;
-                        else epoch_cond = "(" + epoch_cond + " & " + lc + ")";
+                    if (task.pruned) {
+                        log_info("Reading " + std::to_string(task.row_groups.size()) + " of " +
+                                 std::to_string(num_row_groups) + " row group(s) from " + path_str);
                     }
-                    final_query = epoch_cond;
                 }
 
-                if (pandas_query.has_value() && !pandas_query->empty() && pandas_query.value() != "True") {
-                    final_query = (final_query == "True") ? pandas_query.value() : "(" + final_query + " & (" + pandas_query.value() + "))";
+                auto indexed = index_row_groups.find(path_str);
+                if (indexed != index_row_groups.end()) {
+                    const auto &candidates = indexed->second;
+                    if (task.row_groups.empty()) {
+                        task.row_groups = candidates;
+                    } else {
+                        std::vector<int> kept;
+                        std::set_intersection(task.row_groups.begin(), task.row_groups.end(),
+                                              candidates.begin(), candidates.end(), std::back_inserter(kept));
+                        task.row_groups = kept;
+                    }
+                    task.pruned = ((int)task.row_groups.size() != num_row_groups);
+                    if (task.row_groups.empty()) {
+                        log_info("Skipping file " + path_str + " because its Bloom filters/token index rule out the filter.");
+                        continue;
+                    }
+                    if (task.pruned) {
+                        log_info("Bloom filters/token index leave " + std::to_string(task.row_groups.size()) + " of " +
+                                 std::to_string(num_row_groups) + " row group(s) to read from " + path_str);
+                    }
                 }
 
-                if (final_query != "True") {
-                    log_info("Applying filter to DataFrame from file: " + path_str);
-                    log_info("Pandas query: " + final_query);
-                    try {
-                        df = df.attr("query")(final_query);
-                    } catch (py::error_already_set &e) {
-                        log_info("Filtering error: " + std::string(e.what()) + "; treating as no matches for file " + path_str);
-                        df = pandas.attr("DataFrame")();
+                task.read_columns = py::none();
+                if (projection.has_value()) {
+                    std::unordered_set<std::string> wanted(projection->begin(), projection->end());
+                    wanted.insert(filter_columns.begin(), filter_columns.end());
+                    wanted.insert({"_epoch", "timestamp", "_time"});
+                    py::list selected;
+                    for (auto &c : col_list) {
+                        if (wanted.count(c)) selected.append(c);
                     }
+                    log_info("Reading " + std::to_string(selected.size()) + " of " +
+                             std::to_string(col_list.size()) + " column(s) from " + path_str);
+                    task.read_columns = selected;
                 }
 
-                dataframes.push_back(df);
+                task.category_columns = category_columns.contains(path_str)
+                                            ? py::object(category_columns[py::str(path_str)])
+                                            : py::object(py::list());
+                task.read_dictionary = categoricals.attr("dictionary_columns")(
+                    metadata, schema, task.pruned ? py::object(py::cast(task.row_groups)) : py::object(py::none()),
+                    task.category_columns);
+
+                tasks.push_back(std::move(task));
             } else {
                 log_warning("File " + path_str + " is not a regular file.");
             }
@@ -551,48 +1079,352 @@ static py::object load_and_filter_data(
         }
     }
 
-    if (dataframes.empty()) {
-        log_info("No DataFrames loaded from any targeted parquet files; returning empty DataFrame.");
-        return empty_df;
-    } else if (dataframes.size() == 1) {
-        log_info("One sub-query result loaded; returning it.");
-        return dataframes[0];
+    log_info("Planned " + std::to_string(tasks.size()) + " of " + std::to_string(files.size()) + " candidate file(s).");
+    return tasks;
+}
+
+// Keep the rows of one scanned table that match the filter (utils.filter_mask.filter_table).
+// A failing filter, e.g. on a column the file lacks, counts as no matches for that file only;
+// the result is then a null object, which callers skip like a file that failed to scan.
+static py::object filter_table(const py::object &table, const py::object &filter_expr, const std::string &label) {
+    py::object filter_mask = py::module_::import("utils.filter_mask");
+    log_info("Applying filter to " + label);
+    log_info("Filter: " + filter_mask.attr("describe")(filter_expr).cast<std::string>());
+    try {
+        return filter_mask.attr("filter_table")(table, filter_expr);
+    } catch (py::error_already_set &e) {
+        log_info("Filtering error: " + std::string(e.what()) + "; treating as no matches for " + label);
+        return py::object();
+    }
+}
+
+// Build the function that reads one planned file into an Arrow table. Each table carries a
+// dictionary-encoded _source_file column and only the rows matching the filter expression, so
+// a selective filter never holds a file's unmatched rows past its own scan. The returned
+// function must be called with the GIL held.
+static std::function<py::object(const ScanTask &)> make_file_scanner(
+    bool need_epoch,
+    const std::optional<long long> &earliest_epoch,
+    const std::optional<long long> &latest_epoch,
+    const path &indexes_dir,
+    const std::vector<std::string> &terms, // free-text terms, computed as _term_<n> columns
+    const py::object &filter_expr // utils.filter_mask expression, None = no filter
+) {
+    py::object pq = py::module_::import("pyarrow.parquet");
+    py::object pc = py::module_::import("pyarrow.compute");
+    py::object token_index = py::none();
+    if (!terms.empty()) token_index = py::module_::import("utils.token_index");
+    py::object categoricals = py::module_::import("utils.categoricals");
+
+    // Row-level time window, evaluated in Arrow before anything is converted to pandas
+    py::object time_filter = py::none();
+    if (earliest_epoch.has_value()) {
+        time_filter = pc.attr("field")("_epoch").attr("__ge__")(earliest_epoch.value());
+    }
+    if (latest_epoch.has_value()) {
+        py::object upper = pc.attr("field")("_epoch").attr("__le__")(latest_epoch.value());
+        time_filter = time_filter.is_none() ? upper : time_filter.attr("__and__")(upper);
+    }
+
+    return [=](const ScanTask &task) -> py::object {
+        const std::string &path_str = task.path;
+        py::object table;
+        py::object parquet_file = pq.attr("ParquetFile")(path_str, py::arg("metadata") = task.metadata,
+                                                         py::arg("read_dictionary") = task.read_dictionary);
+        if (task.pruned) {
+            table = parquet_file.attr("read_row_groups")(py::cast(task.row_groups),
+                                                              py::arg("columns") = task.read_columns,
+                                                              py::arg("use_pandas_metadata") = true);
+        } else {
+            table = parquet_file.attr("read")(py::arg("columns") = task.read_columns,
+                                                   py::arg("use_pandas_metadata") = true);
+        }
+        table = categoricals.attr("limit_cardinality")(table, task.category_columns);
+
+        if (need_epoch && task.epoch_source == EpochSource::TypedTimestamp) {
+            table = with_column(table, "_epoch", typed_timestamp_to_epoch(table.attr("column")("timestamp")));
+        } else if (need_epoch && task.epoch_source == EpochSource::StringTimestamp) {
+            table = with_column(table, "_epoch", string_timestamp_to_epoch(table.attr("column")("timestamp")));
+        }
+
+        if (!time_filter.is_none()) {
+            table = table.attr("filter")(time_filter);
+        }
+
+        for (size_t i = 0; i < terms.size(); i++) {
+            table = with_column(table, "_term_" + std::to_string(i), token_index.attr("term_mask")(table, terms[i]));
+        }
+        if (!filter_expr.is_none()) {
+            table = filter_table(table, filter_expr, path_str);
+            if (!table) return table;
+        }
+
+        auto rel_path = std::filesystem::relative(path_str, indexes_dir);
+        size_t num_rows = table.attr("num_rows").cast<size_t>();
+        return with_column(table, "_source_file", constant_dictionary_column(rel_path.string(), num_rows));
+    };
+}
+
+// Dictionary columns arrive with categories in dictionary order; sort them in place so
+// categoricals order rows like the plain strings they stand for
+static void sort_categories(const py::object &df) {
+    py::module_::import("utils.categoricals").attr("sort_categories")(df);
+}
+
+// pandas.concat that keeps categorical columns categorical across frames from different files
+static py::object concat_frames(const py::list &frames, bool ignore_index) {
+    return py::module_::import("utils.categoricals").attr("concat")(frames, py::arg("ignore_index") = ignore_index);
+}
+
+// Remove the helper columns holding free-text term matches
+static py::object drop_term_columns(const py::object &df, size_t num_terms) {
+    if (num_terms == 0) return df;
+    py::list names;
+    for (size_t i = 0; i < num_terms; i++) names.append("_term_" + std::to_string(i));
+    return df.attr("drop")(py::arg("columns") = names, py::arg("errors") = "ignore");
+}
+
+// Convert one scanned table to pandas and drop the term helper columns
+static py::object finish_table(const py::object &table, size_t num_terms) {
+    py::object df = table.attr("to_pandas")();
+    sort_categories(df);
+    return drop_term_columns(df, num_terms);
+}
+
+// Assemble the scanned (already filtered) tables into one DataFrame.
+// Tables are concatenated in Arrow and converted once, so the result set is not
+// copied per file. Files whose schemas cannot be unified fall back to per-file
+// pandas conversion.
+static py::object assemble_results(std::vector<py::object> tables, size_t num_terms) {
+    py::object pa = py::module_::import("pyarrow");
+
+    // A column dictionary-encoded in some files only is decoded so the schemas still unify
+    py::list table_list = py::module_::import("utils.categoricals").attr("unify_tables")(py::cast(tables));
+
+    py::object combined = py::none();
+    try {
+        combined = pa.attr("concat_tables")(table_list, py::arg("promote_options") = "permissive");
+    } catch (py::error_already_set &e) {
+        log_warning("Could not unify schemas across files (" + std::string(e.what()) +
+                    "); converting each file separately.");
+    }
+
+    if (!combined.is_none()) {
+        log_info("Converting " + std::to_string(tables.size()) + " table(s) to a single DataFrame.");
+        // Drop every other reference so self_destruct can free Arrow buffers as columns convert
+        table_list = py::list();
+        tables.clear();
+        py::object df = combined.attr("to_pandas")(py::arg("self_destruct") = true, py::arg("split_blocks") = true);
+        combined = py::none();
+        sort_categories(df);
+        return drop_term_columns(df, num_terms);
+    }
+
+    py::list frames;
+    for (auto &table : tables) {
+        frames.append(finish_table(table, num_terms));
+    }
+    return concat_frames(frames, false);
+}
+
+// Split tasks into one task per row group so a limited scan can stop between row groups,
+// recording each row group's newest _epoch from its statistics or, failing that, the manifest
+static std::vector<ScanTask> split_row_groups(const std::vector<ScanTask> &tasks) {
+    std::vector<ScanTask> units;
+    for (auto &task : tasks) {
+        std::vector<int> groups = task.row_groups;
+        if (!task.pruned) {
+            int num_row_groups = task.metadata.attr("num_row_groups").cast<int>();
+            groups.clear();
+            for (int rg = 0; rg < num_row_groups; rg++) groups.push_back(rg);
+        }
+        for (int rg : groups) {
+            ScanTask unit = task;
+            unit.row_groups = {rg};
+            unit.pruned = true;
+            unit.max_epoch = std::nullopt;
+            if (task.epoch_source == EpochSource::StoredEpoch) {
+                auto range = row_group_epoch_range(task.metadata, rg, "_epoch");
+                unit.max_epoch = range.has_value() ? std::optional<long long>(range->second) : task.max_epoch;
+            }
+            units.push_back(std::move(unit));
+        }
+    }
+    return units;
+}
+
+// Empty tables with each planned file's read schema, so a limited scan that reads only some
+// files still gives every column the type a full scan would
+static std::vector<py::object> planned_placeholders(const std::vector<ScanTask> &tasks,
+                                                    const std::vector<py::object> &tables) {
+    py::object pa = py::module_::import("pyarrow");
+    py::list schemas;
+    for (auto &task : tasks) {
+        py::object schema = task.metadata.attr("schema").attr("to_arrow_schema")();
+        if (!task.read_columns.is_none()) {
+            py::list fields;
+            for (auto column : task.read_columns) fields.append(schema.attr("field")(column));
+            schema = pa.attr("schema")(fields, py::arg("metadata") = schema.attr("metadata"));
+        }
+        schemas.append(schema);
+    }
+    return py::module_::import("utils.categoricals").attr("empty_tables")(schemas, py::cast(tables))
+        .cast<std::vector<py::object>>();
+}
+
+// Scan for a `| head N` pushed into the index call: read row groups in waves of max_workers and
+// stop as soon as no unread row group can change the answer. When the files carry an _epoch the
+// newest N matches are returned, newest-first; otherwise the first N matches in file order. Ties,
+// and rows without an _epoch, keep file order. Row groups with a known newest _epoch (statistics
+// or manifest) are read newest-first after those without one, which lets reading stop early, but
+// the rows returned never depend on which statistics exist.
+static py::object scan_with_limit(
+    const std::vector<ScanTask> &tasks,
+    size_t limit,
+    size_t max_workers,
+    const std::function<py::object(const ScanTask &)> &scan,
+    size_t num_terms,
+    bool need_epoch
+) {
+    py::object pandas = py::module_::import("pandas");
+    py::object pc = py::module_::import("pyarrow.compute");
+
+    std::vector<ScanTask> units = split_row_groups(tasks);
+    bool by_epoch = std::any_of(tasks.begin(), tasks.end(), [&](const ScanTask &t) {
+        return t.epoch_source == EpochSource::StoredEpoch || (need_epoch && t.epoch_source != EpochSource::None);
+    });
+    // Reading order as indexes into units (file order)
+    std::vector<size_t> order(units.size());
+    std::iota(order.begin(), order.end(), 0);
+    if (by_epoch) {
+        std::stable_sort(order.begin(), order.end(), [&](size_t a, size_t b) {
+            if (!units[a].max_epoch.has_value() || !units[b].max_epoch.has_value()) {
+                return !units[a].max_epoch.has_value() && units[b].max_epoch.has_value();
+            }
+            return units[a].max_epoch.value() > units[b].max_epoch.value();
+        });
+        log_info("Reading " + std::to_string(units.size()) + " row group(s) newest-first for a limit of " +
+                 std::to_string(limit) + " row(s).");
     } else {
-        log_info("Concatenating " + std::to_string(dataframes.size()) + " DataFrame(s) from index patterns.");
-        py::list df_list;
-        for (auto &df : dataframes) df_list.append(df);
-        return pandas.attr("concat")(df_list);
+        log_info("Reading " + std::to_string(units.size()) + " row group(s) in file order for a limit of " +
+                 std::to_string(limit) + " row(s).");
+    }
+
+    // Scanned tables still able to reach the result, keyed by their unit's position in file order
+    std::vector<std::pair<size_t, py::object>> kept;
+    size_t matched = 0;
+    // The newest `limit` matching epochs seen so far; its top is the oldest of them
+    std::priority_queue<long long, std::vector<long long>, std::greater<long long>> newest;
+    size_t wave = std::max<size_t>(max_workers, 1);
+    size_t read = 0;
+    for (size_t start = 0; start < order.size(); start += wave) {
+        if (!by_epoch && matched >= limit) break;
+        // Row groups without a known newest _epoch come first, so the rest are all older than this one
+        if (by_epoch && newest.size() >= limit && units[order[start]].max_epoch.has_value() &&
+            units[order[start]].max_epoch.value() < newest.top()) break;
+
+        std::vector<ScanTask> batch;
+        for (size_t i = start; i < std::min(order.size(), start + wave); i++) batch.push_back(units[order[i]]);
+        read += batch.size();
+        auto results = run_scan_tasks(batch, max_workers, scan);
+        for (size_t j = 0; j < results.size(); j++) {
+            py::object table = results[j];
+            if (!table) continue;
+            if (!by_epoch) {
+                // Scanned rows already match the filter, so only keep what is still needed
+                size_t remaining = (matched < limit) ? limit - matched : 0;
+                table = table.attr("slice")(0, remaining);
+            }
+            size_t rows = table.attr("num_rows").cast<size_t>();
+            if (rows == 0) continue;
+            matched += rows;
+            kept.emplace_back(order[start + j], table);
+            if (by_epoch && table.attr("schema").attr("get_field_index")("_epoch").cast<int>() >= 0) {
+                auto epochs = table.attr("column")("_epoch").attr("drop_null")().attr("cast")("int64")
+                                  .attr("to_pylist")().cast<std::vector<long long>>();
+                for (long long epoch : epochs) {
+                    if (newest.size() < limit) {
+                        newest.push(epoch);
+                    } else if (epoch > newest.top()) {
+                        newest.pop();
+                        newest.push(epoch);
+                    }
+                }
+            }
+        }
+        if (by_epoch && newest.size() >= limit) {
+            // Rows older than the newest `limit`, or without an _epoch, can no longer make the cut
+            std::vector<std::pair<size_t, py::object>> newer;
+            for (auto &[unit, table] : kept) {
+                if (table.attr("schema").attr("get_field_index")("_epoch").cast<int>() < 0) continue;
+                py::object mask = pc.attr("greater_equal")(table.attr("column")("_epoch"), newest.top());
+                table = table.attr("filter")(mask);
+                if (table.attr("num_rows").cast<size_t>() > 0) newer.emplace_back(unit, table);
+            }
+            kept = std::move(newer);
+        }
     }
+    if (read < units.size()) {
+        log_info("Limit of " + std::to_string(limit) + " row(s) reached after reading " + std::to_string(read) +
+                 " of " + std::to_string(units.size()) + " row group(s).");
+    }
+
+    if (kept.empty()) {
+        log_info("No rows matched within the limited scan; returning empty DataFrame.");
+        return pandas.attr("DataFrame")();
+    }
+    std::stable_sort(kept.begin(), kept.end(), [](const auto &a, const auto &b) { return a.first < b.first; });
+    std::vector<py::object> tables;
+    for (auto &entry : kept) tables.push_back(entry.second);
+    std::vector<py::object> combined = planned_placeholders(tasks, tables);
+    combined.insert(combined.end(), tables.begin(), tables.end());
+    py::object df = assemble_results(std::move(combined), num_terms);
+    if (by_epoch && py::list(df.attr("columns")).contains(py::str("_epoch"))) {
+        df = df.attr("sort_values")("_epoch", py::arg("ascending") = false, py::arg("kind") = "stable",
+                                    py::arg("na_position") = "last");
+    }
+    return df.attr("head")(limit).attr("reset_index")(py::arg("drop") = true);
 }
 
-// Process index calls from the provided token vector
-static py::object process_index_calls(const std::vector<std::string> &original_tokens) {
+// An index call split into its parts: index patterns, time window and filter
+struct IndexCall {
+    path indexes_dir;
+    std::vector<std::string> index_patterns;
+    std::optional<long long> earliest_epoch;
+    std::optional<long long> latest_epoch;
+    bool need_epoch = false;
+    py::object filter_expr = py::none(); // utils.filter_mask expression, None = no filter
+    std::vector<std::string> filter_columns; // identifiers the filter reads
+    py::object pruning_pred = py::none();
+    std::vector<std::string> terms;
+};
+
+// Parse the tokens of an index call, resolving index patterns against the project root
+static IndexCall parse_index_call(const std::vector<std::string> &original_tokens) {
+    IndexCall call;
     // Use the determined project root instead of the current working directory.
     auto project_root = get_project_root();
     log_info("Project root directory: \"" + project_root.string() + "\"");
-    auto indexes_dir = project_root / "indexes";
-    log_info("Indexes directory: \"" + indexes_dir.string() + "\"");
+    call.indexes_dir = project_root / "indexes";
+    log_info("Indexes directory: \"" + call.indexes_dir.string() + "\"");
 
     // Extract index= occurrences and separate filters
     std::vector<std::string> filter_tokens;
-    std::vector<std::string> index_patterns;
     {
         for (size_t i = 0; i < original_tokens.size(); i++) {
             if (i + 2 < original_tokens.size() && original_tokens[i] == "index" && original_tokens[i + 1] == "=") {
-                index_patterns.push_back(original_tokens[i + 2]);
+                call.index_patterns.push_back(original_tokens[i + 2]);
                 i += 2;
             } else {
                 filter_tokens.push_back(original_tokens[i]);
             }
         }
-        if (index_patterns.empty()) {
-            index_patterns.push_back("\"system_logs/**\"");
+        if (call.index_patterns.empty()) {
+            call.index_patterns.push_back("\"system_logs/**\"");
         }
     }
 
     // Extract earliest/latest parameters
-    std::optional<long long> earliest_epoch;
-    std::optional<long long> latest_epoch;
     {
         std::vector<std::string> new_filters;
         for (size_t i = 0; i < filter_tokens.size(); i++) {
@@ -602,8 +1434,8 @@ static py::object process_index_calls(const std::vector<std::string> &original_t
                     val = val.substr(1, val.size() - 2);
                 }
                 long long ep = parse_date_to_epoch_single(val);
-                if (filter_tokens[i] == "earliest") earliest_epoch = ep;
-                else latest_epoch = ep;
+                if (filter_tokens[i] == "earliest") call.earliest_epoch = ep;
+                else call.latest_epoch = ep;
                 i += 2;
             } else {
                 new_filters.push_back(filter_tokens[i]);
@@ -612,52 +1444,171 @@ static py::object process_index_calls(const std::vector<std::string> &original_t
         filter_tokens = new_filters;
     }
 
-    bool need_epoch = false;
     std::optional<ASTNode> ast = parse_ast(filter_tokens);
-    std::optional<std::string> pandas_query = std::nullopt;
     std::vector<std::string> required_columns;
     if (ast.has_value()) {
-        collect_identifiers(ast.value(), required_columns, need_epoch);
-        std::string q = ast_to_query(ast.value());
-        if (q.empty()) q = "True";
-        pandas_query = q;
+        collect_identifiers(ast.value(), required_columns, call.need_epoch);
+        call.pruning_pred = pruning_predicate(ast.value());
+        extract_terms(ast.value(), call.terms);
+        call.filter_expr = filter_expression(ast.value());
     }
 
-    if (earliest_epoch.has_value() || latest_epoch.has_value()) need_epoch = true;
+    if (call.earliest_epoch.has_value() || call.latest_epoch.has_value()) call.need_epoch = true;
 
-    py::object pandas = py::module_::import("pandas");
-    std::vector<py::object> results;
-
-    std::vector<std::string> filter_cols_no_special;
     for (auto &c : required_columns) {
-        if (c != "earliest" && c != "latest") filter_cols_no_special.push_back(c);
+        if (c != "earliest" && c != "latest") call.filter_columns.push_back(c);
     }
-    log_info("Using indexes directory: \"" + indexes_dir.string() + "\"");
+    return call;
+}
 
-    for (auto &ip : index_patterns) {
+// Plan a parsed call: every index pattern is expanded first and the union of their files,
+// without duplicates, is planned once, so overlapping patterns never read a file twice
+static std::vector<ScanTask> plan_index_call(
+    const IndexCall &call,
+    const std::optional<std::vector<std::string>> &columns
+) {
+    log_info("Using indexes directory: \"" + call.indexes_dir.string() + "\"");
+    std::vector<std::string> files;
+    std::unordered_set<std::string> seen;
+    size_t duplicates = 0;
+    for (auto &ip : call.index_patterns) {
         log_info("Processing index pattern: " + ip);
-        py::object df = load_and_filter_data(ip, need_epoch, pandas_query, earliest_epoch, latest_epoch, indexes_dir, filter_cols_no_special);
-        results.push_back(df);
+        for (auto &file : expand_index_pattern(ip, call.earliest_epoch, call.latest_epoch, call.indexes_dir)) {
+            if (seen.insert(path(file).lexically_normal().string()).second) files.push_back(file);
+            else duplicates++;
+        }
+    }
+    if (duplicates) {
+        log_info("Skipping " + std::to_string(duplicates) + " file(s) already matched by another index pattern.");
+    }
+    return plan_index_scan(files, call.need_epoch, call.earliest_epoch, call.latest_epoch, call.indexes_dir,
+                           call.filter_columns, columns, call.pruning_pred);
+}
+
+// Return the files an index call would read, without reading them: one dict per file with its
+// absolute "path", the "source_file" value its rows would carry and the "row_groups" to read
+// (None when the whole file is read)
+static py::list plan_index_files(const std::vector<std::string> &original_tokens) {
+    IndexCall call = parse_index_call(original_tokens);
+    py::list planned;
+    for (auto &task : plan_index_call(call, std::nullopt)) {
+        py::dict entry;
+        entry["path"] = task.path;
+        entry["source_file"] = std::filesystem::relative(task.path, call.indexes_dir).string();
+        entry["row_groups"] = task.pruned ? py::object(py::cast(task.row_groups)) : py::object(py::none());
+        planned.append(entry);
+    }
+    return planned;
+}
+
+// Process index calls from the provided token vector
+static py::object process_index_calls(
+    const std::vector<std::string> &original_tokens,
+    const std::optional<std::vector<std::string>> &columns,
+    int max_workers,
+    const std::optional<size_t> &limit
+) {
+    IndexCall call = parse_index_call(original_tokens);
+    py::object pandas = py::module_::import("pandas");
+
+    size_t workers = (max_workers > 0) ? (size_t)max_workers : default_scan_workers();
+    // Free-text terms are matched against every string column, so they need all columns read
+    auto scan_columns = columns;
+    if (!call.terms.empty() && scan_columns.has_value()) {
+        log_info("Reading all columns because the filter contains free-text terms.");
+        scan_columns = std::nullopt;
     }
+    std::vector<ScanTask> tasks = plan_index_call(call, scan_columns);
+    auto scan_file = make_file_scanner(call.need_epoch, call.earliest_epoch, call.latest_epoch, call.indexes_dir,
+                                       call.terms, call.filter_expr);
+
+    if (limit.has_value() && limit.value() > 0) {
+        return scan_with_limit(tasks, limit.value(), workers, scan_file, call.terms.size(), call.need_epoch);
+    }
+
+    std::vector<py::object> results;
+    for (auto &table : run_scan_tasks(tasks, workers, scan_file)) {
+        if (table) results.push_back(table);
+    }
+    log_info("Loaded " + std::to_string(results.size()) + " table(s) from " + std::to_string(tasks.size()) +
+             " planned file(s).");
 
     if (results.empty()) {
-        log_info("No DataFrames from subqueries; returning empty DataFrame.");
+        log_info("No tables loaded from any targeted parquet files; returning empty DataFrame.");
         return pandas.attr("DataFrame")();
-    } else if (results.size() == 1) {
-        return results[0];
-    } else {
-        log_info("Concatenating " + std::to_string(results.size()) + " DataFrame(s) from index patterns.");
-        py::list df_list;
-        for (auto &df : results) df_list.append(df);
-        return pandas.attr("concat")(df_list);
     }
+    return assemble_results(std::move(results), call.terms.size());
 }
 
+// Streams the filtered results of an index call as one pandas DataFrame per row group.
+// Row groups are read in waves of max_workers, so memory is bounded by one wave rather
+// than by the whole result set. Row groups without matches are skipped.
+class IndexBatches {
+public:
+    IndexBatches(const std::vector<std::string> &original_tokens,
+                 const std::optional<std::vector<std::string>> &columns,
+                 int max_workers) {
+        IndexCall call = parse_index_call(original_tokens);
+        workers = (max_workers > 0) ? (size_t)max_workers : default_scan_workers();
+        auto scan_columns = columns;
+        if (!call.terms.empty() && scan_columns.has_value()) {
+            log_info("Reading all columns because the filter contains free-text terms.");
+            scan_columns = std::nullopt;
+        }
+        units = split_row_groups(plan_index_call(call, scan_columns));
+        scan = make_file_scanner(call.need_epoch, call.earliest_epoch, call.latest_epoch, call.indexes_dir,
+                                 call.terms, call.filter_expr);
+        num_terms = call.terms.size();
+        log_info("Streaming " + std::to_string(units.size()) + " row group(s) in waves of " +
+                 std::to_string(workers) + ".");
+    }
+
+    py::object next() {
+        while (pending.empty()) {
+            if (position >= units.size()) throw py::stop_iteration();
+            size_t end = std::min(units.size(), position + workers);
+            std::vector<ScanTask> wave(units.begin() + position, units.begin() + end);
+            position = end;
+            for (auto &table : run_scan_tasks(wave, workers, scan)) {
+                if (!table) continue;
+                py::object df = finish_table(table, num_terms);
+                if (py::len(df) > 0) pending.push_back(df);
+            }
+        }
+        py::object df = pending.front();
+        pending.pop_front();
+        return df;
+    }
+
+    size_t num_row_groups() const { return units.size(); }
+
+private:
+    std::vector<ScanTask> units;
+    std::function<py::object(const ScanTask &)> scan;
+    size_t num_terms = 0;
+    size_t workers = 1;
+    size_t position = 0;
+    std::deque<py::object> pending;
+};
+
 } // anonymous namespace
 
 PYBIND11_MODULE(cpp_index_call, m) {
     log_info("Initializing cpp_index_call module.");
     m.doc() = "C++ module with improved implicit AND handling for parenthetical conditions.";
-    m.def("process_index_calls", &process_index_calls, "Process index calls");
+    m.def("process_index_calls", &process_index_calls, "Process index calls",
+          py::arg("tokens"), py::arg("columns") = py::none(), py::arg("max_workers") = 0,
+          py::arg("limit") = py::none());
+    m.def("plan_index_files", &plan_index_files, "List the files an index call would read",
+          py::arg("tokens"));
+    py::class_<IndexBatches>(m, "IndexBatches")
+        .def("__iter__", [](IndexBatches &self) -> IndexBatches & { return self; })
+        .def("__next__", &IndexBatches::next)
+        .def_property_readonly("num_row_groups", &IndexBatches::num_row_groups);
+    m.def("scan_index_batches",
+          [](const std::vector<std::string> &tokens, const std::optional<std::vector<std::string>> &columns,
+             int max_workers) { return IndexBatches(tokens, columns, max_workers); },
+          "Stream the results of an index call one row group at a time",
+          py::arg("tokens"), py::arg("columns") = py::none(), py::arg("max_workers") = 0);
 }
 
@@ -16,6 +16,8 @@ import operator
 from handlers.MathematicOperations import MathHandler
 from handlers.StringHandler import StringHandler
 from handlers.GeneralHandler import GeneralHandler
+from utils.categoricals import plain
+from utils.pipeline_analysis import referenced_identifiers
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +42,12 @@ class EvalHandler:
         else:
             assignments_str = eval_tokens
 
+        # Categoricals reject string arithmetic and new values, so decode the columns read here
+        referenced = referenced_identifiers(assignments_str)
+        for name in df.columns:
+            if name in referenced and isinstance(df[name].dtype, pd.CategoricalDtype):
+                df[name] = plain(df[name])
+
         # Split assignments at the top level (by commas that are not nested)
         assignment_list = self.split_arguments(assignments_str)
         for assignment in assignment_list:
@@ -14,6 +14,8 @@ from collections import OrderedDict
 from typing import Union, List, Any
 from itertools import dropwhile
 
+from utils import categoricals, result_cache
+
 
 class DataFrameError(Exception):
     """Custom exception for DataFrame operation errors."""
@@ -1100,6 +1102,7 @@ class GeneralHandler:
     def sort_df_by_columns(df, columns, is_ascending="+"):
         """
         Sorts a DataFrame by the given column names, entirely in ascending or descending order.
+        The sort is stable: rows with equal sort values keep their input order.
 
         :param df: The pandas DataFrame to be sorted.
         :param columns: A list of column names to sort by, in order.
@@ -1124,13 +1127,34 @@ class GeneralHandler:
             raise DataFrameError(
                 f"The DataFrame does not contain the specified columns: {missing_columns}"
             )
+        # Stable, so ties are deterministic and top_k_by_columns returns the same tied rows
         if is_ascending == "+":
-            return df.sort_values(by=columns, ascending=True)  # Perform sorting
+            return df.sort_values(by=columns, ascending=True, kind="stable")  # Perform sorting
         elif is_ascending == "-":
-            return df.sort_values(by=columns, ascending=False)  # Perform sorting
+            return df.sort_values(by=columns, ascending=False, kind="stable")  # Perform sorting
         else:
             raise DataFrameError("")
 
+    @staticmethod
+    def top_k_by_columns(df, columns, count, is_ascending="+"):
+        """
+        Returns the first ``count`` rows of ``sort_df_by_columns(df, columns, is_ascending)``
+        without sorting the whole DataFrame.
+
+        When the first sort column is numeric, only the rows whose value ranks within the
+        first ``count`` (ties included) can reach the result, so just those rows are sorted.
+        Other columns, and inputs with fewer than ``count`` non-null values, are sorted in full.
+        """
+        if isinstance(df, pd.DataFrame) and isinstance(columns, list) and columns and columns[0] in df.columns:
+            first = df[columns[0]]
+            numeric = pd.api.types.is_numeric_dtype(first) and not pd.api.types.is_bool_dtype(first)
+            if numeric and count < len(df) and first.count() >= count:
+                if is_ascending == "+":
+                    df = df[first <= first.nsmallest(count).iloc[-1]]
+                elif is_ascending == "-":
+                    df = df[first >= first.nlargest(count).iloc[-1]]
+        return GeneralHandler.sort_df_by_columns(df, columns, is_ascending).head(count)
+
     @staticmethod
     def reverse_df_rows(df):
         """
@@ -1493,7 +1517,7 @@ class GeneralHandler:
         for field in fields:
             if field not in df.columns:
                 raise ValueError(f"Column '{field}' does not exist in the DataFrame.")
-            df[field] = df[field].fillna(fill_value)
+            df[field] = categoricals.fill(df[field], fill_value)
 
         return df
 
@@ -1768,6 +1792,7 @@ class GeneralHandler:
         if not abs_path.startswith(trusted_dir):
             raise ValueError(f"Untrusted pickle path: {abs_path}")
 
+        result_cache.record_input(abs_path)
         if os.path.exists(abs_path):
             # pd.read_pickle uses pickle under the hood which can execute
             # arbitrary code. We limit loading to the trusted directory above.
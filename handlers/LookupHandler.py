@@ -6,6 +6,8 @@ import sqlite3
 import logging
 import os
 
+from utils import result_cache
+
 
 class LookupHandler:
     def __init__(self, logger=None):
@@ -31,6 +33,7 @@ class LookupHandler:
         Returns:
         pandas.DataFrame: Data loaded into DataFrame, or None if an error occurs.
         """
+        result_cache.record_input(file_path)  # Cached results of this query depend on the file
         if not os.path.exists(file_path):  # Check if the file exists
             self.logger.error("[x] File does not exist: {}".format(file_path))
             return None
@@ -7,6 +7,8 @@ A class-based Python module that mirrors the logical and comparison
 filtering from the C++ index call code, but applies it to an already-loaded
 Pandas DataFrame. The filtering is guided by a list of tokens
 (e.g., ['status', '=', '"success"', 'x', '>', '5', 'earliest', '=', '"2024-01-07"']).
+A quoted string standing alone as a condition is a free-text term, matched
+against every string column as described in utils/token_index.py.
 
 Usage in your app.py or similar:
     from search_directive import SearchDirective
@@ -25,6 +27,8 @@ import re
 import pandas as pd
 from typing import List, Optional
 
+from utils import filter_mask
+
 logger = logging.getLogger(__name__)
 
 
@@ -71,9 +75,10 @@ class SearchDirective:
     def run_search(self, search_tokens: List[str], df: pd.DataFrame) -> pd.DataFrame:
         """
         Given a list of token strings (e.g. ['status', '=', '"success"', 'x', '>', '5']),
-        build an AST, convert it to a Pandas query, and apply it to 'df'.
+        build an AST, convert it to a filter expression, and apply it to 'df'.
 
-        Returns a filtered DataFrame or empty DataFrame if errors occur or if nothing matches.
+        Returns a filtered DataFrame, an empty DataFrame if the tokens cannot be
+        parsed, or no rows of 'df' if the filter fails or nothing matches.
         """
 
         if not search_tokens:
@@ -93,25 +98,22 @@ class SearchDirective:
             parser = self.Parser(token_list)
             ast_root = parser.parse_expression()
 
-            # 3) Convert AST -> Pandas query string
-            pandas_query_str = self.ast_to_query(ast_root)
-            if not pandas_query_str:
-                pandas_query_str = "True"
-
-            logging.info(f"[i] Generated Pandas query: {pandas_query_str}")
+            # 3) AST -> filter expression; quoted strings standing alone become free-text terms
+            expression = self.to_expression(ast_root)
+            logging.info(f"[i] Generated filter: {filter_mask.describe(expression)}")
 
             # 4) Apply the filter
-            if pandas_query_str == "True":
-                logging.info("[i] Pandas query is 'True'; no filtering needed.")
+            if expression == ("value", True):
+                logging.info("[i] Filter is 'True'; no filtering needed.")
                 return df
 
             try:
-                filtered_df = df.query(pandas_query_str)
+                filtered_df = filter_mask.apply(df, expression)
                 logging.info(f"[i] DataFrame filtered. Rows before: {len(df.index)}; after: {len(filtered_df.index)}.")
                 return filtered_df
             except Exception as ex:
-                logging.error(f"[x] Error while applying Pandas query: {ex}")
-                return pd.DataFrame()
+                logging.error(f"[x] Error while applying filter: {ex}")
+                return df.iloc[0:0]
 
         except Exception as e:
             logging.error(f"[x] Exception in run_search: {str(e)}")
@@ -207,7 +209,12 @@ class SearchDirective:
                 return node
 
             left_operand = self.parse_operand()
-            if self.has_next() and self.current_token().type == SearchDirective.TokenType.OPERATOR:
+            # AND/OR after a bare operand (e.g. a free-text term) belong to the enclosing expression
+            if (
+                self.has_next()
+                and self.current_token().type == SearchDirective.TokenType.OPERATOR
+                and self.current_token().value not in ("AND", "OR")
+            ):
                 op = self.current_token().value
                 self.get_next_token()  # consume operator
                 if op == "IN":
@@ -283,7 +290,7 @@ class SearchDirective:
         @staticmethod
         def normalize_literal(tok: 'SearchDirective.Token') -> str:
             """
-            Convert a token into a string suitable for Pandas query. For example:
+            Convert a token into its normalized literal text. For example:
             - Strings get single-quoted
             - True/False remain unquoted booleans
             - Numbers remain as-is
@@ -342,40 +349,52 @@ class SearchDirective:
             return False
 
     # ------------------------------------------------------------------
-    # AST -> Pandas Query
+    # AST -> filter expression (see utils/filter_mask.py)
     # ------------------------------------------------------------------
-    def ast_to_query(self, node: 'ASTNode') -> str:
+    @staticmethod
+    def literal_value(text: str):
+        """
+        Convert a normalized literal back to a Python value: quoted strings
+        are unescaped, digits become int and True/False become bool.
+        """
+        if len(text) >= 2 and text[0] == text[-1] == "'":
+            return text[1:-1].replace("\\'", "'")
+        if text in ("True", "False"):
+            return text == "True"
+        if text.isdigit():
+            return int(text)
+        return text
+
+    def to_expression(self, node: 'ASTNode'):
+        """
+        Build the expression tree evaluated by utils.filter_mask (mirrors the
+        C++ 'filter_expression'). A quoted string standing alone as a
+        condition is a free-text term.
+        """
         if node.node_type == self.ASTNodeType.COMPARISON:
-            op_map = {
-                "=": "==",
-                "!=": "!=",
-                "<": "<",
-                ">": ">",
-                "<=": "<=",
-                ">=": ">="
-            }
-            left_str = self.ast_to_query(node.left)
-            right_str = self.ast_to_query(node.right)
-            op = op_map.get(node.operator_)
-            if not op:
+            if node.operator_ not in ("=", "!=", "<", ">", "<=", ">="):
                 raise ValueError(f"[x] Unknown operator: {node.operator_}")
-            return f"({left_str} {op} {right_str})"
+            return ("cmp", node.operator_, self.to_operand(node.left), self.to_operand(node.right))
 
         elif node.node_type == self.ASTNodeType.LOGICAL_OP:
-            left_str = self.ast_to_query(node.left)
-            right_str = self.ast_to_query(node.right)
-            return f"({left_str} {node.operator_} {right_str})"
+            kind = "or" if node.operator_ == "|" else "and"
+            return (kind, self.to_expression(node.left), self.to_expression(node.right))
 
         elif node.node_type == self.ASTNodeType.IN_CLAUSE:
-            vals = ", ".join(node.values)
-            return f"({node.identifier} in [{vals}])"
-
-        elif node.node_type == self.ASTNodeType.IDENTIFIER:
-            return node.literal_or_ident
+            return ("in", node.identifier, [self.literal_value(v) for v in node.values])
 
         elif node.node_type == self.ASTNodeType.LITERAL:
-            return node.literal_or_ident
+            text = node.literal_or_ident or ""
+            if len(text) >= 2 and text[0] == text[-1] == "'":
+                return ("term", self.literal_value(text))
+            return self.to_operand(node)
 
-        else:
-            raise ValueError("[x] Unknown node type in ast_to_query.")
+        return self.to_operand(node)
 
+    def to_operand(self, node: 'ASTNode'):
+        """Convert an identifier or literal operand into a filter expression leaf."""
+        if node.node_type == self.ASTNodeType.IDENTIFIER:
+            return ("field", node.literal_or_ident)
+        elif node.node_type == self.ASTNodeType.LITERAL:
+            return ("value", self.literal_value(node.literal_or_ident))
+        raise ValueError("[x] Unknown node type in to_operand.")
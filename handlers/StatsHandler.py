@@ -11,6 +11,8 @@ import re
 import numpy as np
 import pandas as pd
 
+from utils.categoricals import plain
+
 logger = logging.getLogger(__name__)
 
 
@@ -33,6 +35,23 @@ class StatsHandler:
         clause = " ".join(stats_tokens[1:]).strip()
         logging.info(f"[i] Running {directive} with clause: {clause}")
 
+        specs, group_fields = self.parse_clause(clause)
+
+        if directive == 'stats':
+            return self._do_stats(df, specs, group_fields)
+        elif directive == 'eventstats':
+            return self._do_eventstats(df, specs, group_fields)
+        elif directive == 'streamstats':
+            return self._do_streamstats(df, specs, group_fields)
+        else:
+            logging.error(f"[x] Unsupported directive: {directive}")
+            raise ValueError(f"Unsupported directive '{directive}'")
+
+    def parse_clause(self, clause):
+        """
+        Splits a stats clause such as 'count, max(x) as top by host' into
+        (specs, group_fields).
+        """
         # Parse BY clause and function specs
         parts = re.split(r"\s+by\s+", clause, flags=re.IGNORECASE, maxsplit=1)
         funcs_str = parts[0].strip()
@@ -48,16 +67,7 @@ class StatsHandler:
         if len(set(aliases)) != len(aliases):
             logging.error(f"[x] Duplicate aliases detected: {aliases}")
             raise ValueError(f"Duplicate alias names in stats specs: {aliases}")
-
-        if directive == 'stats':
-            return self._do_stats(df, specs, group_fields)
-        elif directive == 'eventstats':
-            return self._do_eventstats(df, specs, group_fields)
-        elif directive == 'streamstats':
-            return self._do_streamstats(df, specs, group_fields)
-        else:
-            logging.error(f"[x] Unsupported directive: {directive}")
-            raise ValueError(f"Unsupported directive '{directive}'")
+        return specs, group_fields
 
     def _parse_function_specs(self, funcs_str):
         """
@@ -101,7 +111,7 @@ class StatsHandler:
             if missing:
                 logging.error(f"[x] Missing group fields: {missing}")
                 raise KeyError(f"Group fields not in DataFrame: {missing}")
-            grouped = df.groupby(group_fields)
+            grouped = df.groupby(group_fields, observed=True)
             agg_dict = {}
             for s in specs:
                 agg_dict[s['alias']] = pd.NamedAgg(
@@ -135,14 +145,14 @@ class StatsHandler:
             if func == 'count' and fld is None:
                 if group_fields:
                     first_col = df.columns[0]
-                    out[alias] = df.groupby(group_fields)[first_col].transform('count')
+                    out[alias] = df.groupby(group_fields, observed=True)[first_col].transform('count')
                 else:
                     out[alias] = len(df)
                 logging.debug(f"[DEBUG] eventstats count() as {alias}")
             else:
                 aggfunc = self._agg_map(func, fld)
                 if group_fields:
-                    out[alias] = df.groupby(group_fields)[fld].transform(aggfunc)
+                    out[alias] = df.groupby(group_fields, observed=True)[fld].transform(aggfunc)
                 else:
                     out[alias] = aggfunc(df[fld])
                 logging.debug(f"[DEBUG] eventstats '{alias}' computed")
@@ -158,7 +168,7 @@ class StatsHandler:
         for s in specs:
             if s['func'] == 'count' and s['field'] is None:
                 if group_fields:
-                    out[s['alias']] = df.groupby(group_fields).cumcount() + 1
+                    out[s['alias']] = df.groupby(group_fields, observed=True).cumcount() + 1
                 else:
                     out[s['alias']] = np.arange(1, len(df) + 1)
                 logging.debug(f"[DEBUG] streamstats count() as {s['alias']}")
@@ -207,7 +217,7 @@ class StatsHandler:
                 logging.error(f"[x] Unsupported streamstats func: {func}")
                 raise ValueError(f"Unsupported streamstats func '{func}'")
             if group_fields:
-                out[alias] = out.groupby(group_fields)[fld].transform(cumfunc)
+                out[alias] = out.groupby(group_fields, observed=True)[fld].transform(cumfunc)
             else:
                 out[alias] = cumfunc(out[fld])
             logging.debug(f"[DEBUG] Computed streamstats '{alias}'")
@@ -221,8 +231,9 @@ class StatsHandler:
             'sum': lambda s: s.sum(),
             'avg': lambda s: s.mean(),
             'mean': lambda s: s.mean(),
-            'min': lambda s: s.min(),
-            'max': lambda s: s.max(),
+            # Unordered categoricals have no min/max, their values do
+            'min': lambda s: plain(s).min(),
+            'max': lambda s: plain(s).max(),
             'median': lambda s: s.median(),
             'mode': lambda s: s.mode().iloc[0] if not s.mode().empty else np.nan,
             'dc': lambda s: s.nunique(),
@@ -232,7 +243,7 @@ class StatsHandler:
             'first': lambda s: s.iloc[0] if len(s) > 0 else np.nan,
             'latest': lambda s: s.iloc[-1] if len(s) > 0 else np.nan,
             'last': lambda s: s.iloc[-1] if len(s) > 0 else np.nan,
-            'range': lambda s: s.max() - s.min(),
+            'range': lambda s: plain(s).max() - plain(s).min(),
         }
         if func not in mapping:
             logging.error(f"[x] Unsupported stats func: {func}")
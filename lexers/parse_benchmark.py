@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Script: parse_benchmark.py
+Purpose: Compare full-LL parsing with the two-stage SLL/LL strategy of
+         lexers/query_parser.py over the queries in example_valid_complex_queries.yaml.
+
+ANTLR caches prediction DFAs per process, so each mode runs in a fresh process
+and the first pass over the queries (cold cache) is reported separately from
+the following rounds (warm cache).
+
+Usage Examples:
+    python -m lexers.parse_benchmark
+    python -m lexers.parse_benchmark --rounds 10
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import time
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUERIES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "example_valid_complex_queries.yaml")
+
+
+def load_queries(path):
+    with open(path, "r", encoding="utf-8") as fh:
+        return [entry["query"] for entry in yaml.safe_load(fh)["valid queries"]]
+
+
+def time_mode(queries, two_stage, rounds):
+    """Return ``(cold_seconds, warm_seconds_per_round)`` for one prediction mode."""
+    from lexers.query_parser import parse_query
+
+    timings = []
+    for _ in range(rounds + 1):
+        start = time.perf_counter()
+        for query in queries:
+            parse_query(query, two_stage=two_stage)
+        timings.append(time.perf_counter() - start)
+    return timings[0], sum(timings[1:]) / rounds
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark speakQuery parsing modes.")
+    arg_parser.add_argument("--queries", default=DEFAULT_QUERIES, help="YAML file with a 'valid queries' list")
+    arg_parser.add_argument("--rounds", type=int, default=5, help="warm rounds after the first pass")
+    args = arg_parser.parse_args()
+
+    queries = load_queries(args.queries)
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for label, two_stage in (("LL", False), ("SLL/LL", True)):
+        with context.Pool(1) as pool:
+            results[label] = pool.apply(time_mode, (queries, two_stage, max(1, args.rounds)))
+
+    print(f"{len(queries)} queries, {max(1, args.rounds)} warm round(s)")
+    print(f"{'mode':<8} {'cold total ms':>14} {'warm ms/query':>14}")
+    for label, (cold, warm) in results.items():
+        print(f"{label:<8} {cold * 1000:>14.1f} {warm * 1000 / len(queries):>14.2f}")
+    ll_warm, two_stage_warm = results["LL"][1], results["SLL/LL"][1]
+    print(f"warm speed-up: {ll_warm / two_stage_warm:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Module: query_parser.py
+Purpose: Parses speakQuery text with ANTLR's two-stage prediction strategy.
+
+The generated parser defaults to full-LL prediction, which keeps full parser
+context while resolving every decision and is slow in the pure-Python
+runtime.  ``parse_query`` first parses with SLL prediction and a bail-out
+error strategy, which is much cheaper and gives the same tree whenever it
+succeeds.  Only when SLL reports a syntax error is the input parsed again
+with full LL and the default error strategy, so genuinely invalid queries are
+reported and recovered from exactly as before.
+"""
+
+import logging
+
+import antlr4
+from antlr4.atn.PredictionMode import PredictionMode
+from antlr4.error.ErrorListener import ConsoleErrorListener
+from antlr4.error.ErrorStrategy import BailErrorStrategy, DefaultErrorStrategy
+from antlr4.error.Errors import ParseCancellationException
+
+from lexers.antlr4_active.speakQueryLexer import speakQueryLexer
+from lexers.antlr4_active.speakQueryParser import speakQueryParser
+
+logger = logging.getLogger(__name__)
+
+
+def parse_query(query, two_stage=True):
+    """Parse ``query`` and return ``(tree, parser)``.
+
+    ``parser.getNumberOfSyntaxErrors()`` reports the errors of the parse that
+    produced ``tree``.  ``two_stage=False`` parses with full LL only.
+    """
+    lexer = speakQueryLexer(antlr4.InputStream(query))
+    stream = antlr4.CommonTokenStream(lexer)
+    parser = speakQueryParser(stream)
+    if not two_stage:
+        return parser.speakQuery(), parser
+
+    parser._interp.predictionMode = PredictionMode.SLL
+    parser.removeErrorListeners()
+    parser._errHandler = BailErrorStrategy()
+    try:
+        return parser.speakQuery(), parser
+    except ParseCancellationException:
+        logging.debug("[DEBUG] SLL prediction failed, parsing again with full LL.")
+
+    stream.seek(0)
+    parser.reset()
+    parser.addErrorListener(ConsoleErrorListener.INSTANCE)
+    parser._errHandler = DefaultErrorStrategy()
+    parser._interp.predictionMode = PredictionMode.LL
+    return parser.speakQuery(), parser
@@ -16,7 +16,7 @@ import re
 from pathlib import Path
 
 from antlr4.tree.Tree import TerminalNodeImpl
-from antlr4 import ParseTreeListener
+from antlr4 import ParseTreeListener, Token
 
 # import pyarrow.dataset as ds
 # import pyarrow.compute as pc
@@ -34,6 +34,10 @@ from utils.tree_helpers import (
     flatten_list,
     flatten_with_parens,
 )
+from utils.pipeline_analysis import DEFAULT_HEAD_COUNT, head_limit, required_fields
+from utils import metadata_stats, query_plan, streaming
+from utils.query_cache import CompiledQuery
+from utils.query_plan import Directive
 
 # Import speakQueryParser (support for relative or absolute import)
 if "." in __name__:
@@ -84,6 +88,9 @@ except ImportError as e:
 try:
     cpp_index_module = resolve_and_import_so(cpp_index_path, "cpp_index_call")
     process_index_calls = cpp_index_module.process_index_calls
+    # Older builds do not expose planning; metadata-only answers are then skipped
+    plan_index_files = getattr(cpp_index_module, "plan_index_files", None)
+    scan_index_batches = getattr(cpp_index_module, "scan_index_batches", None)
     logging.info("[i] Successfully loaded 'cpp_index_call' module.")
 except ImportError as e:
     logging.error(f"[x] Could not import cpp_index_call: {e}")
@@ -107,10 +114,10 @@ except ImportError as e:
 class speakQueryListener(ParseTreeListener):
     """Listener used by ``speakQueryParser`` to execute pipeline commands.
 
-    The initial index clause is parsed by ANTLR, but the remainder of the
-    pipeline is tokenised manually.  Each segment is looked up in
-    ``_command_map`` and the corresponding ``_cmd_*`` method is invoked to
-    transform the running ``pandas.DataFrame``.
+    The whole query is parsed by ANTLR.  Each pipeline directive is taken
+    from its parse context, looked up in ``_command_map`` and the
+    corresponding ``_cmd_*`` method is invoked to transform the running
+    ``pandas.DataFrame``.
     """
     def __init__(self, cleaned_query):
         self.current_search_cmd_tokens = None
@@ -206,13 +213,15 @@ class speakQueryListener(ParseTreeListener):
     def exitSpeakQuery(self, ctx: speakQueryParser.SpeakQueryContext):
         """Top level exit hook used by the parser.
 
-        The initial index expression is parsed via ANTLR.  All subsequent
-        pipeline commands (``| stats ...``, ``| eval ...`` etc.) are currently
-        tokenised manually.  The grammar does define rules for these
-        directives but the listener does not yet utilise those contexts for
-        execution.  ``exitSpeakQuery`` therefore re-tokenises the raw query and
-        dispatches the recognised commands itself.  The list of commands handled
-        this way is documented in ``_apply_command``.
+        The initial index expression and every pipeline command
+        (``| stats ...``, ``| eval ...`` etc.) come from the parse tree:
+        ``compile`` reads the parser's tokens once into a ``Directive`` per
+        command and plans them, and ``execute`` dispatches the planned
+        commands itself.  The list of commands handled this way is documented
+        in ``_apply_command``.
+
+        Callers holding a cached ``CompiledQuery`` (see ``utils.query_cache``)
+        call ``execute`` directly and skip parsing entirely.
 
         Returns the resulting ``pandas.DataFrame`` or ``None``.
         """
@@ -224,14 +233,86 @@ class speakQueryListener(ParseTreeListener):
         # Validate any SEARCH directives early
         self.validate_exceptions(ctx)
 
-        # Flatten to get tokens for index vs. transformations
-        flattened = ctx_flatten(self.root_ctx, self.extract_screenshot_of_ctx)
+        return self.execute(self.compile(self.root_ctx))
+
+    def compile(self, ctx):
+        """Walk a parsed query once into the ``CompiledQuery`` that ``execute`` runs.
+        Directives are cut at the parser's own top-level PIPE tokens, so a pipe inside a quoted string
+        or a bracketed subsearch never splits a command, and a directive the grammar only partly
+        matches keeps all of its tokens. Only strings are kept, never parse-tree contexts, so the
+        result can be cached and shared.
+        """
+        # Flattened tokens drive inputlookup/loadjob queries
+        flattened = ctx_flatten(ctx, self.extract_screenshot_of_ctx)
         tokens = [t for t in flattened if t != "<EOF>"]
 
         # Skip a leading pipe if present
         if tokens and tokens[0] == "|":
             tokens = tokens[1:]
 
+        initial = ctx.initialSequence()
+        head, *lines = self._pipe_lines(ctx)
+        directives = [
+            self._directive(line) for line in lines
+            if line and (initial is None or line[0].tokenIndex > initial.stop.tokenIndex)
+        ]
+
+        plan = None
+        if initial is not None and initial.inputlookupInit() is None and initial.loadjobInit() is None:
+            index_tokens = ctx_flatten(initial, self.extract_screenshot_of_ctx)
+            # Recovered syntax errors leave tokens the parser invented or skipped
+            expected = "".join(token.text for token in head).replace(" ", "")
+            if "".join(index_tokens).replace(" ", "") == expected:
+                # Push filters into the scan, drop dead evals, turn sort+head into top-K, ...
+                plan = query_plan.optimize(query_plan.build(index_tokens, directives))
+
+        return CompiledQuery(self.original_query, tuple(tokens), tuple(directives), plan)
+
+    @staticmethod
+    def _pipe_lines(ctx):
+        """Split the parser's tokens at top-level pipes into lists of tokens, whitespace dropped.
+        The first list holds what precedes the first pipe, i.e. the initial index call.
+        """
+        stream = ctx.parser.getTokenStream()
+        stream.fill()
+        lines, depth = [[]], 0
+        for token in stream.tokens:
+            if token.type == Token.EOF or token.channel != Token.DEFAULT_CHANNEL or not token.text.strip():
+                continue
+            if token.type == speakQueryParser.PIPE and depth == 0:
+                lines.append([])
+                continue
+            if token.type == speakQueryParser.LBRACK:
+                depth += 1
+            elif token.type == speakQueryParser.RBRACK:
+                depth = max(depth - 1, 0)
+            lines[-1].append(token)
+        return lines
+
+    @staticmethod
+    def _directive(line):
+        """Return the ``Directive`` for the tokens of one ``| command ...`` line.
+        search/where, eval and stats-like directives keep the parser's tokens; the other handlers
+        receive the shell-style split of the directive's text, quoted literals preserved.
+        """
+        text = line[0].getInputStream().getText(line[0].start, line[-1].stop)
+        cmd = text.split(None, 1)[0].split("(")[0].lower()
+        if cmd in ("search", "where", "eval", "stats", "eventstats", "streamstats"):
+            seg_tokens = [token.text for token in line]
+            if cmd in ("stats", "eventstats", "streamstats"):
+                seg_tokens = speakQueryListener.normalize_tokens(seg_tokens)
+        else:
+            try:
+                seg_tokens = shlex.split(text)
+            except ValueError as e:
+                logging.error(f"[x] Failed to tokenize directive '{text}': {e}")
+                raise
+        return Directive(cmd, text, tuple(seg_tokens))
+
+    def execute(self, compiled):
+        """Run a ``CompiledQuery`` and return the resulting ``pandas.DataFrame`` or ``None``."""
+        tokens = list(compiled.tokens)
+
         # --- inputlookup handling ---
         if tokens and tokens[0].lower() == "inputlookup":
             filename = tokens[1].strip('"').strip()
@@ -273,66 +354,148 @@ class speakQueryListener(ParseTreeListener):
                 raise
             return self.main_df
 
-        # --- index call only? ---
-        try:
-            first_pipe = tokens.index("|")
-        except ValueError:
-            # no pipe = pure index call
-            combined = "".join(tokens).replace(" ", "")
-            if combined == self.original_index_call:
-                logging.info("[i] Executing index call only.")
-                self.main_df = process_index_calls(tokens)
-            else:
-                logging.warning("[!] Tokens did not match original index call.")
+        plan = compiled.plan
+        consumed = 0
+        if plan is None:
+            logging.warning("[!] Index call tokens mismatch expected index call.")
+            steps = query_plan.build([], compiled.directives).steps
+        elif not plan.steps:
+            logging.info("[i] Executing index call only.")
+            self.main_df = process_index_calls(list(plan.scan.tokens))
             return self.main_df
-
-        # --- execute index call portion ---
-        index_tokens = tokens[:first_pipe]
-        combined_index = "".join(index_tokens).replace(" ", "")
-        if combined_index == self.original_index_call:
-            logging.info("[i] Executing index call portion.")
-            self.main_df = process_index_calls(index_tokens)
         else:
-            logging.warning("[!] Index call tokens mismatch expected index call.")
-
-        # --- transformations: re-tokenize raw query so we capture all BY fields ---
-        # Raw pipeline string = everything after first '|'
-        raw_pipeline = self.original_query.split("|", 1)[1]
-        # Split on any additional '|' to get each segment
-        segment_strs = [seg.strip() for seg in raw_pipeline.split("|") if seg.strip()]
-
-        valid_lines = ctx.validLine()
-        for i, seg_str in enumerate(segment_strs):
-            # Tokenize segment, preserving quoted literals
-            try:
-                seg_tokens = shlex.split(seg_str)
-            except ValueError as e:
-                logging.error(f"[x] Failed to tokenize segment '{seg_str}': {e}")
-                raise
-
-            cmd = seg_tokens[0].split("(")[0].lower()
-            logging.info(f"[i] Processing pipeline segment: {cmd}")
+            steps = plan.steps
+            index_tokens, segment_strs = list(plan.scan.tokens), plan.segments()
+            # Aggregates such as an unfiltered stats count need no column data at all
+            consumed = self._answer_from_metadata(index_tokens, segment_strs)
+            if consumed:
+                logging.info("[i] Index call answered from metadata; no files scanned.")
+            else:
+                # Only decode the columns the rest of the pipeline can observe
+                columns = required_fields(segment_strs)
+                if columns is not None:
+                    logging.info(f"[i] Projecting index scan to fields: {columns}")
+                # A leading head lets the scanner stop once enough rows match
+                limit = head_limit(segment_strs)
+                if limit is not None:
+                    logging.info(f"[i] Pushing head {limit} into the index scan.")
+                if limit is None:
+                    # Large scans run the leading commands batch by batch instead
+                    consumed = self._execute_streaming(index_tokens, steps, columns)
+                if not consumed:
+                    logging.info("[i] Executing index call portion.")
+                    self.main_df = process_index_calls(index_tokens, columns=columns, limit=limit)
+
+        for i, step in enumerate(steps):
+            if i < consumed:
+                continue
+            logging.info(f"[i] Processing pipeline segment: {step.command}")
+            self.main_df = self._run_segment(step.command, list(step.tokens), step.segment, step.limit)
 
-            if cmd in ("stats", "eventstats", "streamstats", "eval"):
-                try:
-                    dctx = valid_lines[i].directive()
-                    seg_tokens = ctx_flatten(dctx, self.extract_screenshot_of_ctx)
-                    if cmd in ("stats", "eventstats", "streamstats"):
-                        seg_tokens = speakQueryListener.normalize_tokens(seg_tokens)
-                except Exception as e:
-                    logging.error(f"[x] Failed to parse directive via context: {e}")
-                    raise
+        return self.main_df
 
+    def _run_segment(self, cmd, seg_tokens, seg_str, limit=None):
+        """Apply one pipeline segment to main_df, logging failures before re-raising.
+        ``limit`` is the top-K row count the optimizer attached to a sort step.
+        """
+        try:
+            if cmd == "sort" and limit is not None:
+                return self._cmd_sort(seg_tokens, seg_str, limit)
+            return self._apply_command(cmd, seg_tokens, seg_str)
+        except Exception as e:
+            logging.error(f"[x] Failure processing '{seg_str}': {e}")
+            raise
+
+    def _stream_consumer(self, cmd, seg_tokens):
+        """Return the bounded-memory consumer for a segment, or None if it needs the whole input."""
+        if cmd == "stats" and seg_tokens[0].lower() == "stats":
             try:
-                self.main_df = self._apply_command(cmd, seg_tokens, seg_str)
-            except Exception as e:
-                logging.error(f"[x] Failure processing '{seg_str}': {e}")
-                raise
+                specs, group_fields = self.stats_handler.parse_clause(" ".join(seg_tokens[1:]).strip())
+            except ValueError:
+                return None
+            if streaming.StatsAccumulator.supports(specs):
+                return streaming.StatsAccumulator(specs, group_fields)
+        elif cmd in ("head", "limit"):
+            count = seg_tokens[1] if len(seg_tokens) > 1 else str(DEFAULT_HEAD_COUNT)
+            if count.isdigit() and int(count) > 0:
+                return streaming.HeadLimit(int(count))
+        elif cmd == "dedup":
+            fields = streaming.dedup_fields(seg_tokens)
+            if fields:
+                return streaming.DedupFilter(fields)
+        return None
+
+    def _execute_streaming(self, index_tokens, plan_steps, columns):
+        """Run a large index call as a stream of row-group batches.
+        The leading streamable segments are applied to each batch and the next segment, if it is a
+        bounded consumer (stats, head, dedup), folds the batches into its result. main_df then holds
+        that result and the number of segments consumed is returned; 0 means nothing was streamed.
+        """
+        segment_strs = [step.segment for step in plan_steps]
+        if scan_index_batches is None or plan_index_files is None or not streaming.worth_streaming(segment_strs):
+            return 0
+        try:
+            planned = plan_index_files(index_tokens)
+            rows = streaming.planned_rows(planned)
+        except Exception as e:
+            logging.warning(f"[!] Could not size the index call, not streaming: {e}")
+            return 0
+        if rows < streaming.STREAMING_MIN_ROWS:
+            return 0
+        schema = streaming.planned_schema(planned, columns)
+        if schema is None:
+            logging.info("[i] Index files have incompatible schemas, not streaming.")
+            return 0
+
+        prefix = streaming.streamable_prefix(segment_strs)
+        steps = [(step.command, list(step.tokens)) for step in plan_steps[:prefix]]
+        consumer, consumed = None, prefix
+        if prefix < len(segment_strs):
+            consumer = self._stream_consumer(plan_steps[prefix].command, list(plan_steps[prefix].tokens))
+        if consumer is not None:
+            consumed += 1
+        elif not consumed:
+            # Neither a row-wise command nor a bounded consumer leads the pipeline
+            return 0
+        else:
+            consumer = streaming.Collector()
+        logging.info(f"[i] Streaming {rows} planned row(s) through {consumed} pipeline segment(s).")
+
+        batches = 0
+        for batch in scan_index_batches(index_tokens, columns=columns):
+            batches += 1
+            self.main_df = streaming.conform(batch, schema)
+            for i, (cmd, seg_tokens) in enumerate(steps):
+                self.main_df = self._run_segment(cmd, seg_tokens, segment_strs[i])
+            consumer.update(self.main_df)
+            if consumer.done:
+                logging.info(f"[i] Stream consumer satisfied after {batches} batch(es).")
+                break
+        self.main_df = consumer.result()
+        return consumed
 
-        return self.main_df
+    def _answer_from_metadata(self, index_tokens, segment_strs):
+        """Answer an unfiltered index call followed by a metadata-only ``stats``.
+        On success main_df holds the stats result and 1 is returned (the number of
+        segments consumed); otherwise 0 is returned and nothing is read.
+        """
+        if plan_index_files is None or not metadata_stats.is_unfiltered(index_tokens):
+            return 0
+        parsed = metadata_stats.parse_stats(segment_strs[0])
+        if parsed is None:
+            return 0
+        try:
+            result = metadata_stats.answer(plan_index_files(index_tokens), *parsed)
+        except Exception as e:
+            logging.warning(f"[!] Metadata-only stats failed, scanning instead: {e}")
+            return 0
+        if result is None:
+            return 0
+        self.main_df = result
+        return 1
 
     def _apply_command(self, cmd, seg_tokens, seg_str):
-        """Dispatch transformation commands parsed manually."""
+        """Dispatch a pipeline command to its handler."""
         handler = self._command_map.get(cmd)
         if handler:
             return handler(seg_tokens, seg_str)
@@ -353,14 +516,11 @@ class speakQueryListener(ParseTreeListener):
         return self.main_df
 
     # Individual command handlers
-    def _cmd_search(self, seg_tokens, seg_str):
+    def _cmd_search(self, seg_tokens, _):
         """Run a search or where clause.
-        seg_tokens is a list like ['search', 'status', '=', '200']; seg_str is the raw segment. Returns a DataFrame.
+        seg_tokens is the directive's token list from the parser, e.g. ['search', 'status', '=', '200']. Returns a DataFrame.
         """
-        expr = seg_str[len(seg_tokens[0].split("(")[0]):].strip()
-        pattern = r'"[^\"]*"|>=|<=|!=|=|>|<|\(|\)|,|\w+|\S'
-        tokens = re.findall(pattern, expr)
-        return self.search_cmd_handler.run_search(tokens, self.main_df)
+        return self.search_cmd_handler.run_search(seg_tokens[1:], self.main_df)
 
     def _cmd_stats(self, seg_tokens, _):
         """Process stats/eventstats/streamstats.
@@ -390,12 +550,15 @@ class speakQueryListener(ParseTreeListener):
         count = int(seg_tokens[1]) if len(seg_tokens) > 1 else 5
         return self.general_handler.head_call(self.main_df, count, "head")
 
-    def _cmd_sort(self, seg_tokens, _):
+    def _cmd_sort(self, seg_tokens, _, limit=None):
         """Sort the DataFrame by columns. seg_tokens like ["sort", "-field"].
-        Direction determined by sign on first column. Returns sorted DataFrame.
+        Direction determined by sign on first column. Returns sorted DataFrame,
+        or only its first ``limit`` rows when the optimizer planned a top-K.
         """
         cols = [c.lstrip("+-").strip(",") for c in seg_tokens[1:]]
         direction = "+" if seg_tokens[1].startswith("+") else "-"
+        if limit is not None:
+            return self.general_handler.top_k_by_columns(self.main_df, cols, limit, direction)
         return self.general_handler.sort_df_by_columns(self.main_df, cols, direction)
 
     def _cmd_reverse(self, seg_tokens, _):
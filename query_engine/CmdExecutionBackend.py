@@ -1,6 +1,5 @@
 #!/usr/bin/env python3
 import logging
-import antlr4
 import uuid
 import time
 import sys
@@ -12,11 +11,12 @@ from pathlib import Path
 # sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
 
-from lexers.antlr4_active.speakQueryLexer import speakQueryLexer
-from lexers.antlr4_active.speakQueryParser import speakQueryParser
+import lexers.speakQueryListener as listener_module
+from lexers.query_parser import parse_query
 from lexers.speakQueryListener import speakQueryListener
 
 from handlers.JavaHandler import JavaHandler
+from utils import categoricals, query_cache, result_cache
 from validation.SavedSearchValidation import SavedSearchValidation
 
 CURRENT_SCRIPT_DIR = Path(__file__).resolve().parent
@@ -31,11 +31,11 @@ conn = ''
 logger = logging.getLogger(__name__)
 
 
-def run_query_and_return_results_df(query):
+def run_query_and_return_results_df(query, use_cache=True):
     logging.info(f"[i] Query received: {repr(query)}")
     try:
         query = query.replace("\r\n", "\n")  # Clean newlines from non-unix formats
-        result_df = execute_query(f'{query}\n')
+        result_df = execute_query(f'{query}\n', use_cache=use_cache)
         logging.info(f"[i] Query result before processing: {result_df}")
 
         if result_df is None:
@@ -62,22 +62,60 @@ def run_query_and_return_results_df(query):
         return None
 
 
-def execute_query(_speak_query):
+def compile_query(_speak_query):
+    """Lex and parse a query and flatten its parse tree into a CompiledQuery."""
     logging.info("[i] Starting the parsing process.")
+    tree, parser = parse_query(_speak_query)
+    compiled = speakQueryListener(_speak_query).compile(tree)
+    return compiled._replace(syntax_errors=parser.getNumberOfSyntaxErrors())
+
+
+def index_inputs(compiled):
+    """Fingerprint the files every index call of a CompiledQuery resolves to.
+    Returns None when the files cannot be listed, in which case the result is not cached.
+    """
+    plan_index_files = listener_module.plan_index_files
+    if plan_index_files is None:
+        return None
+    calls = [["index", "=", pattern] for pattern in result_cache.index_patterns(compiled.query)]
+    if compiled.plan is not None and "index" not in compiled.plan.scan.tokens:
+        # Without an index clause the scanner reads its default index
+        calls.append([])
+    try:
+        paths = [planned["path"] for call in calls for planned in plan_index_files(call)]
+    except Exception as e:
+        logging.warning(f"[!] Could not list the index files of the query, not caching its result: {e}")
+        return None
+    return result_cache.fingerprint(paths)
+
+
+def execute_query(_speak_query, use_cache=True):
     if not isinstance(_speak_query, str):
         raise ValueError("Query must be a string")
 
-    input_stream = antlr4.InputStream(_speak_query)
-    lexer = speakQueryLexer(input_stream)
-    stream = antlr4.CommonTokenStream(lexer)
-    parser = speakQueryParser(stream)
-    tree = parser.speakQuery()
-    listener = speakQueryListener(_speak_query)
-    walker = antlr4.ParseTreeWalker()
-    walker.walk(listener, tree)
+    # Repeated query text reuses the parse of its first run
+    compiled = query_cache.get_compiled(_speak_query, compile_query)
+
+    # Unchanged inputs give the result of the previous run
+    inputs = None
+    if use_cache and result_cache.is_cacheable(compiled.query):
+        inputs = index_inputs(compiled)
+    if inputs is not None:
+        cached = result_cache.lookup(compiled.query, inputs)
+        if cached is not None:
+            logging.info("[i] Returning cached result; none of the query's input files changed.")
+            return categoricals.decode(cached)
+
+    listener = speakQueryListener(compiled.query)
+    with result_cache.recording() as read_inputs:
+        listener.execute(compiled)
 
     # Assuming listener.main_df is the DataFrame that contains the query result
-    return listener.main_df if hasattr(listener, 'main_df') else pd.DataFrame()
+    result_df = listener.main_df if hasattr(listener, 'main_df') else pd.DataFrame()
+    if inputs is not None and isinstance(result_df, pd.DataFrame):
+        result_cache.store(compiled.query, result_df, inputs, read_inputs)
+    # Categoricals stay inside the engine; callers fill and serialize plain columns
+    return categoricals.decode(result_df) if isinstance(result_df, pd.DataFrame) else result_df
 
 
 def sanitize_dataframe(df):
@@ -97,8 +135,8 @@ def save_dataframe(request_id, df):
 
 
 # Add this function to allow direct import and usage in other scripts
-def process_query(query):
-    return run_query_and_return_results_df(query)
+def process_query(query, use_cache=True):
+    return run_query_and_return_results_df(query, use_cache=use_cache)
 
 
 # If this script is executed directly, call the main function
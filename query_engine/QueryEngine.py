@@ -25,6 +25,9 @@ try:
     from CmdExecutionBackend import process_query  # Import the process_query function directly
     from Alert import email_results  # Import the email_results function from Alert.py
     from functionality.ParquetEpochAdder import ParquetEpochAdder  # Import ParquetEpochAdder
+    from utils.index_manifest import record_file  # Keep the index manifest current
+    from utils.epoch_utils import add_epoch_column  # Typed _epoch for stored results
+    from utils.parquet_writer import RESULTS_PROFILE, write_frame  # Shared parquet layout
 except Exception as e:
     raise e
 
@@ -62,6 +65,7 @@ def process_parquet_files(parquet_files, date_field_name='timestamp'):
         try:
             adder = ParquetEpochAdder(parquet_file, date_field_name)
             adder.process(output_file_path=parquet_file)  # Overwrite the original file
+            record_file(parquet_file)
             logger.info(f"Processed Parquet file: {parquet_file}")
         except Exception as e:
             logger.error(f"Error processing Parquet file {parquet_file}: {str(e)}")
@@ -94,7 +98,10 @@ async def execute_query(task_id, query, title, retry_count=0):
 
             # Save the result dataframe to a Parquet file (efficient storage)
             try:
-                result_df.to_parquet(saved_search_path, index=False, compression='gzip')
+                # Store a typed _epoch when the results carry a time field
+                add_epoch_column(result_df)
+                write_frame(result_df, saved_search_path, RESULTS_PROFILE)
+                record_file(saved_search_path)
                 logger.info(f"[i] Task {task_id} - {title} results saved to {saved_search_path}.")
             except Exception as e:
                 logger.error(f"[x] Error saving results for task {task_id} - {title}: {str(e)}")
@@ -37,6 +37,8 @@ import time
 import uuid
 import logging
 
+from utils import query_cache, result_cache
+
 api_bp = Blueprint('api_bp', __name__)
 
 BAN_THRESHOLD = 5
@@ -102,8 +104,11 @@ def api_query():
         return jsonify({'status': 'error', 'message': 'Expected JSON payload.'}), 400
 
     query_str = data.get('query')
+    use_cache = result_cache.cache_requested(data.get('cache', True))
     try:
-        future = app.config['TASK_QUEUE'].submit(execute_speakQuery, query_str)
+        # Identical queries submitted while this one is queued or running share its result
+        key = (query_cache.normalize_query(str(query_str or '')), use_cache)
+        future = app.config['TASK_QUEUE'].submit_shared(key, execute_speakQuery, query_str, use_cache=use_cache)
         result_df = future.result()
         if result_df is None or result_df.empty:
             return jsonify({'status': 'error', 'message': 'No data returned from query.'}), 200
@@ -134,6 +139,16 @@ def api_query():
         return jsonify({'status': 'error', 'message': str(exc)}), 500
 
 
+@api_bp.route('/api/query_cache', methods=['GET'])
+def api_query_cache():
+    """Return entry and hit/miss counts of the compiled query and query result caches."""
+    return jsonify({
+        'status': 'success',
+        'cache': query_cache.cache_info(),
+        'results': result_cache.cache_info(),
+    }), 200
+
+
 @api_bp.route('/api/saved_search', methods=['POST'])
 @login_required
 def api_create_saved_search():
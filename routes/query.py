@@ -7,6 +7,9 @@ import uuid
 import logging
 import os
 
+from utils import result_cache
+from utils.query_cache import normalize_query
+
 query_bp = Blueprint('query_bp', __name__)
 
 @query_bp.route('/check_title_unique', methods=['POST'])
@@ -52,7 +55,12 @@ def run_query():
     logging.info(f"[i] Query received: {query_str}")
 
     try:
-        result_df = execute_speakquery(data.get('query'))
+        use_cache = result_cache.cache_requested(data.get('cache', True))
+        # Identical queries submitted while this one runs share its result
+        key = (normalize_query(str(query_str or '')), use_cache)
+        result_df = app.config['TASK_QUEUE'].single_flight.run(
+            key, execute_speakquery, data.get('query'), use_cache=use_cache
+        )
         logging.info(f"[i] Query result before processing: {result_df}")
 
         if result_df is None or result_df.empty:
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask import current_app as app
 from utils.auth import admin_required
+from utils.index_layout import list_index_settings, set_index_settings
 import sqlite3
 import logging
 
@@ -77,3 +78,34 @@ def update_settings():
         logging.error(f"[x] Error updating settings: {str(e)}")
         return jsonify({'status': 'error', 'message': 'Failed to update settings.'}), 500
 
+
+
+@settings_bp.route('/get_index_settings', methods=['GET'])
+@admin_required
+def get_index_settings_route():
+    try:
+        settings = list_index_settings(db_path=app.config['SCHEDULED_INPUTS_DB'])
+        return jsonify({'status': 'success', 'index_settings': settings}), 200
+    except Exception as e:
+        logging.error(f"[x] Error fetching index settings: {str(e)}")
+        return jsonify({'status': 'error', 'message': 'Failed to fetch index settings.'}), 500
+
+
+@settings_bp.route('/update_index_settings', methods=['POST'])
+@admin_required
+def update_index_settings_route():
+    data = request.json or {}
+    index_name = data.get('index')
+    settings = data.get('settings')
+    if not index_name or not isinstance(settings, dict):
+        return jsonify({'status': 'error', 'message': 'An index and its settings are required.'}), 400
+    if '..' in str(index_name).split('/'):
+        return jsonify({'status': 'error', 'message': 'Invalid index name.'}), 400
+    try:
+        stored = set_index_settings(index_name, db_path=app.config['SCHEDULED_INPUTS_DB'], **settings)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        logging.error(f"[x] Error updating index settings: {str(e)}")
+        return jsonify({'status': 'error', 'message': 'Failed to update index settings.'}), 500
+    return jsonify({'status': 'success', 'index_settings': stored}), 200
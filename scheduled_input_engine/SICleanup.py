@@ -7,6 +7,8 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 import time
 
+from utils.index_manifest import forget_file
+
 # Logger setup
 logger = logging.getLogger(__name__)
 
@@ -42,6 +44,7 @@ def delete_oldest_file(directory):
             if file.is_file():
                 logger.info(f"[i] Deleting file {file} from {directory}")
                 file.unlink()
+                forget_file(file)
                 return
     except Exception as e:
         logger.error(f"[x] Error deleting file in {directory}: {str(e)}")
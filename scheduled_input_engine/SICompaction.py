@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""Merge the many small parquet files that scheduled inputs leave in indexes/.
+
+Every non-overwriting scheduled input or repo script run adds a small file, so
+busy indexes accumulate thousands of them and per-file overhead dominates
+scans.  :func:`compact_indexes` merges small files of the same directory into
+larger files written with the index's parquet writer profile (by default
+sorted by ``_epoch``, zstd, 128K-row row groups).
+
+The swap is safe for concurrent readers: the sources are first marked in the
+index manifest as superseded by the new file, the new file is then renamed into
+place, and the index scanner skips superseded files whenever their replacement
+is also a candidate.  The sources themselves are only deleted by
+:func:`purge_superseded` once the replacement is older than a grace period, so
+scans that listed the directory before the swap can still read them.
+"""
+
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from pathlib import Path
+
+from utils.index_layout import profile_for_path
+from utils.index_manifest import (
+    MANIFEST_DB,
+    clear_superseded,
+    forget_file,
+    mark_superseded,
+    record_file,
+    superseded_entries,
+)
+from utils.parquet_writer import write_table
+
+# Logger setup
+logger = logging.getLogger(__name__)
+
+# Configuration (default values, configurable)
+CURRENT_SCRIPT_DIR = Path(__file__).parent.resolve()
+INDEXES_DIR = CURRENT_SCRIPT_DIR.parent / 'indexes'  # Root indexes directory
+SCHEDULED_INPUTS_DB = CURRENT_SCRIPT_DIR.parent / 'scheduled_inputs.db'
+SMALL_FILE_BYTES = 16 * 1024 ** 2  # Files below this size are compaction candidates
+TARGET_FILE_BYTES = 256 * 1024 ** 2  # Stop adding inputs to a merged file past this size
+MIN_FILES_TO_COMPACT = 4  # Leave directories with fewer small files alone
+MIN_FILE_AGE_SECONDS = 300  # Never touch files that may still be being written
+SUPERSEDED_GRACE_SECONDS = 600  # Keep merged sources this long for in-flight scans
+
+
+def overwrite_directories(db_path=SCHEDULED_INPUTS_DB) -> set:
+    """Return index subdirectories written by inputs that overwrite their file.
+
+    Merging those files would keep stale copies of data that the input is
+    expected to replace, so they are never compacted.
+    """
+    dirs = set()
+    try:
+        with sqlite3.connect(db_path) as conn:
+            for table, column in (('scheduled_inputs', 'subdirectory'), ('repo_scripts', 'output_subdir')):
+                try:
+                    rows = conn.execute(f'SELECT {column} FROM {table} WHERE overwrite = 1').fetchall()
+                except sqlite3.Error:
+                    continue
+                dirs.update(Path(row[0] or '').as_posix().strip('/') for row in rows)
+    except sqlite3.Error as e:
+        logger.warning(f"[!] Could not read overwrite settings from {db_path}: {e}")
+    return dirs
+
+
+def find_compaction_groups(indexes_dir=INDEXES_DIR, skip_dirs=(), manifest_db=MANIFEST_DB, now=None) -> list:
+    """Return lists of small files to merge, each list from a single directory.
+
+    ``skip_dirs`` holds index subdirectories (relative POSIX paths) to leave alone.
+    """
+    indexes_dir = Path(indexes_dir)
+    now = time.time() if now is None else now
+    superseded = {entry['path'] for entry in superseded_entries(db_path=manifest_db)}
+    groups = []
+    for root, dirs, files in os.walk(indexes_dir):
+        dirs[:] = [d for d in dirs if d != 'archive']
+        rel_dir = Path(root).relative_to(indexes_dir).as_posix()
+        if rel_dir == '.':
+            rel_dir = ''
+        if rel_dir in skip_dirs:
+            continue
+
+        small = []
+        for name in files:
+            if not name.endswith('.parquet'):
+                continue
+            path = Path(root) / name
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            if st.st_size >= SMALL_FILE_BYTES or now - st.st_mtime < MIN_FILE_AGE_SECONDS:
+                continue
+            if str(path.resolve()) in superseded:
+                continue
+            small.append((st.st_mtime, st.st_size, path))
+
+        if len(small) < MIN_FILES_TO_COMPACT:
+            continue
+
+        small.sort()
+        group, group_bytes = [], 0
+        for _, size, path in small:
+            group.append(path)
+            group_bytes += size
+            if group_bytes >= TARGET_FILE_BYTES:
+                groups.append(group)
+                group, group_bytes = [], 0
+        if len(group) >= MIN_FILES_TO_COMPACT:
+            groups.append(group)
+    return groups
+
+
+def compact_files(paths, manifest_db=MANIFEST_DB) -> dict | None:
+    """Merge ``paths`` (all in one directory) into a single sorted parquet file.
+
+    Returns a summary of the work, or ``None`` when the files could not be
+    merged (for example because their schemas conflict).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    paths = [Path(p) for p in paths]
+    directory = paths[0].parent
+    input_bytes = sum(p.stat().st_size for p in paths)
+    try:
+        tables = [pq.read_table(p) for p in paths]
+        merged = pa.concat_tables(tables, promote_options='permissive')
+    except Exception as e:
+        logger.warning(f"[!] Skipping compaction of {len(paths)} file(s) in {directory}: {e}")
+        return None
+
+    # Drop per-file pandas metadata; it describes the original files' indexes
+    merged = merged.replace_schema_metadata(None)
+
+    final_path = directory / f"compacted_{int(time.time())}_{uuid.uuid4().hex[:8]}.parquet"
+    tmp_path = directory / f".{final_path.name}.tmp"
+    try:
+        write_table(merged, tmp_path, profile_for_path(final_path))
+        # Mark the sources before publishing so a scan sees either the sources
+        # alone or the merged file with its sources hidden, never both
+        mark_superseded(paths, final_path, db_path=manifest_db)
+        os.replace(tmp_path, final_path)
+    except Exception as e:
+        logger.error(f"[x] Compaction in {directory} failed: {e}")
+        tmp_path.unlink(missing_ok=True)
+        for path in paths:
+            clear_superseded(path, db_path=manifest_db)
+        return None
+
+    record_file(final_path, db_path=manifest_db)
+    logger.info(f"[i] Compacted {len(paths)} file(s) in {directory} into {final_path.name}")
+    return {
+        'compacted_file': str(final_path),
+        'source_files': [str(p) for p in paths],
+        'rows': merged.num_rows,
+        'input_bytes': input_bytes,
+        'output_bytes': final_path.stat().st_size,
+    }
+
+
+def purge_superseded(grace_seconds=SUPERSEDED_GRACE_SECONDS, manifest_db=MANIFEST_DB, now=None) -> list:
+    """Delete merged source files whose replacement is older than ``grace_seconds``.
+
+    Returns ``(deleted_file, reason)`` tuples like :func:`cleanup_indexes`.
+    Sources that changed since they were merged, or whose replacement has
+    disappeared, are made visible again instead of being deleted.
+    """
+    now = time.time() if now is None else now
+    deleted = []
+    for entry in superseded_entries(db_path=manifest_db):
+        source, replacement = Path(entry['path']), Path(entry['superseded_by'])
+        try:
+            st = source.stat()
+        except FileNotFoundError:
+            forget_file(source, db_path=manifest_db)
+            continue
+        if not replacement.exists() or st.st_size != entry['size'] or st.st_mtime != entry['mtime']:
+            clear_superseded(source, db_path=manifest_db)
+            continue
+        if now - replacement.stat().st_mtime < grace_seconds:
+            continue
+        source.unlink()
+        forget_file(source, db_path=manifest_db)
+        logger.info(f"[i] Deleted compacted source {source}")
+        deleted.append((str(source), f"compacted into {replacement.name}"))
+    return deleted
+
+
+def compact_indexes(indexes_dir=INDEXES_DIR, manifest_db=MANIFEST_DB, scheduled_inputs_db=SCHEDULED_INPUTS_DB):
+    """Compact every index directory and purge sources past their grace period.
+
+    Returns ``(compactions, deletions)`` where ``compactions`` is a list of
+    summaries from :func:`compact_files`.
+    """
+    compactions = []
+    try:
+        if not Path(indexes_dir).exists():
+            logger.info(f"[i] Indexes directory {indexes_dir} does not exist, skipping compaction.")
+            return [], []
+        deletions = purge_superseded(manifest_db=manifest_db)
+        skip_dirs = overwrite_directories(scheduled_inputs_db)
+        for group in find_compaction_groups(indexes_dir, skip_dirs=skip_dirs, manifest_db=manifest_db):
+            summary = compact_files(group, manifest_db=manifest_db)
+            if summary:
+                compactions.append(summary)
+        return compactions, deletions
+    except Exception as e:
+        logger.error(f"[x] Error during compaction: {str(e)}")
+        return compactions, []
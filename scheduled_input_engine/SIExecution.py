@@ -10,6 +10,11 @@ from RestrictedPython import compile_restricted
 from RestrictedPython.Guards import safe_builtins
 from RestrictedPython import utility_builtins
 
+from utils.epoch_utils import add_epoch_column as ensure_typed_epoch
+from utils.index_manifest import record_file
+from utils.index_layout import profile_for_path, write_index_frame
+from utils.parquet_writer import write_frame
+
 # Module logger
 logger = logging.getLogger(__name__)
 
@@ -34,21 +39,16 @@ class SIExecution:
     def add_epoch_column(self, df):
         """
         Adds the _epoch column to the DataFrame if it doesn't exist.
-        Uses the specified timestamp-like field to generate the epoch.
+        Uses the specified timestamp-like field to generate a typed int64 epoch so
+        queries never need to re-parse the date strings.
         """
-        if '_epoch' not in df.columns:
-            for field in self.timestamp_fields:
-                if field in df.columns:
-                    try:
-                        df['_epoch'] = pd.to_datetime(df[field], errors='coerce').astype(int) // 10**9
-                        logger.info(f"[i] Added _epoch column using {field} field.")
-                        break
-                    except Exception as e:
-                        logger.error(f"[x] Failed to parse {field} field into epoch: {e}")
-            if '_epoch' not in df.columns:
-                raise ValueError(f"None of the timestamp fields {self.timestamp_fields} could be parsed.")
-        else:
-            logger.info("[i] _epoch column already exists.")
+        try:
+            added = ensure_typed_epoch(df, self.timestamp_fields)
+        except Exception as e:
+            logger.error(f"[x] Failed to parse timestamp fields into epoch: {e}")
+            added = False
+        if not added:
+            raise ValueError(f"None of the timestamp fields {self.timestamp_fields} could be parsed.")
 
     def ensure_epoch_in_all_files(self):
         """
@@ -65,7 +65,8 @@ class SIExecution:
                         df = pd.read_parquet(file_path)
                         if '_epoch' not in df.columns:
                             self.add_epoch_column(df)
-                            df.to_parquet(file_path, index=False, compression='gzip')
+                            write_frame(df, file_path, profile_for_path(file_path))
+                            record_file(file_path)
                             logger.info(f"[i] Updated Parquet file {file_path} with _epoch column.")
                         else:
                             logger.info(f"[i] Parquet file {file_path} already contains _epoch column.")
@@ -195,7 +196,8 @@ class SIExecution:
                     # Add _epoch column if missing
                     self.add_epoch_column(result_df)
                     # Save the DataFrame
-                    result_df.to_parquet(self.output_path, index=False, compression='gzip')
+                    write_frame(result_df, self.output_path, profile_for_path(self.output_path))
+                    record_file(self.output_path)
                     logger.info(f"DataFrame saved to {self.output_path}")
                     return result_df
                 else:
@@ -236,22 +238,13 @@ class SIExecution:
                 raise ValueError("Invalid subdirectory path.")
 
             target_dir.mkdir(parents=True, exist_ok=True)
-            output_path = target_dir / output_filename
 
-            if output_path.exists():
-                if overwrite:
-                    result_df.to_parquet(output_path, index=False, compression='gzip')
-                    logger.info(f"Overwritten existing file at {output_path}.")
-                else:
-                    base, ext = os.path.splitext(output_filename)
-                    timestamp = int(time.time())
-                    new_filename = f"{base}_{timestamp}{ext}"
-                    output_path = target_dir / new_filename
-                    result_df.to_parquet(output_path, index=False, compression='gzip')
-                    logger.info(f"Saved results to {output_path}.")
-            else:
-                result_df.to_parquet(output_path, index=False, compression='gzip')
+            written = write_index_frame(
+                result_df, target_dir, output_filename, overwrite=overwrite, index_name=subdirectory
+            )
+            for output_path in written:
                 logger.info(f"Saved results to {output_path}.")
+                record_file(output_path)
 
         except Exception as e:
             logger.error(f"Error executing scheduled input '{title}': {e}")
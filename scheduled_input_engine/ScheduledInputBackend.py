@@ -19,6 +19,8 @@ try:
     from SICleanup import cleanup_indexes
     from SIExecution import SIExecution
     from cache import get_cached_or_fetch
+    from utils.index_manifest import record_file
+    from utils.index_layout import write_index_frame
 except Exception as e:
     raise e
 
@@ -208,24 +210,15 @@ class ScheduledInputBackend:
             except ValueError:
                 raise ValueError("Invalid output file path.")
 
-            # Handle overwrite
-            if output_path.exists():
-                if overwrite:
-                    # Overwrite the existing file
-                    result_df.to_parquet(output_path, index=False, compression='gzip')
-                    logger.info(f"Overwritten existing file at {output_path}.")
-                else:
-                    # Generate a new filename to avoid conflict
-                    base, ext = os.path.splitext(output_filename)
-                    timestamp = int(time.time())
-                    new_filename = f"{base}_{timestamp}{ext}"
-                    output_path = target_dir / new_filename
-                    result_df.to_parquet(output_path, index=False, compression='gzip')
-                    logger.info(f"Saved results to {output_path}.")
-            else:
-                # Save the DataFrame to the output path
-                result_df.to_parquet(output_path, index=False, compression='gzip')
-                logger.info(f"Saved results to {output_path}.")
+            # Save using the index's layout; existing files are overwritten or
+            # kept alongside a timestamp-suffixed copy depending on overwrite
+            written = write_index_frame(
+                result_df, target_dir, output_path.name, overwrite=overwrite, index_name=subdirectory
+            )
+            for path in written:
+                logger.info(f"Saved results to {path}.")
+                # Keep the index manifest in step with the new file
+                record_file(path)
 
         except Exception as e:
             logger.error(f"Error executing scheduled input '{title}': {str(e)}")
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 import asyncio
+import json
 import logging
 import aiosqlite
 import time
@@ -18,6 +19,12 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 try:
     from ScheduledInputBackend import ScheduledInputBackend  # Import the backend
     from SICleanup import cleanup_indexes  # Import the cleanup function
+    from SICompaction import compact_indexes  # Merge small index files
+    from utils.index_manifest import record_directory  # Manifest of index files
+    from utils.epoch_utils import backfill_epoch_file  # Typed _epoch for script output
+    from utils.index_layout import repartition_file  # Optional date=/hour= layout
+    from utils.bloom_filters import backfill as backfill_bloom_filters  # Equality-filter pruning
+    from utils.token_index import backfill as backfill_token_index  # Free-text term pruning
 except Exception as e:
     raise e
 
@@ -206,6 +213,19 @@ async def execute_repo_script(
 
     if result.returncode != 0:
         logger.error(f"[x] Repo script {script_name} failed")
+        return
+
+    # Give new script output a typed _epoch and move it into time partitions
+    # when the index uses them, then catalog it
+    for produced in list(output_dir.rglob("*.parquet")):
+        try:
+            if produced.stat().st_mtime >= start:
+                backfill_epoch_file(produced)
+                repartition_file(produced, output_dir, index_name=output_subdir)
+        except Exception as exc:
+            logger.warning(f"[!] Could not prepare {produced} for the index: {exc}")
+    recorded = record_directory(output_dir, since=start)
+    logger.info(f"[i] Recorded {recorded} new file(s) from {script_name} in index manifest")
 
 async def schedule_repo_scripts():
     """Schedule all active repo scripts."""
@@ -255,6 +275,70 @@ async def perform_cleanup():
         logger.error(f"Error during cleanup process: {str(e)}")
 
 
+# Function to store compaction events in the history database
+async def store_compaction_event(summary):
+    try:
+        async with aiosqlite.connect(HISTORY_DB) as db:
+            await db.execute('''
+                INSERT INTO compaction_history (
+                    compacted_file, source_count, source_files, rows,
+                    input_bytes, output_bytes, compaction_time
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                summary['compacted_file'],
+                len(summary['source_files']),
+                json.dumps(summary['source_files']),
+                summary['rows'],
+                summary['input_bytes'],
+                summary['output_bytes'],
+                time.time(),
+            ))
+            await db.commit()
+            logger.info(f"Logged compaction event for file: {summary['compacted_file']}")
+
+    except Exception as e:
+        logger.error(f"Error storing compaction event: {str(e)}")
+
+
+# Function to merge small index files with telemetry recording
+async def perform_compaction():
+    try:
+        logger.info("Starting compaction of small files in the indexes directory...")
+        compactions, deleted_files = await loop.run_in_executor(None, compact_indexes)
+
+        for summary in compactions:
+            await store_compaction_event(summary)
+        for file, reason in deleted_files:
+            await store_deletion_event(file, reason)  # Sources removed after their grace period
+
+        logger.info(f"Compaction completed: {len(compactions)} file(s) written, {len(deleted_files)} source(s) removed.")
+
+    except Exception as e:
+        logger.error(f"Error during compaction process: {str(e)}")
+
+
+# Function to build Bloom filters for files written before their columns were configured
+async def perform_bloom_backfill():
+    try:
+        logger.info("Starting Bloom filter backfill for configured indexes...")
+        updated = await loop.run_in_executor(None, backfill_bloom_filters)
+        logger.info(f"Bloom filter backfill completed: {updated} file(s) updated.")
+
+    except Exception as e:
+        logger.error(f"Error during Bloom filter backfill: {str(e)}")
+
+
+# Function to build token postings for files written before their columns were configured
+async def perform_token_index_backfill():
+    try:
+        logger.info("Starting token index backfill for configured indexes...")
+        updated = await loop.run_in_executor(None, backfill_token_index)
+        logger.info(f"Token index backfill completed: {updated} file(s) updated.")
+
+    except Exception as e:
+        logger.error(f"Error during token index backfill: {str(e)}")
+
+
 # Function to initialize the history database (if it doesn't exist)
 async def initialize_history_db():
     try:
@@ -275,6 +359,17 @@ async def initialize_history_db():
                     reason TEXT
                 )
             ''')
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS compaction_history (
+                    compacted_file TEXT,
+                    source_count INTEGER,
+                    source_files TEXT,
+                    rows INTEGER,
+                    input_bytes INTEGER,
+                    output_bytes INTEGER,
+                    compaction_time REAL
+                )
+            ''')
             await db.commit()
         logger.info("Initialized history database and ensured the required tables exist.")
     except Exception as e:
@@ -333,6 +428,30 @@ async def main():
         replace_existing=True
     )
 
+    # Schedule compaction of small index files every hour, offset from cleanup
+    scheduler.add_job(
+        perform_compaction,
+        CronTrigger.from_crontab('30 * * * *'),
+        id='compaction_job',
+        replace_existing=True
+    )
+
+    # Schedule the Bloom filter backfill every hour, after compaction
+    scheduler.add_job(
+        perform_bloom_backfill,
+        CronTrigger.from_crontab('45 * * * *'),
+        id='bloom_backfill_job',
+        replace_existing=True
+    )
+
+    # Schedule the token index backfill every hour, after compaction
+    scheduler.add_job(
+        perform_token_index_backfill,
+        CronTrigger.from_crontab('50 * * * *'),
+        id='token_index_backfill_job',
+        replace_existing=True
+    )
+
     # Schedule input tasks
     await schedule_input_tasks()
     await schedule_repo_scripts()
@@ -38,7 +38,7 @@ def run_query(query):
 def test_appendpipe(monkeypatch):
     df = pd.DataFrame({"x": [1, 2, 3]})
     monkeypatch.setattr(
-        "lexers.speakQueryListener.process_index_calls", lambda tokens: df.copy()
+        "lexers.speakQueryListener.process_index_calls", lambda tokens, **_: df.copy()
     )
     result = run_query('index="dummy" | appendpipe [ stats sum(x) as total ]')
     assert result["total"].iloc[-1] == 6
@@ -49,7 +49,7 @@ def test_multisearch(monkeypatch):
     df1 = pd.DataFrame({"x": [1]})
     df2 = pd.DataFrame({"x": [2]})
 
-    def fake_process(tokens):
+    def fake_process(tokens, **_):
         joined = " ".join(tokens)
         if "foo" in joined:
             return df1.copy()
@@ -0,0 +1,72 @@
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+import os
+import sys
+
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils import bloom_filters, index_layout, index_manifest
+
+
+def _write(path, hosts, ports, row_group_size=None):
+    pq.write_table(pa.table({"host": hosts, "port": ports}), path, row_group_size=row_group_size)
+
+
+def test_filter_has_no_false_negatives():
+    keys = [f"10.0.{i // 256}.{i % 256}" for i in range(5000)]
+    bloom = bloom_filters.BloomFilter.from_keys(keys)
+    assert all(bloom.might_contain(k) for k in keys)
+    misses = sum(bloom.might_contain(f"192.168.{i // 256}.{i % 256}") for i in range(5000))
+    assert misses < 5000 * 0.05
+
+
+def test_canonical_values_share_numeric_keys():
+    assert bloom_filters.canonical_value(80) == bloom_filters.canonical_value(80.0) == "80"
+    assert bloom_filters.canonical_value(True) is None
+    assert bloom_filters.canonical_value(float("nan")) is None
+
+
+def test_lookup_row_groups(tmp_path):
+    db = tmp_path / "manifest.db"
+    target = tmp_path / "a.parquet"
+    _write(target, ["a", "a", "b", "b", "c", "c"], [1, 1, 2, 2, 3, 3], row_group_size=2)
+    assert bloom_filters.update_file(target, db, columns=["host", "port"]) == 6
+    assert bloom_filters.update_file(target, db, columns=["host", "port"]) == 0
+
+    lookup = lambda pred: bloom_filters.lookup_row_groups([str(target)], pred, db)[str(target)]
+    assert lookup(("eq", "host", ["b"])) == [1]
+    assert lookup(("eq", "port", ["3", "1"])) == [0, 2]
+    assert lookup(("and", ("eq", "host", ["a"]), ("eq", "port", ["3"]))) == []
+    assert lookup(("or", ("eq", "host", ["a"]), ("eq", "port", ["3"]))) == [0, 2]
+    assert lookup(("eq", "other", ["x"])) == [0, 1, 2]
+
+    # Rewritten files are not judged by stale filters
+    _write(target, ["z"], [9])
+    assert bloom_filters.lookup_row_groups([str(target)], ("eq", "host", ["z"]), db) == {}
+
+
+def test_record_file_builds_configured_filters(tmp_path, monkeypatch):
+    settings_db = tmp_path / "settings.db"
+    db = tmp_path / "manifest.db"
+    index_dir = tmp_path / "indexes" / "fw"
+    index_dir.mkdir(parents=True)
+    monkeypatch.setattr(index_layout, "INDEX_SETTINGS_DB", settings_db)
+    monkeypatch.setattr(index_layout, "INDEXES_DIR", tmp_path / "indexes")
+    index_layout.set_index_settings("fw", db_path=settings_db, bloom_columns="host, port")
+    assert index_layout.get_index_settings("fw", db_path=settings_db)["bloom_columns"] == ("host", "port")
+
+    target = index_dir / "a.parquet"
+    _write(target, ["a", "b"], [1, 2])
+    index_manifest.record_file(target, db_path=db)
+    assert bloom_filters.lookup_row_groups([str(target)], ("eq", "host", ["q"]), db) == {str(target): []}
+
+    index_manifest.forget_file(target, db_path=db)
+    assert bloom_filters.lookup_row_groups([str(target)], ("eq", "host", ["q"]), db) == {}
+
+    other = index_dir / "b.parquet"
+    _write(other, ["x"], [5])
+    assert bloom_filters.backfill(tmp_path / "indexes", db, settings_db) == 2
@@ -0,0 +1,136 @@
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pd = pytest.importorskip("pandas")
+
+import importlib.util
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from handlers.EvalHandler import EvalHandler
+from handlers.GeneralHandler import GeneralHandler
+from handlers.SearchCmdHandler import SearchDirective
+from handlers.StatsHandler import StatsHandler
+from utils import categoricals, index_layout
+from utils.parquet_writer import write_table
+
+_BUILD_DIR = Path(__file__).resolve().parents[1] / "functionality" / "cpp_index_call" / "build"
+
+
+def _load_module():
+    builds = sorted(_BUILD_DIR.glob("cpp_index_call*.so"), key=os.path.getmtime)
+    if not builds:
+        pytest.skip("cpp_index_call is not built")
+    spec = importlib.util.spec_from_file_location("cpp_index_call", builds[-1])
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _table(rows=1000):
+    return pa.table({
+        "_epoch": list(range(rows)),
+        "host": [["web2", "db1", "web1"][i % 3] for i in range(rows)],
+        "request_id": [f"req-{i}" for i in range(rows)],
+    })
+
+
+def test_scanner_loads_low_cardinality_strings_as_categoricals(tmp_path, monkeypatch):
+    process_index_calls = _load_module().process_index_calls
+    index_dir = tmp_path / "indexes" / "logs"
+    index_dir.mkdir(parents=True)
+    # The shared writer only dictionary-encodes host; plain pyarrow encodes both columns
+    write_table(_table(), index_dir / "a.parquet")
+    pq.write_table(_table(), index_dir / "b.parquet")
+    monkeypatch.chdir(tmp_path)
+
+    df = process_index_calls(["index", "=", '"logs/*"'])
+    assert df["host"].dtype == "category"
+    assert df["host"].cat.categories.tolist() == ["db1", "web1", "web2"]
+    assert df["_source_file"].dtype == "category"
+    # Too many distinct values to be worth a categorical
+    assert df["request_id"].dtype == object
+
+    index_layout.set_index_settings("logs", db_path=tmp_path / "scheduled_inputs.db",
+                                    category_columns=["request_id"])
+    assert process_index_calls(["index", "=", '"logs/*"'])["request_id"].dtype == "category"
+
+
+def _frames():
+    rng = np.random.default_rng(5)
+    hosts = rng.choice(["web2", "db1", "web1", None], 200)
+    plain = pd.DataFrame({"host": hosts.astype(object), "v": rng.integers(0, 10, 200)})
+    # Categories in appearance order, as Arrow dictionaries deliver them before sorting
+    cat = plain.assign(host=pd.Categorical(plain["host"], categories=["web2", "web1", "db1"]))
+    categoricals.sort_categories(cat)
+    return cat, plain
+
+
+@pytest.mark.parametrize("run", [
+    lambda df: StatsHandler().run_stats(["stats", "count,", "min(host),", "max(v)", "by", "host"], df),
+    lambda df: StatsHandler().run_stats(["eventstats", "count", "by", "host"], df),
+    lambda df: GeneralHandler.execute_dedup(df, ["host"]),
+    lambda df: GeneralHandler.sort_df_by_columns(df, ["host", "v"], "+"),
+    lambda df: GeneralHandler.execute_join(df, pd.DataFrame({"host": ["web1", "db1"], "dc": ["a", "b"]}), ["host"]),
+    lambda df: GeneralHandler.execute_fillnull(df, ["value", "=", "none", "host"]),
+    lambda df: EvalHandler().run_eval(["eval", 'tag=concat(host, "-x")'], df),
+    lambda df: SearchDirective().run_search(["host", ">", '"db1"', "AND", "host", "!=", '"web2"'], df),
+])
+def test_handlers_match_on_categoricals(run):
+    cat, plain = _frames()
+    result = run(cat.copy()).apply(categoricals.plain)
+    pd.testing.assert_frame_equal(
+        result.reset_index(drop=True), run(plain.copy()).reset_index(drop=True), check_dtype=False
+    )
+
+
+def test_concat_keeps_categoricals():
+    first = pd.DataFrame({"host": pd.Categorical(["b", "a"])})
+    second = pd.DataFrame({"host": pd.Categorical(["c"])})
+    combined = categoricals.concat([first, second], ignore_index=True)
+    assert combined["host"].dtype == "category"
+    assert combined["host"].tolist() == ["b", "a", "c"]
+    assert combined["host"].cat.categories.tolist() == ["a", "b", "c"]
+
+
+@pytest.fixture
+def logs_index(tmp_path, monkeypatch):
+    module = _load_module()
+    from query_engine import CmdExecutionBackend
+    from utils import result_cache
+
+    index_dir = tmp_path / "indexes" / "logs"
+    index_dir.mkdir(parents=True)
+    write_table(_table(), index_dir / "a.parquet")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("lexers.speakQueryListener.process_index_calls", module.process_index_calls)
+    monkeypatch.setattr("lexers.speakQueryListener.plan_index_files", module.plan_index_files)
+    monkeypatch.setattr(CmdExecutionBackend, "save_dataframe", lambda *args: None)
+    monkeypatch.setattr(result_cache, "_cache", result_cache.ResultCache())
+    return CmdExecutionBackend
+
+
+def test_index_query_results_leave_the_engine_decoded(logs_index):
+    from utils import result_cache
+
+    for _ in range(2):  # fresh run, then the cached result
+        df = logs_index.execute_query('index="logs/*"\n')
+        assert df["host"].dtype == object and df["_source_file"].dtype == object
+        assert df.fillna("")["_source_file"].iloc[0] == "logs/a.parquet"
+    assert result_cache.cache_info()["hits"] == 1
+
+
+def test_plain_index_query_returns_rows(logs_index):
+    jpype = pytest.importorskip("jpype")
+    try:
+        jpype.getDefaultJVMPath()
+    except Exception:
+        pytest.skip("sanitize_dataframe needs a JVM")
+    df = logs_index.run_query_and_return_results_df('index="logs/*"')
+    assert df is not None and len(df) == 1000
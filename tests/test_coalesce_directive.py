@@ -38,6 +38,6 @@ def run_query(query):
 def test_coalesce_directive(monkeypatch):
     df = pd.DataFrame({"fieldA": [None, "A2", ""], "fieldB": ["B1", "B2", "B3"]})
 
-    monkeypatch.setattr("lexers.speakQueryListener.process_index_calls", lambda tokens: df.copy())
+    monkeypatch.setattr("lexers.speakQueryListener.process_index_calls", lambda tokens, **_: df.copy())
     result = run_query('index="dummy" | coalesce(fieldA, fieldB)')
     assert result["coalesce"].tolist() == ["B1", "A2", "B3"]
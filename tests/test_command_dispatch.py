@@ -16,7 +16,7 @@ def patched_listener(monkeypatch):
     """Return speakQueryListener with heavy dependencies patched."""
     fake_loader = types.ModuleType("functionality.so_loader")
     fake_loader.resolve_and_import_so = lambda p, n: types.SimpleNamespace(
-        process_index_calls=lambda tokens: pd.DataFrame(),
+        process_index_calls=lambda tokens, **_: pd.DataFrame(),
         parse_dates_to_epoch=lambda x: x,
     )
     monkeypatch.setitem(sys.modules, "functionality.so_loader", fake_loader)
@@ -14,7 +14,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 # Provide lightweight stand-in for so_loader
 fake_loader = types.ModuleType("functionality.so_loader")
 fake_loader.resolve_and_import_so = lambda path, name: types.SimpleNamespace(
-    process_index_calls=lambda tokens: pd.DataFrame(),
+    process_index_calls=lambda tokens, **_: pd.DataFrame(),
     parse_dates_to_epoch=lambda x: x,
 )
 sys.modules["functionality.so_loader"] = fake_loader
@@ -42,7 +42,7 @@ def test_dedup_basic(monkeypatch):
         "val": [100, 200, 300, 400],
     })
     monkeypatch.setattr(
-        "lexers.speakQueryListener.process_index_calls", lambda tokens: df.copy()
+        "lexers.speakQueryListener.process_index_calls", lambda tokens, **_: df.copy()
     )
     result = run_query('index="dummy" | dedup transactionID, userID')
     assert len(result) == 2
@@ -55,7 +55,7 @@ def test_dedup_consecutive(monkeypatch):
         "val": range(6),
     })
     monkeypatch.setattr(
-        "lexers.speakQueryListener.process_index_calls", lambda tokens: df.copy()
+        "lexers.speakQueryListener.process_index_calls", lambda tokens, **_: df.copy()
     )
     result = run_query('index="dummy" | dedup sessionID consecutive=true')
     assert result["sessionID"].tolist() == [1, 1, 1, 2]
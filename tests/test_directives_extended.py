@@ -14,7 +14,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 # provide dummy so_loader module
 fake_loader = types.ModuleType("functionality.so_loader")
 fake_loader.resolve_and_import_so = lambda path, name: types.SimpleNamespace(
-    process_index_calls=lambda tokens: pd.DataFrame(),
+    process_index_calls=lambda tokens, **_: pd.DataFrame(),
     parse_dates_to_epoch=lambda x: x,
 )
 sys.modules["functionality.so_loader"] = fake_loader
@@ -38,7 +38,7 @@ def run_query(query: str):
 def test_fieldsummary_directive(monkeypatch):
     df = pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "z"]})
     monkeypatch.setattr(
-        "lexers.speakQueryListener.process_index_calls", lambda tokens: df.copy()
+        "lexers.speakQueryListener.process_index_calls", lambda tokens, **_: df.copy()
     )
     errors, _ = run_query('index="dummy" | fieldsummary')
     assert errors == 0
@@ -47,7 +47,7 @@ def test_fieldsummary_directive(monkeypatch):
 def test_outputlookup_directive(monkeypatch):
     df = pd.DataFrame({"a": [1]})
     monkeypatch.setattr(
-        "lexers.speakQueryListener.process_index_calls", lambda tokens: df.copy()
+        "lexers.speakQueryListener.process_index_calls", lambda tokens, **_: df.copy()
     )
     monkeypatch.setattr(
         "handlers.GeneralHandler.GeneralHandler.execute_outputlookup",
@@ -60,7 +60,7 @@ def test_outputlookup_directive(monkeypatch):
 def test_outputlookup_with_options(monkeypatch):
     df = pd.DataFrame({"a": [1]})
     monkeypatch.setattr(
-        "lexers.speakQueryListener.process_index_calls", lambda tokens: df.copy()
+        "lexers.speakQueryListener.process_index_calls", lambda tokens, **_: df.copy()
     )
     monkeypatch.setattr(
         "handlers.GeneralHandler.GeneralHandler.execute_outputlookup",
@@ -74,7 +74,7 @@ def test_outputlookup_with_options(monkeypatch):
 def test_outputnew_directive(monkeypatch):
     df = pd.DataFrame({"a": [1]})
     monkeypatch.setattr(
-        "lexers.speakQueryListener.process_index_calls", lambda tokens: df.copy()
+        "lexers.speakQueryListener.process_index_calls", lambda tokens, **_: df.copy()
     )
     monkeypatch.setattr(
         "handlers.GeneralHandler.GeneralHandler.execute_outputnew",
@@ -0,0 +1,126 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+pa = pytest.importorskip("pyarrow")
+
+import importlib.util
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils import epoch_utils
+from functionality.ParquetEpochAdder import ParquetEpochAdder
+
+
+@pytest.fixture(autouse=True)
+def real_parser(monkeypatch):
+    """Use the compiled parser when built; other tests stub out so_loader."""
+    build_dir = Path(epoch_utils.DATETIME_PARSER_DIR)
+    builds = sorted(build_dir.glob("cpp_datetime_parser*.so"), key=os.path.getmtime)
+    parser = False
+    if builds:
+        spec = importlib.util.spec_from_file_location("cpp_datetime_parser", builds[-1])
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        parser = module.parse_dates_to_epoch_array
+    monkeypatch.setattr(epoch_utils, "_parser", parser)
+
+
+def test_strings_and_digits():
+    series = pd.Series(["2024-01-01 00:00:00", "1700000000", None])
+    assert epoch_utils.compute_epoch(series).tolist() == [1704067200, 1700000000, 0]
+
+
+def test_datetimes_with_timezone():
+    series = pd.Series(pd.to_datetime(["2024-01-01T01:00:00+01:00", None], utc=True))
+    result = epoch_utils.compute_epoch(series)
+    assert result.dtype == "int64"
+    assert result.tolist() == [1704067200, 0]
+
+
+def test_add_epoch_column_matches_case_insensitively():
+    df = pd.DataFrame({"TIMESTAMP": ["2024-01-01 00:00:00"]})
+    assert epoch_utils.add_epoch_column(df)
+    assert df["_epoch"].dtype == "int64"
+    assert df["_epoch"].tolist() == [1704067200]
+
+
+def test_add_epoch_column_without_time_field():
+    df = pd.DataFrame({"host": ["a"]})
+    assert epoch_utils.add_epoch_column(df) is False
+    assert "_epoch" not in df.columns
+
+
+def test_backfill_epoch_file(tmp_path):
+    target = tmp_path / "out.parquet"
+    pd.DataFrame({"timestamp": ["2024-01-01 00:00:00"], "v": [1]}).to_parquet(target)
+    assert epoch_utils.backfill_epoch_file(target)
+    schema = pq.read_schema(target)
+    assert str(schema.field("_epoch").type) == "int64"
+    assert epoch_utils.backfill_epoch_file(target) is False
+
+
+def test_parquet_epoch_adder_string_dates(tmp_path):
+    target = tmp_path / "dates.parquet"
+    pq.write_table(pa.table({"timestamp": ["2024-01-01 00:00:00", None]}), target)
+    ParquetEpochAdder(str(target), "timestamp").process()
+    table = pq.read_table(target)
+    # Rows are written sorted by _epoch
+    assert table["_epoch"].to_pylist() == [0, 1704067200]
+    assert table["timestamp"].to_pylist() == [None, "2024-01-01 00:00:00"]
+
+
+def test_compiled_parser_formats_and_inputs():
+    build_dir = Path(epoch_utils.DATETIME_PARSER_DIR)
+    builds = sorted(build_dir.glob("cpp_datetime_parser*.so"), key=os.path.getmtime)
+    if not builds:
+        pytest.skip("cpp_datetime_parser is not built")
+    spec = importlib.util.spec_from_file_location("cpp_datetime_parser", builds[-1])
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    values = [
+        "2024-01-01 00:00:00",
+        "2024-01-01T01:00:00+01:00",
+        "2024-01-01T00:00:00.250Z",
+        "01/02/2024",
+        "20240101000000",
+        "not a date",
+        None,
+    ]
+    expected = [1704067200, 1704067200, 1704067200, 1704153600, 1704067200, 0, 0]
+    assert module.parse_dates_to_epoch_array(values).tolist() == expected
+    assert module.parse_dates_to_epoch_array(pa.array(values)).tolist() == expected
+    chunked = pa.chunked_array([values[:3], values[3:]], type=pa.large_string())
+    assert module.parse_dates_to_epoch_array(chunked).tolist() == expected
+    assert module.parse_dates_to_epoch_array(pa.array(values)[2:5]).tolist() == expected[2:5]
+
+    many = np.array(["2024-01-01 00:00:00", "01/02/2024"] * 60000)
+    result = module.parse_dates_to_epoch_array(many, num_threads=4)
+    assert result.dtype == np.int64
+    assert result[-2:].tolist() == [1704067200, 1704153600]
+    assert module.parse_dates_to_epoch(["2024-01-01"]) == [1704067200]
+
+
+def test_compiled_parser_format_does_not_depend_on_thread_count():
+    build_dir = Path(epoch_utils.DATETIME_PARSER_DIR)
+    builds = sorted(build_dir.glob("cpp_datetime_parser*.so"), key=os.path.getmtime)
+    if not builds:
+        pytest.skip("cpp_datetime_parser is not built")
+    spec = importlib.util.spec_from_file_location("cpp_datetime_parser", builds[-1])
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    # The first value can only be day-first, so 03-04-2024 is 3 April in every chunk
+    values = np.array(["13-04-2024 10:00:00"] + ["03-04-2024 10:00:00"] * 400000)
+    single = module.parse_dates_to_epoch_array(values, num_threads=1)
+    parallel = module.parse_dates_to_epoch_array(values, num_threads=8)
+    assert parallel.tolist() == single.tolist()
+    assert set(single[1:].tolist()) == {1712138400}
+    chunked = pa.chunked_array([values[:1].tolist(), values[1:].tolist()])
+    assert module.parse_dates_to_epoch_array(chunked, num_threads=8).tolist() == single.tolist()
@@ -0,0 +1,146 @@
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pd = pytest.importorskip("pandas")
+
+import importlib.util
+import os
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from handlers.SearchCmdHandler import SearchDirective
+from utils import filter_mask
+
+_BUILD_DIR = Path(__file__).resolve().parents[1] / "functionality" / "cpp_index_call" / "build"
+_QUERY_OPS = {"=": "==", "!=": "!=", "<": "<", ">": ">", "<=": "<=", ">=": ">="}
+
+
+def _frame(rows=200, seed=7):
+    rng = np.random.default_rng(seed)
+    latency = rng.integers(0, 50, rows).astype(float)
+    latency[rng.random(rows) < 0.1] = np.nan
+    hosts = rng.choice(["web1", "web2", "db1", "it's"], rows).astype(object)
+    hosts[rng.random(rows) < 0.1] = None
+    return pd.DataFrame({
+        "row": np.arange(rows),
+        "status": rng.choice([200, 301, 404, 500, 503], rows),
+        "latency": latency,
+        "host": hosts,
+        "ok": rng.random(rows) < 0.5,
+    })
+
+
+def _random_expression(rng, depth=0):
+    if depth < 3 and rng.random() < 0.5:
+        return (rng.choice(["and", "or"]), _random_expression(rng, depth + 1), _random_expression(rng, depth + 1))
+    kind = rng.choice(["number", "number", "host", "ok", "in_status", "in_host"])
+    if kind == "number":
+        column = rng.choice(["status", "latency"])
+        value = rng.choice([0, 25, 200, 404, 500])
+        return ("cmp", rng.choice(list(_QUERY_OPS)), ("field", column), ("value", value))
+    if kind == "host":
+        return ("cmp", rng.choice(["=", "!="]), ("field", "host"), ("value", rng.choice(["web1", "db1", "it's"])))
+    if kind == "ok":
+        return ("cmp", "=", ("field", "ok"), ("value", rng.choice([True, False])))
+    if kind == "in_status":
+        return ("in", "status", rng.sample([200, 301, 404, 500, 503], 2))
+    return ("in", "host", rng.sample(["web1", "web2", "db1"], 2))
+
+
+def _to_query(expression):
+    """Render the DataFrame.query string the filters used to be applied with."""
+    kind = expression[0]
+    if kind in ("and", "or"):
+        op = "&" if kind == "and" else "|"
+        return f"({_to_query(expression[1])} {op} {_to_query(expression[2])})"
+    if kind == "cmp":
+        return f"({_to_query(expression[2])} {_QUERY_OPS[expression[1]]} {_to_query(expression[3])})"
+    if kind == "in":
+        return f"({expression[1]} in {expression[2]!r})"
+    if kind == "field":
+        return expression[1]
+    return repr(expression[1])
+
+
+def _to_tokens(expression):
+    """Render an expression as the token list of an index call or search."""
+    kind = expression[0]
+    if kind in ("and", "or"):
+        return ["(", *_to_tokens(expression[1]), ")", kind.upper(), "(", *_to_tokens(expression[2]), ")"]
+    if kind == "cmp":
+        return [*_to_tokens(expression[2]), expression[1], *_to_tokens(expression[3])]
+    if kind == "in":
+        values = []
+        for value in expression[2]:
+            values += [",", _to_tokens(("value", value))[0]] if values else [_to_tokens(("value", value))[0]]
+        return [expression[1], "IN", "(", *values, ")"]
+    if kind == "field":
+        return [expression[1]]
+    value = expression[1]
+    return [f'"{value}"' if isinstance(value, str) else str(value)]
+
+
+def _cases(count=150, seed=11):
+    rng = random.Random(seed)
+    return [_random_expression(rng) for _ in range(count)]
+
+
+def _quote_free(expression):
+    return "it's" not in repr(expression)
+
+
+def test_masks_match_dataframe_query():
+    df = _frame()
+    for expression in _cases():
+        expected = df.query(_to_query(expression))
+        pd.testing.assert_frame_equal(filter_mask.apply(df, expression), expected, obj=_to_query(expression))
+
+
+def test_search_directive_matches_dataframe_query():
+    df = _frame()
+    for expression in filter(_quote_free, _cases()):
+        expected = df.query(_to_query(expression))
+        result = SearchDirective().run_search(_to_tokens(expression), df)
+        pd.testing.assert_frame_equal(result, expected, obj=" ".join(_to_tokens(expression)))
+
+
+def test_short_circuit_skips_undecided_rows():
+    df = pd.DataFrame({"kind": ["num", "text"], "value": [5, "x"]})
+    # Comparing "x" with a number raises, but that row is already excluded by the left side
+    expression = ("and", ("cmp", "=", ("field", "kind"), ("value", "num")),
+                  ("cmp", ">", ("field", "value"), ("value", 1)))
+    assert filter_mask.evaluate(df.iloc[:1], expression).tolist() == [True]
+    assert filter_mask.apply(df, ("or", ("value", True), ("field", "missing"))).equals(df)
+
+
+def test_non_boolean_condition_raises():
+    with pytest.raises(TypeError):
+        filter_mask.evaluate(pd.DataFrame({"n": [1, 2]}), ("field", "n"))
+    with pytest.raises(KeyError):
+        filter_mask.evaluate(pd.DataFrame({"n": [1, 2]}), ("cmp", "=", ("field", "missing"), ("value", 1)))
+
+
+def test_index_scanner_matches_dataframe_query(tmp_path, monkeypatch):
+    builds = sorted(_BUILD_DIR.glob("cpp_index_call*.so"), key=os.path.getmtime)
+    if not builds:
+        pytest.skip("cpp_index_call is not built")
+    spec = importlib.util.spec_from_file_location("cpp_index_call", builds[-1])
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    df = _frame()
+    (tmp_path / "indexes" / "logs").mkdir(parents=True)
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path / "indexes" / "logs" / "a.parquet")
+    monkeypatch.chdir(tmp_path)
+
+    for expression in _cases(count=40):
+        expected = df.query(_to_query(expression))["row"].tolist()
+        result = module.process_index_calls(["index", "=", '"logs/*"', *_to_tokens(expression)])
+        rows = result["row"].tolist() if len(result) else []
+        assert rows == expected, _to_query(expression)
@@ -0,0 +1,374 @@
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pytest.importorskip("pandas")
+
+import importlib.util
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from utils import categoricals
+
+_BUILD_DIR = Path(__file__).resolve().parents[1] / "functionality" / "cpp_index_call" / "build"
+
+
+def _load_module():
+    # Other tests replace functionality.so_loader with a stub, so load the .so directly
+    builds = sorted(_BUILD_DIR.glob("cpp_index_call*.so"), key=os.path.getmtime)
+    if not builds:
+        pytest.skip("cpp_index_call is not built")
+    spec = importlib.util.spec_from_file_location("cpp_index_call", builds[-1])
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def index_call(tmp_path, monkeypatch):
+    """Load the compiled module with ``tmp_path`` acting as the project root."""
+    module = _load_module()
+    (tmp_path / "indexes" / "logs").mkdir(parents=True)
+    monkeypatch.chdir(tmp_path)
+    return module.process_index_calls, tmp_path / "indexes" / "logs"
+
+
+def test_time_window_uses_stored_epoch_statistics(index_call):
+    process_index_calls, index_dir = index_call
+    epochs = list(range(1000, 2000))
+    pq.write_table(
+        pa.table({"_epoch": epochs, "v": list(range(1000))}),
+        index_dir / "a.parquet",
+        row_group_size=100,
+    )
+    pq.write_table(pa.table({"_epoch": [5, 6], "v": [1, 2]}), index_dir / "old.parquet")
+
+    df = process_index_calls(
+        ["index", "=", '"logs/*"', "earliest", "=", '"1250"', "latest", "=", '"1260"']
+    )
+    assert sorted(df["_epoch"].tolist()) == list(range(1250, 1261))
+    assert set(df["_source_file"]) == {"logs/a.parquet"}
+
+
+def test_time_window_on_typed_timestamp(index_call):
+    process_index_calls, index_dir = index_call
+    stamps = pa.array([e * 10**9 for e in range(1000, 1100)], pa.timestamp("ns"))
+    pq.write_table(
+        pa.table({"timestamp": stamps, "v": list(range(100))}),
+        index_dir / "b.parquet",
+        row_group_size=10,
+    )
+
+    df = process_index_calls(
+        ["index", "=", '"logs/*"', "earliest", "=", '"1015"', "latest", "=", '"1024"']
+    )
+    assert df["_epoch"].tolist() == list(range(1015, 1025))
+
+
+def test_projection_limits_columns(index_call):
+    process_index_calls, index_dir = index_call
+    pq.write_table(
+        pa.table({"_epoch": [1, 2], "host": ["a", "b"], "noise": ["x", "y"]}),
+        index_dir / "c.parquet",
+    )
+
+    df = process_index_calls(["index", "=", '"logs/*"'], columns=["host"])
+    assert "noise" not in df.columns
+    assert df["host"].tolist() == ["a", "b"]
+
+
+def test_manifest_skips_files_without_opening(index_call, tmp_path):
+    process_index_calls, index_dir = index_call
+    pq.write_table(pa.table({"_epoch": [10, 20], "v": [1, 2]}), index_dir / "d.parquet")
+
+    process_index_calls(["index", "=", '"logs/*"'])
+    assert (tmp_path / "index_manifest.db").exists()
+
+    # A corrupt file recorded with an out-of-range window is never opened
+    stale = index_dir / "d.parquet"
+    stat = stale.stat()
+    stale.write_bytes(b"not parquet")
+    os.truncate(stale, stat.st_size)
+    os.utime(stale, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    df = process_index_calls(["index", "=", '"logs/*"', "earliest", "=", '"1000"'])
+    assert df.empty
+
+
+def test_parallel_scan_matches_serial(index_call):
+    process_index_calls, index_dir = index_call
+    for i in range(12):
+        pq.write_table(
+            pa.table({"_epoch": [i * 10 + j for j in range(10)], "status": [200, 500] * 5}),
+            index_dir / f"part{i:02d}.parquet",
+        )
+
+    tokens = ["index", "=", '"logs/*"', "status", "=", "500"]
+    serial = process_index_calls(tokens, max_workers=1)
+    parallel = process_index_calls(tokens, max_workers=4)
+    assert len(serial) == 60
+    assert parallel["_epoch"].tolist() == serial["_epoch"].tolist()
+    assert parallel["_source_file"].tolist() == serial["_source_file"].tolist()
+
+
+def test_results_assembled_across_files(index_call):
+    process_index_calls, index_dir = index_call
+    pq.write_table(pa.table({"_epoch": [1, 2], "host": ["a", "b"]}), index_dir / "e.parquet")
+    pq.write_table(pa.table({"_epoch": [3], "status": [500]}), index_dir / "f.parquet")
+
+    df = process_index_calls(["index", "=", '"logs/*"'])
+    assert df["_source_file"].dtype == "category"
+    assert df["_source_file"].tolist() == ["logs/e.parquet"] * 2 + ["logs/f.parquet"]
+    assert df["host"].tolist()[:2] == ["a", "b"] and df["host"].isna().iloc[2]
+
+
+def test_filter_applies_to_each_file_before_assembly(index_call, monkeypatch):
+    from utils import filter_mask
+
+    process_index_calls, index_dir = index_call
+    pq.write_table(pa.table({"_epoch": list(range(100)), "status": [500] * 98 + [200, 404]}), index_dir / "e.parquet")
+    # No status column: the filter fails for this file alone, which then contributes no rows
+    pq.write_table(pa.table({"_epoch": [100, 101], "host": ["a", "b"]}), index_dir / "f.parquet")
+    kept = []
+    filter_table = filter_mask.filter_table
+
+    def recording_filter(table, expression):
+        result = filter_table(table, expression)
+        kept.append(result.num_rows)
+        return result
+
+    monkeypatch.setattr(filter_mask, "filter_table", recording_filter)
+
+    df = process_index_calls(["index", "=", '"logs/*"', "status", "!=", "500"])
+    assert df["_epoch"].tolist() == [98, 99]
+    assert set(df["_source_file"]) == {"logs/e.parquet"}
+    assert kept == [2]
+
+
+def test_legacy_string_timestamps_filtered_in_arrow(index_call):
+    process_index_calls, index_dir = index_call
+    pq.write_table(
+        pa.table({"timestamp": ["2024-01-01 00:00:00", "2024-01-02 00:00:00", None]}),
+        index_dir / "g.parquet",
+    )
+
+    df = process_index_calls(
+        ["index", "=", '"logs/*"', "earliest", "=", '"2024-01-01 12:00:00"']
+    )
+    assert df["_epoch"].tolist() == [1704153600]
+
+
+def test_conflicting_schemas_fall_back_to_per_file(index_call):
+    process_index_calls, index_dir = index_call
+    pq.write_table(pa.table({"code": [1, 2]}), index_dir / "h.parquet")
+    pq.write_table(pa.table({"code": ["x", "y"]}), index_dir / "i.parquet")
+
+    df = process_index_calls(["index", "=", '"logs/*"'])
+    assert sorted(map(str, df["code"])) == ["1", "2", "x", "y"]
+
+
+def test_time_partitions_pruned_by_directory_name(index_call):
+    process_index_calls, index_dir = index_call
+    day = index_dir / "date=2024-01-01"
+    for hour, epoch in (("00", 1704067200), ("05", 1704085200)):
+        (day / f"hour={hour}").mkdir(parents=True)
+        pq.write_table(pa.table({"_epoch": [epoch]}), day / f"hour={hour}" / "p.parquet")
+    # Unreadable files in partitions outside the window must never be opened
+    (index_dir / "date=2023-12-31" / "hour=23").mkdir(parents=True)
+    (index_dir / "date=2023-12-31" / "hour=23" / "bad.parquet").write_bytes(b"junk")
+    (day / "hour=01").mkdir()
+    (day / "hour=01" / "bad.parquet").write_bytes(b"junk")
+
+    df = process_index_calls(
+        ["index", "=", '"logs/**"', "earliest", "=", '"1704085000"', "latest", "=", '"1704089000"']
+    )
+    assert df["_source_file"].tolist() == ["logs/date=2024-01-01/hour=05/p.parquet"]
+
+    (day / "hour=01" / "bad.parquet").unlink()
+    everything = process_index_calls(["index", "=", '"logs/*"', "earliest", "=", '"1704067200"'])
+    assert sorted(everything["_epoch"].tolist()) == [1704067200, 1704085200]
+
+
+def test_repeat_scans_reuse_cached_footers(index_call):
+    from utils import parquet_footer_cache
+
+    process_index_calls, index_dir = index_call
+    pq.write_table(pa.table({"_epoch": [1, 2], "host": ["a", "b"]}), index_dir / "j.parquet")
+    parquet_footer_cache.clear_cache()
+
+    process_index_calls(["index", "=", '"logs/*"', "host", "=", '"a"'])
+    hits = parquet_footer_cache.cache_info()["hits"]
+    df = process_index_calls(["index", "=", '"logs/*"', "host", "=", '"a"'])
+    assert parquet_footer_cache.cache_info()["hits"] > hits
+    assert df["_epoch"].tolist() == [1]
+
+
+def test_compacted_sources_are_not_read_twice(index_call, tmp_path):
+    from scheduled_input_engine import SICompaction
+
+    process_index_calls, index_dir = index_call
+    sources = []
+    for i in range(4):
+        path = index_dir / f"s{i}.parquet"
+        pq.write_table(pa.table({"_epoch": [i], "v": [i]}), path)
+        sources.append(path)
+
+    summary = SICompaction.compact_files(sources, manifest_db=tmp_path / "index_manifest.db")
+    df = process_index_calls(["index", "=", '"logs/*"'])
+    assert sorted(df["_epoch"].tolist()) == [0, 1, 2, 3]
+    assert set(df["_source_file"]) == {f"logs/{Path(summary['compacted_file']).name}"}
+
+
+def test_bloom_filters_skip_row_groups_without_value(index_call, tmp_path, capfd):
+    from utils import bloom_filters
+
+    process_index_calls, index_dir = index_call
+    target = index_dir / "k.parquet"
+    pq.write_table(
+        pa.table({"_epoch": list(range(8)), "src_ip": [f"10.0.0.{i // 2}" for i in range(8)]}),
+        target,
+        row_group_size=2,
+    )
+    other = index_dir / "l.parquet"
+    pq.write_table(pa.table({"_epoch": [9], "src_ip": ["10.9.9.9"]}), other)
+    for path in (target, other):
+        bloom_filters.update_file(path, tmp_path / "index_manifest.db", columns=["src_ip"])
+
+    df = process_index_calls(["index", "=", '"logs/*"', "src_ip", "=", '"10.0.0.2"'])
+    assert df["_epoch"].tolist() == [4, 5]
+    err = capfd.readouterr().err
+    assert "Bloom filters/token index leave 1 of 4 row group(s)" in err
+    assert f"Skipping file {other} because its Bloom filters/token index" in err
+
+    either = process_index_calls(["index", "=", '"logs/*"', "src_ip", "IN", "(", '"10.0.0.0"', ",", '"10.9.9.9"', ")"])
+    assert sorted(either["_epoch"].tolist()) == [0, 1, 9]
+
+
+def test_free_text_terms_use_token_index(index_call, tmp_path, capfd):
+    from utils import token_index
+
+    process_index_calls, index_dir = index_call
+    target = index_dir / "m.parquet"
+    pq.write_table(
+        pa.table({"_epoch": [1, 2, 3, 4], "msg": ["disk full", "Connection reset", "cpu hot", "connection ok"],
+                  "status": [500, 503, 200, 503]}),
+        target,
+        row_group_size=1,
+    )
+    token_index.update_file(target, tmp_path / "index_manifest.db", columns=["msg"])
+
+    df = process_index_calls(["index", "=", '"logs/*"', '"connection reset"'])
+    assert df["_epoch"].tolist() == [2]
+    assert not any(c.startswith("_term_") for c in df.columns)
+    assert "Bloom filters/token index leave 1 of 4 row group(s)" in capfd.readouterr().err
+
+    mixed = process_index_calls(["index", "=", '"logs/*"', '"disk"', "OR", "status", "=", "503"], columns=["status"])
+    assert sorted(mixed["_epoch"].tolist()) == [1, 2, 4]
+
+
+def test_head_limit_reads_newest_row_groups_first(index_call, capfd):
+    process_index_calls, index_dir = index_call
+    pq.write_table(pa.table({"_epoch": list(range(0, 100)), "v": list(range(100))}), index_dir / "old.parquet",
+                   row_group_size=10)
+    pq.write_table(pa.table({"_epoch": list(range(100, 200)), "v": list(range(100))}), index_dir / "new.parquet",
+                   row_group_size=10)
+
+    df = process_index_calls(["index", "=", '"logs/*"'], limit=5, max_workers=1)
+    assert df["_epoch"].tolist() == [199, 198, 197, 196, 195]
+    assert "after reading 1 of 20 row group(s)" in capfd.readouterr().err
+
+    filtered = process_index_calls(["index", "=", '"logs/*"', "v", "<", "3"], limit=4, max_workers=2)
+    assert filtered["_epoch"].tolist() == [102, 101, 100, 2]
+    assert set(filtered["_source_file"]) == {"logs/new.parquet", "logs/old.parquet"}
+
+
+def test_head_limit_without_statistics_keeps_file_order(index_call, capfd):
+    process_index_calls, index_dir = index_call
+    for name in ("a", "b", "c"):
+        pq.write_table(pa.table({"v": [f"{name}{i}" for i in range(4)]}), index_dir / f"{name}.parquet")
+
+    df = process_index_calls(["index", "=", '"logs/*"'], limit=6, max_workers=1)
+    assert df["v"].tolist() == ["a0", "a1", "a2", "a3", "b0", "b1"]
+    err = capfd.readouterr().err
+    assert "in file order" in err
+    assert "after reading 2 of 3 row group(s)" in err
+
+
+@pytest.mark.parametrize("tokens", [[], ["v", ">", "2"]])
+def test_head_limit_returns_the_same_rows_with_or_without_statistics(index_call, tokens):
+    process_index_calls, index_dir = index_call
+    new = {"_epoch": [50, 70, 70, 60] * 3, "v": list(range(12))}
+    old = {"_epoch": [10, 70, 30, 20] * 3, "v": [float(i) for i in range(12)], "extra": ["x"] * 12}
+
+    results = []
+    for statistics in (True, False):
+        for name, data in (("new", new), ("old", old)):
+            pq.write_table(pa.table(data), index_dir / f"{name}.parquet", row_group_size=4,
+                           write_statistics=statistics)
+        full = process_index_calls(["index", "=", '"logs/*"', *tokens])
+        expected = full.sort_values("_epoch", ascending=False, kind="stable").head(5).reset_index(drop=True)
+        df = process_index_calls(["index", "=", '"logs/*"', *tokens], limit=5, max_workers=1)
+        assert df["v"].dtype == "float64"
+        assert "extra" in df.columns
+        pd.testing.assert_frame_equal(categoricals.decode(df), categoricals.decode(expected), check_like=True)
+        results.append(categoricals.decode(df))
+    pd.testing.assert_frame_equal(results[0], results[1])
+
+
+def test_plan_lists_files_without_reading(index_call, tmp_path):
+    from utils import metadata_stats
+
+    _, index_dir = index_call
+    pq.write_table(pa.table({"_epoch": [3, 1, 2], "v": [1, 2, 3]}), index_dir / "a.parquet")
+    pq.write_table(pa.table({"_epoch": list(range(10, 20)), "v": list(range(10))}), index_dir / "b.parquet",
+                   row_group_size=5)
+
+    plan_index_files = _load_module().plan_index_files
+    planned = plan_index_files(["index", "=", '"logs/*"'])
+    assert sorted(p["source_file"] for p in planned) == ["logs/a.parquet", "logs/b.parquet"]
+    assert all(p["row_groups"] is None for p in planned)
+
+    assert metadata_stats.parse_stats("stats earliest(_epoch) as first") is None
+    specs, groups = metadata_stats.parse_stats("stats count, min(_epoch) as first by _source_file")
+    result = metadata_stats.answer(planned, specs, groups, db_path=tmp_path / "index_manifest.db")
+    assert result.to_dict("list") == {
+        "_source_file": ["logs/a.parquet", "logs/b.parquet"], "count": [3, 10], "first": [1, 10]
+    }
+
+    windowed = plan_index_files(["index", "=", '"logs/*"', "earliest", "=", '"15"'])
+    assert [(p["source_file"], p["row_groups"]) for p in windowed] == [("logs/b.parquet", [1])]
+
+
+def test_overlapping_patterns_read_each_file_once(index_call, capfd):
+    process_index_calls, index_dir = index_call
+    (index_dir / "app").mkdir()
+    pq.write_table(pa.table({"_epoch": [1, 2], "v": [1, 2]}), index_dir / "top.parquet")
+    pq.write_table(pa.table({"_epoch": [3], "v": [3]}), index_dir / "app" / "nested.parquet")
+
+    df = process_index_calls(["index", "=", '"logs/**"', "OR", "index", "=", '"logs/app/*"', "OR",
+                              "index", "=", '"logs/*"'])
+    assert sorted(df["v"].tolist()) == [1, 2, 3]
+    assert "Skipping 1 file(s) already matched by another index pattern." in capfd.readouterr().err
+
+
+def test_batches_stream_filtered_row_groups(index_call):
+    import pandas as pd
+
+    from utils import categoricals, streaming
+
+    process_index_calls, index_dir = index_call
+    pq.write_table(pa.table({"_epoch": list(range(100)), "v": [i // 10 % 4 for i in range(100)]}),
+                   index_dir / "a.parquet", row_group_size=10)
+    pq.write_table(pa.table({"_epoch": [500, 501], "v": [3, 4]}), index_dir / "b.parquet")
+
+    tokens = ["index", "=", '"logs/*"', "v", "=", "3"]
+    batches = _load_module().scan_index_batches(tokens, max_workers=2)
+    assert batches.num_row_groups == 11
+    frames = list(batches)
+    # Row groups without a match are skipped
+    assert [len(frame) for frame in frames] == [10, 10, 1]
+    streamed = categoricals.concat(frames, ignore_index=True)
+    expected = process_index_calls(tokens).reset_index(drop=True)
+    pd.testing.assert_frame_equal(streamed, expected)
+    assert streaming.planned_rows(_load_module().plan_index_files(tokens)) == 102
@@ -0,0 +1,90 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils import index_layout
+
+
+def test_settings_default_and_update(tmp_path):
+    db = tmp_path / "settings.db"
+    assert index_layout.get_index_settings("logs", db_path=db) == index_layout.DEFAULT_INDEX_SETTINGS
+    index_layout.set_index_settings("/logs/", db_path=db, partition_by_time=True)
+    assert index_layout.get_index_settings("logs", db_path=db)["partition_by_time"] is True
+    assert index_layout.list_index_settings(db_path=db) == {
+        "logs": {**index_layout.DEFAULT_INDEX_SETTINGS, "partition_by_time": True}
+    }
+    with pytest.raises(ValueError):
+        index_layout.set_index_settings("logs", db_path=db, unknown=1)
+    with pytest.raises(ValueError):
+        index_layout.set_index_settings("logs", db_path=db, compression="lzma")
+
+
+def test_writer_profile_per_index(tmp_path):
+    db = tmp_path / "settings.db"
+    index_layout.set_index_settings("logs", db_path=db, compression="lz4", row_group_size="1000", sort_by_epoch="false")
+    profile = index_layout.writer_profile("logs", db_path=db)
+    assert (profile.compression, profile.row_group_size, profile.sort_by_epoch) == ("lz4", 1000, False)
+    assert index_layout.writer_profile("other", db_path=db).compression == "zstd"
+
+    indexes = tmp_path / "indexes"
+    assert index_layout.index_name_for_path(indexes / "logs" / "date=2024-01-01" / "hour=00" / "a.parquet", indexes) == "logs"
+    assert index_layout.index_name_for_path(tmp_path / "elsewhere.parquet", indexes) is None
+    assert index_layout.profile_for_path(indexes / "logs" / "a.parquet", db_path=db, indexes_dir=indexes) == profile
+
+
+def test_partition_subdir_is_utc():
+    assert index_layout.partition_subdir(1704070800).as_posix() == "date=2024-01-01/hour=01"
+
+
+def test_write_index_frame_flat_and_partitioned(tmp_path):
+    db = tmp_path / "settings.db"
+    df = pd.DataFrame({"_epoch": [1704067200, 1704067300, 1704074400], "v": [1, 2, 3]})
+
+    flat = index_layout.write_index_frame(df, tmp_path / "flat", "a.parquet", index_name="flat", db_path=db)
+    assert flat == [tmp_path / "flat" / "a.parquet"]
+    again = index_layout.write_index_frame(df, tmp_path / "flat", "a.parquet", index_name="flat", db_path=db)
+    assert again[0] != flat[0] and again[0].exists()
+
+    index_layout.set_index_settings("logs", db_path=db, partition_by_time=True)
+    written = index_layout.write_index_frame(df, tmp_path / "logs", "a.parquet", index_name="logs", db_path=db)
+    rel = sorted(p.relative_to(tmp_path / "logs").as_posix() for p in written)
+    assert rel == ["date=2024-01-01/hour=00/a.parquet", "date=2024-01-01/hour=02/a.parquet"]
+    assert pd.read_parquet(written[0])["v"].tolist() == [1, 2]
+
+
+def test_repartition_file(tmp_path):
+    db = tmp_path / "settings.db"
+    index_dir = tmp_path / "logs"
+    index_dir.mkdir()
+    source = index_dir / "out.parquet"
+    pd.DataFrame({"_epoch": [1704067200, 1704153600]}).to_parquet(source)
+
+    assert index_layout.repartition_file(source, index_dir, index_name="logs", db_path=db) == [source]
+    index_layout.set_index_settings("logs", db_path=db, partition_by_time=True)
+    moved = index_layout.repartition_file(source, index_dir, index_name="logs", db_path=db)
+    assert not source.exists()
+    assert len(moved) == 2 and all(p.exists() for p in moved)
+
+
+def test_settings_connections_are_closed(tmp_path, monkeypatch):
+    import sqlite3
+
+    db = tmp_path / "settings.db"
+    opened = []
+    connect = sqlite3.connect
+    monkeypatch.setattr(sqlite3, "connect", lambda *a, **k: opened.append(connect(*a, **k)) or opened[-1])
+
+    index_layout.set_index_settings("logs", db_path=db, partition_by_time=True)
+    index_layout.get_index_settings("logs", db_path=db)
+    index_layout.list_index_settings(db_path=db)
+
+    assert opened
+    for conn in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
@@ -0,0 +1,98 @@
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+import os
+import sys
+
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils import index_manifest
+
+
+def _write(path, epochs):
+    pq.write_table(pa.table({"_epoch": epochs, "host": ["a"] * len(epochs)}), path)
+
+
+def test_record_and_lookup(tmp_path):
+    db = tmp_path / "manifest.db"
+    target = tmp_path / "a.parquet"
+    _write(target, [10, 20, 30])
+
+    entry = index_manifest.record_file(target, db_path=db)
+    assert entry["num_rows"] == 3
+    assert (entry["min_epoch"], entry["max_epoch"]) == (10, 30)
+    assert set(entry["columns"]) == {"_epoch", "host"}
+
+    found = index_manifest.lookup_files([str(target)], db_path=db)
+    assert found[str(target)]["max_epoch"] == 30
+
+
+def test_lookup_refreshes_stale_entries(tmp_path):
+    db = tmp_path / "manifest.db"
+    target = tmp_path / "a.parquet"
+    _write(target, [1, 2])
+    index_manifest.record_file(target, db_path=db)
+
+    _write(target, [100, 200, 300, 400])
+    os.utime(target, (1, 1))
+    found = index_manifest.lookup_files([str(target)], db_path=db)
+    assert found[str(target)]["num_rows"] == 4
+    assert found[str(target)]["min_epoch"] == 100
+
+
+def test_refresh_keeps_superseded_marker(tmp_path):
+    db = tmp_path / "manifest.db"
+    target, merged = tmp_path / "a.parquet", tmp_path / "merged.parquet"
+    _write(target, [1, 2])
+    index_manifest.mark_superseded([target], merged, db_path=db)
+
+    os.utime(target, (1, 1))
+    found = index_manifest.lookup_files([str(target)], db_path=db)
+    assert found[str(target)]["superseded_by"] == str(merged.resolve())
+    index_manifest.record_file(target, db_path=db)
+    assert [e["path"] for e in index_manifest.superseded_entries(db_path=db)] == [str(target.resolve())]
+
+
+def test_forget_and_prune(tmp_path):
+    db = tmp_path / "manifest.db"
+    keep, gone = tmp_path / "keep.parquet", tmp_path / "gone.parquet"
+    _write(keep, [1])
+    _write(gone, [2])
+    index_manifest.record_file(keep, db_path=db)
+    index_manifest.record_file(gone, db_path=db)
+
+    gone.unlink()
+    assert index_manifest.prune_missing(db_path=db) == 1
+    index_manifest.forget_file(keep, db_path=db)
+    assert index_manifest.prune_missing(db_path=db) == 0
+
+
+def test_string_timestamps_have_no_range(tmp_path):
+    target = tmp_path / "legacy.parquet"
+    pq.write_table(pa.table({"timestamp": ["2024-01-01 00:00:00"]}), target)
+    entry = index_manifest.describe_parquet(target)
+    assert entry["min_epoch"] is None and entry["max_epoch"] is None
+
+
+def test_connections_are_closed(tmp_path, monkeypatch):
+    import sqlite3
+
+    db = tmp_path / "manifest.db"
+    target = tmp_path / "a.parquet"
+    _write(target, [1, 2])
+    opened = []
+    connect = sqlite3.connect
+    monkeypatch.setattr(sqlite3, "connect", lambda *a, **k: opened.append(connect(*a, **k)) or opened[-1])
+
+    index_manifest.lookup_files([str(target)], db_path=db)
+    index_manifest.mark_superseded([target], tmp_path / "b.parquet", db_path=db)
+    assert len(index_manifest.superseded_entries(db_path=db)) == 1
+    index_manifest.prune_missing(db_path=db)
+
+    assert len(opened) == 4
+    for conn in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
@@ -13,7 +13,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 
 fake_loader = types.ModuleType("functionality.so_loader")
 fake_loader.resolve_and_import_so = lambda path, name: types.SimpleNamespace(
-    process_index_calls=lambda tokens: pd.DataFrame(),
+    process_index_calls=lambda tokens, **_: pd.DataFrame(),
     parse_dates_to_epoch=lambda x: x,
 )
 sys.modules["functionality.so_loader"] = fake_loader
@@ -37,7 +37,7 @@ def run_query(query: str):
 def test_maketable(monkeypatch):
     monkeypatch.setattr(
         "lexers.speakQueryListener.process_index_calls",
-        lambda tokens: pd.DataFrame({"foo": [1, 2]}),
+        lambda tokens, **_: pd.DataFrame({"foo": [1, 2]}),
     )
     result = run_query('index="dummy" | maketable colA, colB')
     assert list(result.columns) == ["colA", "colB"]
@@ -0,0 +1,67 @@
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pd = pytest.importorskip("pandas")
+
+import os
+import sys
+
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from handlers.StatsHandler import StatsHandler
+from utils import metadata_stats
+
+
+def _planned(tmp_path):
+    files = {
+        "a.parquet": pa.table({"_epoch": [5, 9, 7], "v": [1, 2, 3]}),
+        "b.parquet": pa.table({"_epoch": [20, 11], "v": [4, 5]}),
+    }
+    planned = []
+    for name, table in files.items():
+        pq.write_table(table, tmp_path / name)
+        planned.append({"path": str(tmp_path / name), "source_file": f"logs/{name}", "row_groups": None})
+    frame = pd.concat([t.to_pandas().assign(_source_file=f"logs/{n}") for n, t in files.items()], ignore_index=True)
+    return planned, frame
+
+
+def test_parse_stats_accepts_only_metadata_aggregates():
+    specs, groups = metadata_stats.parse_stats("stats count, max(_epoch) as newest by _source_file")
+    assert [s["alias"] for s in specs] == ["count", "newest"]
+    assert groups == ["_source_file"]
+    assert metadata_stats.parse_stats("stats count by host") is None
+    assert metadata_stats.parse_stats("stats sum(v)") is None
+    assert metadata_stats.parse_stats("eventstats count") is None
+    # earliest/latest take values in read order, not the footer's min/max
+    assert metadata_stats.parse_stats("stats earliest(_epoch)") is None
+    assert metadata_stats.parse_stats("stats count, latest(_epoch) by _source_file") is None
+
+
+def test_is_unfiltered():
+    assert metadata_stats.is_unfiltered(["index", "=", '"logs/*"'])
+    assert not metadata_stats.is_unfiltered(["index", "=", '"logs/*"', "status", "=", "500"])
+    assert not metadata_stats.is_unfiltered(["index", "=", '"logs/*"', "earliest", "=", '"1"'])
+
+
+@pytest.mark.parametrize("segment", [
+    "stats count",
+    "stats count, min(_epoch) as first, max(_epoch) as last",
+    "stats count by _source_file",
+    "stats max(_epoch) as newest, count by _source_file",
+])
+def test_answer_matches_full_stats(tmp_path, segment):
+    planned, frame = _planned(tmp_path)
+    specs, groups = metadata_stats.parse_stats(segment)
+
+    answered = metadata_stats.answer(planned, specs, groups, db_path=tmp_path / "manifest.db")
+    expected = StatsHandler().run_stats(segment.split(), frame)
+    pd.testing.assert_frame_equal(answered, expected, check_dtype=False)
+
+
+def test_answer_declines_partial_reads(tmp_path):
+    planned, _ = _planned(tmp_path)
+    planned[0]["row_groups"] = [0]
+    specs, groups = metadata_stats.parse_stats("stats count")
+    assert metadata_stats.answer(planned, specs, groups, db_path=tmp_path / "manifest.db") is None
@@ -0,0 +1,45 @@
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+import os
+import sys
+
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.parquet_footer_cache import ParquetFooterCache
+
+
+def test_hits_until_file_changes(tmp_path):
+    cache = ParquetFooterCache()
+    target = tmp_path / "a.parquet"
+    pq.write_table(pa.table({"_epoch": [1, 2]}), target)
+
+    first = cache.get(target)
+    assert first.num_rows == 2 and first.schema.names == ["_epoch"]
+    assert cache.get(target) is first
+    assert cache.info()["hits"] == 1
+
+    pq.write_table(pa.table({"_epoch": [1, 2, 3], "host": ["a", "b", "c"]}), target)
+    os.utime(target, ns=(1, 1))
+    refreshed = cache.get(target)
+    assert refreshed.num_rows == 3 and "host" in refreshed.schema.names
+    assert cache.info()["misses"] == 2
+
+
+def test_lru_eviction_and_invalidate(tmp_path):
+    cache = ParquetFooterCache(max_entries=2)
+    paths = []
+    for name in ("a", "b", "c"):
+        path = tmp_path / f"{name}.parquet"
+        pq.write_table(pa.table({"v": [1]}), path)
+        paths.append(path)
+        cache.get(path)
+    assert cache.info()["entries"] == 2
+
+    cache.get(paths[0])  # evicted earlier, so this is a miss
+    assert cache.info()["misses"] == 4
+    cache.invalidate(paths[0])
+    assert cache.info()["entries"] == 1
@@ -0,0 +1,49 @@
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pd = pytest.importorskip("pandas")
+
+import os
+import sys
+
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils import parquet_writer
+
+
+def test_default_profile_layout(tmp_path):
+    target = tmp_path / "out.parquet"
+    table = pa.table({
+        "_epoch": [30, 10, 20, 40] * 50,
+        "host": ["a", "b"] * 100,
+        "msg": [f"message {i}" for i in range(200)],
+    })
+    parquet_writer.write_table(table, target, parquet_writer.DEFAULT_PROFILE._replace(row_group_size=50))
+
+    meta = pq.ParquetFile(target).metadata
+    assert meta.num_row_groups == 4
+    epochs = [meta.row_group(i).column(0) for i in range(meta.num_row_groups)]
+    assert [(c.statistics.min, c.statistics.max) for c in epochs] == [(10, 10), (20, 20), (30, 30), (40, 40)]
+    assert epochs[0].compression == "ZSTD"
+    assert "DELTA_BINARY_PACKED" in epochs[0].encodings
+    columns = {meta.row_group(0).column(i).path_in_schema: meta.row_group(0).column(i) for i in range(3)}
+    assert columns["host"].has_dictionary_page
+    assert not columns["msg"].has_dictionary_page
+
+
+def test_results_profile_keeps_row_order(tmp_path):
+    target = tmp_path / "results.parquet"
+    df = pd.DataFrame({"_epoch": [3, 1, 2], "v": ["x", "y", "z"]})
+    parquet_writer.write_frame(df, target, parquet_writer.RESULTS_PROFILE)
+    assert pd.read_parquet(target)["_epoch"].tolist() == [3, 1, 2]
+    assert list(pd.read_parquet(target).columns) == ["_epoch", "v"]
+
+
+def test_validate_profile_rejects_bad_values():
+    with pytest.raises(ValueError):
+        parquet_writer.validate_profile(parquet_writer.WriterProfile(compression="lzma"))
+    with pytest.raises(ValueError):
+        parquet_writer.validate_profile(parquet_writer.WriterProfile(row_group_size=0))
+    assert parquet_writer.validate_profile(parquet_writer.WriterProfile(compression="lz4"))
@@ -13,7 +13,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 
 fake_loader = types.ModuleType("functionality.so_loader")
 fake_loader.resolve_and_import_so = lambda path, name: types.SimpleNamespace(
-    process_index_calls=lambda tokens: pd.DataFrame(),
+    process_index_calls=lambda tokens, **_: pd.DataFrame(),
     parse_dates_to_epoch=lambda x: x,
 )
 sys.modules["functionality.so_loader"] = fake_loader
@@ -37,7 +37,7 @@ def run_query(query: str):
 def test_stats_directive(monkeypatch):
     df = pd.DataFrame({"a": [1]})
     monkeypatch.setattr(
-        "lexers.speakQueryListener.process_index_calls", lambda tokens: df
+        "lexers.speakQueryListener.process_index_calls", lambda tokens, **_: df
     )
     called = {}
     def fake_stats(self, tokens, d):
@@ -52,7 +52,7 @@ def test_stats_directive(monkeypatch):
 def test_stats_directive_paren_collapse(monkeypatch):
     df = pd.DataFrame({"a": [1]})
     monkeypatch.setattr(
-        "lexers.speakQueryListener.process_index_calls", lambda tokens: df
+        "lexers.speakQueryListener.process_index_calls", lambda tokens, **_: df
     )
     called = {}
 
@@ -69,7 +69,7 @@ def test_stats_directive_paren_collapse(monkeypatch):
 def test_eval_directive(monkeypatch):
     df = pd.DataFrame({"a": [1]})
     monkeypatch.setattr(
-        "lexers.speakQueryListener.process_index_calls", lambda tokens: df
+        "lexers.speakQueryListener.process_index_calls", lambda tokens, **_: df
     )
     called = {}
     class FakeEval:
@@ -0,0 +1,58 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.pipeline_analysis import head_limit, referenced_identifiers, required_fields
+
+
+def test_no_projection_without_barrier():
+    assert required_fields(["where status=500", "eval x = y + 1"]) is None
+
+
+def test_table_limits_fields():
+    assert required_fields(["table host, status"]) == ["host", "status"]
+
+
+def test_upstream_commands_add_references():
+    fields = required_fields(['where level="error"', "rename src as source", "table source"])
+    assert set(fields) == {"level", "src", "source", "as"}
+
+
+def test_stats_is_barrier():
+    fields = required_fields(["eval a = b", "stats count by host", "head 5"])
+    assert {"host", "a", "b"} <= set(fields)
+    assert "count" in fields
+
+
+def test_fields_minus_keeps_downstream():
+    assert required_fields(["fields - noise"]) is None
+    assert required_fields(["fields - noise", "table host"]) == ["host"]
+
+
+def test_unknown_or_wildcard_reads_everything():
+    assert required_fields(["table host*"]) is None
+    assert required_fields(["fieldsummary"]) is None
+    assert required_fields(["`my_macro`", "table host"]) is None
+    assert required_fields(["unknowncmd foo", "table host"]) is None
+
+
+def test_quoted_literals_are_not_fields():
+    names = referenced_identifiers("status=\"not_a_field\" 'quoted field'")
+    assert "not_a_field" not in names
+    assert "quoted field" in names
+
+
+def test_head_limit_after_row_preserving_commands():
+    assert head_limit(["head 100"]) == 100
+    assert head_limit(["limit 3", "stats count"]) == 3
+    assert head_limit(["head"]) == 5
+    assert head_limit(["eval x = y", "rename a as b", "table b, x", "head 10"]) == 10
+
+
+def test_head_limit_not_pushed_past_filters():
+    assert head_limit(["where status=500", "head 10"]) is None
+    assert head_limit(["sort -_epoch", "head 10"]) is None
+    assert head_limit(["`my_macro`", "head 10"]) is None
+    assert head_limit(["head count"]) is None
+    assert head_limit(["stats count by host"]) is None
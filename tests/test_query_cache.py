@@ -0,0 +1,61 @@
+import pytest
+
+pytest.importorskip("antlr4")
+pd = pytest.importorskip("pandas")
+
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Provide lightweight stand-in for so_loader
+fake_loader = types.ModuleType("functionality.so_loader")
+fake_loader.resolve_and_import_so = lambda path, name: types.SimpleNamespace(
+    process_index_calls=lambda tokens, **_: pd.DataFrame(),
+    parse_dates_to_epoch=lambda x: x,
+)
+sys.modules["functionality.so_loader"] = fake_loader
+
+from query_engine import CmdExecutionBackend
+from utils import query_cache
+
+
+def _compiled(query, syntax_errors=0):
+    return query_cache.CompiledQuery(query, ("index", "=", '"x"'), (), None, syntax_errors)
+
+
+def test_cache_counts_hits_and_evicts_least_recently_used():
+    cache = query_cache.QueryCache(max_entries=2)
+    compiled = []
+
+    def compile_query(text):
+        compiled.append(text)
+        return _compiled(text)
+
+    cache.get('index="a"', compile_query)
+    cache.get('index="b"\r\n', compile_query)
+    assert cache.get('  index="a"  \n', compile_query).query == 'index="a"\n'
+    cache.get('index="c"', compile_query)
+    cache.get('index="b"', compile_query)
+    assert compiled == ['index="a"\n', 'index="b"\n', 'index="c"\n', 'index="b"\n']
+    assert cache.info() == {"entries": 2, "max_entries": 2, "hits": 1, "misses": 4}
+
+    cache.get('index="d"', lambda text: _compiled(text, syntax_errors=1))
+    assert cache.info()["entries"] == 2
+
+
+def test_repeated_queries_skip_parsing(monkeypatch):
+    df = pd.DataFrame({"host": ["a", "b", "a"], "bytes": [1, 2, 3]})
+    monkeypatch.setattr("lexers.speakQueryListener.process_index_calls", lambda tokens, **_: df.copy())
+    monkeypatch.setattr(query_cache, "_cache", query_cache.QueryCache())
+    query = 'index="logs/*" | eval kb=bytes*2 | where host!="b" | stats sum(kb) as kb by host\n'
+
+    first = CmdExecutionBackend.execute_query(query)
+    monkeypatch.setattr(CmdExecutionBackend, "parse_query", None)
+    second = CmdExecutionBackend.execute_query(query.replace("\n", "\r\n"))
+
+    assert first["kb"].tolist() == [8]
+    pd.testing.assert_frame_equal(first, second)
+    assert query_cache.cache_info()["hits"] == 1
+    assert query_cache.cache_info()["misses"] == 1
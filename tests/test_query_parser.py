@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip("antlr4")
+yaml = pytest.importorskip("yaml")
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from lexers.parse_benchmark import DEFAULT_QUERIES, load_queries
+from lexers.query_parser import parse_query
+
+
+@pytest.mark.parametrize("query", load_queries(DEFAULT_QUERIES))
+def test_two_stage_parse_matches_full_ll(query):
+    tree, parser = parse_query(query)
+    ll_tree, ll_parser = parse_query(query, two_stage=False)
+    assert parser.getNumberOfSyntaxErrors() == ll_parser.getNumberOfSyntaxErrors() == 0
+    assert tree.toStringTree(recog=parser) == ll_tree.toStringTree(recog=ll_parser)
+
+
+def test_invalid_query_falls_back_to_ll_and_reports_errors(capsys):
+    query = 'index="x" | eval = | stats'
+    tree, parser = parse_query(query)
+    ll_tree, ll_parser = parse_query(query, two_stage=False)
+    assert parser.getNumberOfSyntaxErrors() == ll_parser.getNumberOfSyntaxErrors() > 0
+    assert tree.toStringTree(recog=parser) == ll_tree.toStringTree(recog=ll_parser)
+    assert "mismatched input" in capsys.readouterr().err
@@ -0,0 +1,201 @@
+import pytest
+
+pytest.importorskip("antlr4")
+pa = pytest.importorskip("pyarrow")
+pd = pytest.importorskip("pandas")
+
+import importlib.util
+import os
+import sys
+import types
+from pathlib import Path
+
+import antlr4
+import numpy as np
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Provide lightweight stand-in for so_loader
+fake_loader = types.ModuleType("functionality.so_loader")
+fake_loader.resolve_and_import_so = lambda path, name: types.SimpleNamespace(
+    process_index_calls=lambda tokens, **_: pd.DataFrame(),
+    parse_dates_to_epoch=lambda x: x,
+)
+sys.modules["functionality.so_loader"] = fake_loader
+
+from handlers.GeneralHandler import GeneralHandler
+from lexers.antlr4_active.speakQueryLexer import speakQueryLexer
+from lexers.antlr4_active.speakQueryParser import speakQueryParser
+from lexers.query_parser import parse_query
+from lexers.speakQueryListener import speakQueryListener
+from utils import categoricals, query_plan
+
+_BUILD_DIR = Path(__file__).resolve().parents[1] / "functionality" / "cpp_index_call" / "build"
+_INDEX = ["index", "=", '"logs/*"']
+
+
+def _optimize(segments, index_tokens=_INDEX):
+    query = " ".join([*index_tokens, *(f"| {segment}" for segment in segments)])
+    tree, _ = parse_query(query)
+    return speakQueryListener(query).compile(tree).plan
+
+
+def test_filters_move_ahead_of_evals_and_merge_into_the_scan():
+    plan = _optimize([
+        "eval mb=bytes/1048576",
+        "where status=500",
+        "sort -mb",
+        'search host="a" OR host IN ("b", "c")',
+    ])
+    assert plan.scan.tokens == _INDEX + [
+        "(", "(", "status", "=", "500", "AND", "(", "host", "=", '"a"', "OR",
+        "host", "IN", "(", '"b"', ",", '"c"', ")", ")", ")", ")",
+    ]
+    assert plan.segments() == ["eval mb=bytes/1048576", "sort -mb"]
+    # Untouched steps keep their parse-tree position
+    assert [step.source for step in plan.steps] == [0, 2]
+
+
+@pytest.mark.parametrize("segments, index_tokens", [
+    (["where status!=500"], _INDEX),
+    (["where a=1 OR b=2"], _INDEX),
+    (['where "boom" OR a=1'], _INDEX),
+    (["where a=1"], ["index", "=", '"a"', "OR", "index", "=", '"b"']),
+    (["where a=1"], ["index", "=", '"a"', "or", "index", "=", '"b"']),
+    (["where earliest=1"], _INDEX),
+    (["eval a=2", "where a=1"], _INDEX),
+    (['eval msg="boom"', 'where "boom"'], _INDEX),
+])
+def test_filters_that_could_change_results_stay_in_place(segments, index_tokens):
+    plan = _optimize(segments, index_tokens)
+    assert plan.scan.tokens == index_tokens
+    assert plan.segments()[-1] == segments[-1]
+
+
+def test_dead_eval_assignments_are_pruned_and_constants_folded():
+    plan = _optimize(["eval ttl=60*60*24, unused=lower(host), keep=ttl+1", "table host, keep"])
+    assert plan.segments() == ["eval ttl=86400, keep=ttl+1", "table host, keep"]
+    assert plan.steps[0].source is None
+    assert _optimize(["eval x=a", "stats count by host"]).segments() == ["stats count by host"]
+    assert query_plan.fold_constants('if_(x > 2*3, "a", 1/0)') == 'if_(x > 6, "a", 1/0)'
+    assert query_plan.fold_constants("y * (1-3)") == "y * (-2)"
+
+
+def test_sort_followed_by_head_is_planned_as_top_k():
+    plan = _optimize(["sort -latency", "head 3"])
+    assert plan.steps[0].limit == 3
+    assert _optimize(["sort -latency", "eval x=1", "head 3"]).steps[0].limit is None
+
+
+def test_directives_are_cut_at_top_level_pipes():
+    query = (
+        'index="logs/*" | rex field=msg "(?<a>x|y)" | join host [ search index="b" | fields host ]'
+        ' | eval k=concat(host, "|")'
+    )
+    tree, _ = parse_query(query)
+    compiled = speakQueryListener(query).compile(tree)
+    assert [directive.text for directive in compiled.directives] == [
+        'rex field=msg "(?<a>x|y)"',
+        'join host [ search index="b" | fields host ]',
+        'eval k=concat(host, "|")',
+    ]
+    assert [directive.command for directive in compiled.directives] == ["rex", "join", "eval"]
+    assert compiled.directives[2].tokens == ("eval", "k", "=", "concat", "(", "host", ",", '"|"', ")")
+    assert [step.kind for step in compiled.plan.steps] == ["command", "subsearch", "eval"]
+
+
+@pytest.mark.parametrize("columns, direction", [
+    (["latency"], "-"),
+    (["latency"], "+"),
+    (["status", "latency"], "-"),
+    (["host", "row"], "+"),
+])
+@pytest.mark.parametrize("count", [1, 10, 280, 500])
+def test_top_k_matches_sort_and_head(columns, direction, count):
+    rng = np.random.default_rng(7)
+    latency = rng.integers(0, 20, 300).astype(float)
+    latency[rng.random(300) < 0.1] = np.nan
+    df = pd.DataFrame({
+        "row": np.arange(300),
+        "status": rng.choice([200, 404, 500], 300),
+        "latency": latency,
+        "host": rng.choice(["web1", "web2", "db1"], 300),
+    })
+    expected = GeneralHandler.sort_df_by_columns(df, columns, direction).head(count)
+    pd.testing.assert_frame_equal(GeneralHandler.top_k_by_columns(df, columns, count, direction), expected)
+
+
+def test_sort_keeps_tied_rows_in_input_order():
+    df = pd.DataFrame({"latency": [5, 9, 5, 9, 5], "row": range(5)})
+    assert GeneralHandler.sort_df_by_columns(df, ["latency"], "-")["row"].tolist() == [1, 3, 0, 2, 4]
+    assert GeneralHandler.top_k_by_columns(df, ["latency"], 3, "-")["row"].tolist() == [1, 3, 0]
+
+
+def _load_module():
+    builds = sorted(_BUILD_DIR.glob("cpp_index_call*.so"), key=os.path.getmtime)
+    if not builds:
+        pytest.skip("cpp_index_call is not built")
+    spec = importlib.util.spec_from_file_location("cpp_index_call", builds[-1])
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_query(query: str):
+    input_stream = antlr4.InputStream(query)
+    lexer = speakQueryLexer(input_stream)
+    stream = antlr4.CommonTokenStream(lexer)
+    parser = speakQueryParser(stream)
+    tree = parser.speakQuery()
+    listener = speakQueryListener(query)
+    antlr4.ParseTreeWalker().walk(listener, tree)
+    return listener.main_df
+
+
+@pytest.mark.parametrize("pipeline", [
+    '| eval kb=bytes/1024 | where status=500 AND host IN ("web1", "db1") | stats count, sum(kb) as kb by host',
+    '| where region="eu" | sort -bytes | head 4',
+    '| search status>=404 | search "timeout" | table host, status, message',
+    '| eval unused=bytes*2, kb=bytes/1024 | where bytes>500 | fields host, kb',
+])
+def test_optimized_plan_matches_unoptimized(tmp_path, monkeypatch, pipeline):
+    module = _load_module()
+    index_dir = tmp_path / "indexes" / "logs"
+    index_dir.mkdir(parents=True)
+    rng = np.random.default_rng(11)
+    for name, rows in (("a", 120), ("b", 80)):
+        table = {
+            "_epoch": list(range(rows)),
+            "host": rng.choice(["web1", "web2", "db1"], rows).tolist(),
+            "status": rng.choice([200, 404, 500], rows).tolist(),
+            "bytes": rng.integers(0, 1000, rows).tolist(),
+            "message": rng.choice(["ok", "upstream timeout", "reset"], rows).tolist(),
+        }
+        if name == "a":
+            # The second file has no region column at all
+            table["region"] = rng.choice(["eu", "us"], rows).tolist()
+        pq.write_table(pa.table(table), index_dir / f"{name}.parquet")
+    monkeypatch.chdir(tmp_path)
+
+    scanned = []
+
+    def process_index_calls(tokens, **kwargs):
+        scanned.append(list(tokens))
+        return module.process_index_calls(tokens, **kwargs)
+
+    monkeypatch.setattr("lexers.speakQueryListener.process_index_calls", process_index_calls)
+    monkeypatch.setattr("lexers.speakQueryListener.plan_index_files", module.plan_index_files)
+    result = run_query(f'index="logs/*" {pipeline}')
+
+    monkeypatch.setattr(query_plan, "RULES", [])
+    expected = run_query(f'index="logs/*" {pipeline}')
+
+    assert len(scanned[0]) > len(scanned[1])
+    assert len(expected)
+    # Categories of _source_file only list the files each scan read
+    pd.testing.assert_frame_equal(
+        result.apply(categoricals.plain).reset_index(drop=True),
+        expected.apply(categoricals.plain).reset_index(drop=True),
+        check_dtype=False,
+    )
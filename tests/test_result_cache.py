@@ -0,0 +1,94 @@
+import pytest
+
+pytest.importorskip("antlr4")
+pa = pytest.importorskip("pyarrow")
+pd = pytest.importorskip("pandas")
+
+import os
+import sys
+import types
+
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Provide lightweight stand-in for so_loader
+fake_loader = types.ModuleType("functionality.so_loader")
+fake_loader.resolve_and_import_so = lambda path, name: types.SimpleNamespace(
+    process_index_calls=lambda tokens, **_: pd.DataFrame(),
+    parse_dates_to_epoch=lambda x: x,
+)
+sys.modules["functionality.so_loader"] = fake_loader
+
+from query_engine import CmdExecutionBackend
+from utils import result_cache
+
+
+@pytest.fixture
+def index_file(tmp_path, monkeypatch):
+    path = tmp_path / "a.parquet"
+    df = pd.DataFrame({"host": ["a", "b", "a"], "bytes": [1, 2, 3]})
+    pq.write_table(pa.Table.from_pandas(df), path)
+    scans = []
+
+    def process_index_calls(tokens, **_):
+        scans.append(list(tokens))
+        return pq.read_table(path).to_pandas()
+
+    monkeypatch.setattr("lexers.speakQueryListener.process_index_calls", process_index_calls)
+    monkeypatch.setattr("lexers.speakQueryListener.plan_index_files", lambda tokens: [{"path": str(path)}])
+    monkeypatch.setattr(result_cache, "_cache", result_cache.ResultCache())
+    return path, scans
+
+
+def test_results_are_reused_until_an_index_file_changes(index_file):
+    path, scans = index_file
+    query = 'index="logs/*" | eval kb=bytes*2 | stats sum(kb) as kb by host\n'
+
+    first = CmdExecutionBackend.execute_query(query)
+    second = CmdExecutionBackend.execute_query(query)
+    assert len(scans) == 1
+    pd.testing.assert_frame_equal(first, second)
+
+    CmdExecutionBackend.execute_query(query, use_cache=False)
+    assert len(scans) == 2
+
+    pq.write_table(pa.table({"host": ["c"], "bytes": [10]}), path)
+    changed = CmdExecutionBackend.execute_query(query)
+    assert len(scans) == 3
+    assert changed["kb"].tolist() == [20]
+    assert result_cache.cache_info()["invalidations"] == 1
+
+
+def test_lookup_files_read_are_part_of_the_entry(tmp_path):
+    lookup = tmp_path / "hosts.csv"
+    lookup.write_text("host\na\n")
+    cache = result_cache.ResultCache()
+    df = pd.DataFrame({"host": pd.Categorical(["a", "b"]), "n": [1, 2]})
+
+    with result_cache.recording() as read_inputs:
+        result_cache.record_input(lookup)
+    assert cache.store("| inputlookup hosts.csv", df, (), read_inputs)
+    pd.testing.assert_frame_equal(cache.lookup("| inputlookup hosts.csv\r\n", ()), df)
+
+    lookup.write_text("host\na\nb\n")
+    assert cache.lookup("| inputlookup hosts.csv", ()) is None
+    assert cache.info()["entries"] == 0
+
+
+def test_size_budget_and_uncacheable_results():
+    df = pd.DataFrame({"n": range(1000)})
+    size = len(result_cache.encode(df))
+    cache = result_cache.ResultCache(max_bytes=2 * size)
+    for query in ("a", "b"):
+        assert cache.store(query, df, (), {})
+    cache.lookup("a", ())
+    cache.store("c", df, (), {})
+    assert cache.lookup("b", ()) is None
+    assert cache.lookup("a", ()) is not None
+    assert cache.info()["bytes"] == 2 * size
+
+    assert not cache.store("d", pd.DataFrame({"values": [["x", "y"], ["z"]]}), (), {})
+    assert not result_cache.is_cacheable('index="x" | outputlookup out.csv')
+    assert not result_cache.is_cacheable('index="x" | eval r=random()')
+    assert result_cache.index_patterns('index="a" | join host [ search index = "b" ]') == ['"a"', '"b"']
@@ -13,7 +13,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 
 fake_loader = types.ModuleType("functionality.so_loader")
 fake_loader.resolve_and_import_so = lambda path, name: types.SimpleNamespace(
-    process_index_calls=lambda tokens: pd.DataFrame(),
+    process_index_calls=lambda tokens, **_: pd.DataFrame(),
     parse_dates_to_epoch=lambda x: x,
 )
 sys.modules["functionality.so_loader"] = fake_loader
@@ -37,7 +37,7 @@ def run_query(query: str):
 def test_rex_basic(monkeypatch):
     df = pd.DataFrame({"_raw": ["user=1", "user=2"]})
     monkeypatch.setattr(
-        "lexers.speakQueryListener.process_index_calls", lambda tokens: df.copy()
+        "lexers.speakQueryListener.process_index_calls", lambda tokens, **_: df.copy()
     )
     result = run_query('index="dummy" | rex field=_raw "user=(?P<uid>\\d+)"')
     assert result["uid"].tolist() == ["1", "2"]
@@ -46,7 +46,7 @@ def test_rex_basic(monkeypatch):
 def test_rex_with_field(monkeypatch):
     df = pd.DataFrame({"message": ["status=200", "status=404"]})
     monkeypatch.setattr(
-        "lexers.speakQueryListener.process_index_calls", lambda tokens: df.copy()
+        "lexers.speakQueryListener.process_index_calls", lambda tokens, **_: df.copy()
     )
     query = 'index="dummy" | rex field=message "status=(?P<code>\\d{3})"'
     result = run_query(query)
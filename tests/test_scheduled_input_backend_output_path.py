@@ -3,25 +3,18 @@ import sys
 from pathlib import Path
 import pytest
 
+pd = pytest.importorskip('pandas')
+
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import scheduled_input_engine.ScheduledInputBackend as sib
 
 
-class DummyDF:
-    def __init__(self, recorder):
-        self._recorder = recorder
-
-    def to_parquet(self, path, index=False, compression='gzip'):
-        # Record the path where data would be saved
-        self._recorder['path'] = Path(path)
-
-
 class FakeExecution:
     def __init__(self, output_filename):
         self.output_path = output_filename
 
     def execute_code(self, *_args, **_kwargs):
-        return DummyDF(self._recorder)
+        return pd.DataFrame({'value': [1]})
 
 
 @pytest.fixture
@@ -34,6 +27,8 @@ def backend(monkeypatch, tmp_path):
 
         monkeypatch.setattr(sib, 'SIExecution', lambda code: exec_instance)
         monkeypatch.setattr(sib, 'get_cached_or_fetch', lambda *a, **k: None)
+        # Record the path where data was saved
+        monkeypatch.setattr(sib, 'record_file', lambda path: recorder.__setitem__('path', Path(path)))
 
         backend_obj = sib.ScheduledInputBackend.__new__(sib.ScheduledInputBackend)
         backend_obj.INDEXES_DIR = tmp_path
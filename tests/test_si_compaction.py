@@ -0,0 +1,81 @@
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+import os
+import sys
+import time
+
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scheduled_input_engine import SICompaction
+from utils import index_manifest
+
+
+def _write_small_files(directory, count, age=3600):
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = directory / f"part_{i}.parquet"
+        # Newest rows in the first file so the merged output has to be sorted
+        pq.write_table(pa.table({"_epoch": [100 - i * 10, 101 - i * 10], "v": [i, i]}), path)
+        old = time.time() - age
+        os.utime(path, (old, old))
+        paths.append(path)
+    return paths
+
+
+def test_find_groups_respects_thresholds(tmp_path):
+    db = tmp_path / "manifest.db"
+    indexes = tmp_path / "indexes"
+    _write_small_files(indexes / "busy", 5)
+    _write_small_files(indexes / "quiet", 2)
+    _write_small_files(indexes / "fresh", 5, age=0)
+    _write_small_files(indexes / "replaced", 5)
+
+    groups = SICompaction.find_compaction_groups(indexes, skip_dirs={"replaced"}, manifest_db=db)
+    assert [sorted(p.name for p in g) for g in groups] == [[f"part_{i}.parquet" for i in range(5)]]
+    assert {p.parent.name for p in groups[0]} == {"busy"}
+
+
+def test_compact_files_sorts_and_marks_sources(tmp_path):
+    db = tmp_path / "manifest.db"
+    sources = _write_small_files(tmp_path / "logs", 4)
+
+    summary = SICompaction.compact_files(sources, manifest_db=db)
+    merged = pq.read_table(summary["compacted_file"])
+    assert merged.num_rows == summary["rows"] == 8
+    assert merged["_epoch"].to_pylist() == sorted(merged["_epoch"].to_pylist())
+
+    superseded = {e["path"]: e["superseded_by"] for e in index_manifest.superseded_entries(db_path=db)}
+    assert set(superseded) == {str(p.resolve()) for p in sources}
+    assert set(superseded.values()) == {str(os.path.abspath(summary["compacted_file"]))}
+    # Already merged files are not picked up again
+    assert SICompaction.find_compaction_groups(tmp_path, manifest_db=db) == []
+
+
+def test_purge_waits_for_grace_period(tmp_path):
+    db = tmp_path / "manifest.db"
+    sources = _write_small_files(tmp_path / "logs", 4)
+    SICompaction.compact_files(sources, manifest_db=db)
+
+    assert SICompaction.purge_superseded(grace_seconds=600, manifest_db=db) == []
+    assert all(p.exists() for p in sources)
+
+    deleted = SICompaction.purge_superseded(grace_seconds=600, manifest_db=db, now=time.time() + 601)
+    assert sorted(f for f, _ in deleted) == sorted(str(p) for p in sources)
+    assert not any(p.exists() for p in sources)
+    assert index_manifest.superseded_entries(db_path=db) == []
+
+
+def test_changed_source_is_restored_instead_of_deleted(tmp_path):
+    db = tmp_path / "manifest.db"
+    sources = _write_small_files(tmp_path / "logs", 4)
+    SICompaction.compact_files(sources, manifest_db=db)
+    pq.write_table(pa.table({"_epoch": [1, 2, 3], "v": [9, 9, 9]}), sources[0])
+
+    deleted = SICompaction.purge_superseded(grace_seconds=0, manifest_db=db, now=time.time() + 1)
+    assert str(sources[0]) not in {f for f, _ in deleted}
+    assert sources[0].exists()
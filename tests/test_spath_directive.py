@@ -14,7 +14,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 # provide dummy so_loader module for listener import
 fake_loader = types.ModuleType("functionality.so_loader")
 fake_loader.resolve_and_import_so = lambda path, name: types.SimpleNamespace(
-    process_index_calls=lambda tokens: pd.DataFrame(),
+    process_index_calls=lambda tokens, **_: pd.DataFrame(),
     parse_dates_to_epoch=lambda x: x,
 )
 sys.modules["functionality.so_loader"] = fake_loader
@@ -38,7 +38,7 @@ def run_query(query: str):
 def test_spath_basic(monkeypatch):
     df = pd.DataFrame({"jsonField": [{"details": {"info": 1}}, {"details": {"info": 2}}]})
     monkeypatch.setattr(
-        "lexers.speakQueryListener.process_index_calls", lambda tokens: df.copy()
+        "lexers.speakQueryListener.process_index_calls", lambda tokens, **_: df.copy()
     )
     query = 'index="dummy" | spath input=jsonField output=extractedField path=details.info'
     result = run_query(query)
@@ -0,0 +1,189 @@
+import pytest
+
+pytest.importorskip("antlr4")
+pd = pytest.importorskip("pandas")
+
+import importlib.util
+import os
+import sys
+import types
+from pathlib import Path
+
+import antlr4
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Provide lightweight stand-in for so_loader
+fake_loader = types.ModuleType("functionality.so_loader")
+fake_loader.resolve_and_import_so = lambda path, name: types.SimpleNamespace(
+    process_index_calls=lambda tokens, **_: pd.DataFrame(),
+    parse_dates_to_epoch=lambda x: x,
+)
+sys.modules["functionality.so_loader"] = fake_loader
+
+from handlers.GeneralHandler import GeneralHandler
+from handlers.StatsHandler import StatsHandler
+from lexers.antlr4_active.speakQueryLexer import speakQueryLexer
+from lexers.antlr4_active.speakQueryParser import speakQueryParser
+from lexers.speakQueryListener import speakQueryListener
+from utils import categoricals, query_plan, streaming
+
+_BUILD_DIR = Path(__file__).resolve().parents[1] / "functionality" / "cpp_index_call" / "build"
+
+
+@pytest.fixture
+def keep_filters_in_pipeline(monkeypatch):
+    # The stand-in scanner ignores index call filters, so filters must not be pushed into it
+    rules = [rule for rule in query_plan.RULES if rule is not query_plan.push_down_filter]
+    monkeypatch.setattr(query_plan, "RULES", rules)
+
+
+def _frame(rows=300, seed=3):
+    rng = np.random.default_rng(seed)
+    latency = rng.integers(0, 100, rows).astype(float)
+    latency[rng.random(rows) < 0.1] = np.nan
+    hosts = rng.choice(["web1", "web2", "db1"], rows).astype(object)
+    hosts[rng.random(rows) < 0.05] = None
+    return pd.DataFrame({
+        "row": np.arange(rows),
+        "status": rng.choice([200, 404, 500], rows),
+        "latency": latency,
+        "host": hosts,
+    })
+
+
+def _batches(df, size=37):
+    return [df.iloc[start:start + size] for start in range(0, len(df), size)]
+
+
+@pytest.mark.parametrize("segment", [
+    "stats count",
+    "stats count, sum(latency), avg(latency) as mean, min(latency), max(status), range(latency)",
+    "stats count by host",
+    "stats count(latency), dc(status), values(status) as seen, earliest(latency), latest(row) by host",
+    "stats sum(latency) as total, first(host) as h, last(latency) by status, host",
+])
+def test_stats_accumulator_matches_stats_handler(segment):
+    df = _frame()
+    specs, groups = StatsHandler().parse_clause(segment.split(None, 1)[1])
+    assert streaming.StatsAccumulator.supports(specs)
+    accumulator = streaming.StatsAccumulator(specs, groups)
+    for batch in _batches(df):
+        accumulator.update(batch)
+    expected = StatsHandler().run_stats(segment.split(), df)
+    pd.testing.assert_frame_equal(accumulator.result(), expected, check_dtype=False)
+
+
+def test_stats_accumulator_declines_unmergeable_specs():
+    specs, _ = StatsHandler().parse_clause("median(latency), count")
+    assert not streaming.StatsAccumulator.supports(specs)
+
+
+def test_dedup_filter_and_head_match_handlers():
+    df = _frame()
+    dedup = streaming.DedupFilter(["host", "status"])
+    head = streaming.HeadLimit(50)
+    for batch in _batches(df):
+        dedup.update(batch)
+        if not head.done:
+            head.update(batch)
+    expected = GeneralHandler.execute_dedup(df.copy(), ["host", ",", "status"]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(dedup.result(), expected)
+    pd.testing.assert_frame_equal(head.result(), df.head(50))
+    assert streaming.dedup_fields(["dedup", "2", "host"]) is None
+
+
+def run_query(query: str):
+    input_stream = antlr4.InputStream(query)
+    lexer = speakQueryLexer(input_stream)
+    stream = antlr4.CommonTokenStream(lexer)
+    parser = speakQueryParser(stream)
+    tree = parser.speakQuery()
+    listener = speakQueryListener(query)
+    antlr4.ParseTreeWalker().walk(listener, tree)
+    return listener.main_df
+
+
+@pytest.mark.usefixtures("keep_filters_in_pipeline")
+@pytest.mark.parametrize("pipeline", [
+    '| where status=500 | stats count, avg(latency) as mean by host',
+    '| eval slow=latency*2 | dedup host | sort row',
+    '| where latency>50 | head 7',
+    '| where status!=404 | sort -latency | head 3',
+])
+def test_streamed_query_matches_materialised(monkeypatch, pipeline):
+    df = _frame()
+    scanned = []
+
+    def scan_index_batches(tokens, **_):
+        for batch in _batches(df):
+            scanned.append(len(batch))
+            yield batch.copy()
+
+    monkeypatch.setattr("lexers.speakQueryListener.process_index_calls", lambda tokens, **_: df.copy())
+    monkeypatch.setattr("lexers.speakQueryListener.plan_index_files", lambda tokens: [])
+    expected = run_query(f'index="logs/*" {pipeline}')
+    assert not scanned
+
+    monkeypatch.setattr("lexers.speakQueryListener.process_index_calls", None)
+    monkeypatch.setattr("lexers.speakQueryListener.scan_index_batches", scan_index_batches)
+    monkeypatch.setattr(streaming, "STREAMING_MIN_ROWS", 0)
+    monkeypatch.setattr(streaming, "planned_rows", lambda planned: len(df))
+    result = run_query(f'index="logs/*" {pipeline}')
+    pd.testing.assert_frame_equal(
+        result.reset_index(drop=True), expected.reset_index(drop=True), check_dtype=False
+    )
+    if "head 7" in pipeline:
+        # The consumer stops the scan once enough rows arrived
+        assert len(scanned) < len(_batches(df))
+
+
+def _load_module():
+    builds = sorted(_BUILD_DIR.glob("cpp_index_call*.so"), key=os.path.getmtime)
+    if not builds:
+        pytest.skip("cpp_index_call is not built")
+    spec = importlib.util.spec_from_file_location("cpp_index_call", builds[-1])
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.parametrize("pipeline", [
+    "| where latency != 50 | stats count",
+    "| stats max(latency), min(latency) by host",
+    "| stats sum(latency) as s by host",
+    "| stats count by latency",
+    "| eval x=latency*2 | where x > 100",
+])
+def test_streamed_batches_see_the_columns_of_every_file(tmp_path, monkeypatch, pipeline):
+    module = _load_module()
+    index_dir = tmp_path / "indexes" / "logs"
+    index_dir.mkdir(parents=True)
+    for seed, name in enumerate("abcd"):
+        df = _frame(150, seed).drop(columns="row")
+        if name == "b":
+            df = df.drop(columns="latency")
+        df.to_parquet(index_dir / f"{name}.parquet", index=False, row_group_size=50)
+    monkeypatch.chdir(tmp_path)
+    streamed = []
+
+    def scan_index_batches(tokens, **kwargs):
+        streamed.append(tokens)
+        return module.scan_index_batches(tokens, **kwargs)
+
+    monkeypatch.setattr("lexers.speakQueryListener.process_index_calls", module.process_index_calls)
+    monkeypatch.setattr("lexers.speakQueryListener.plan_index_files", module.plan_index_files)
+    monkeypatch.setattr("lexers.speakQueryListener.scan_index_batches", scan_index_batches)
+    expected = run_query(f'index="logs/*" {pipeline}')
+    assert not streamed
+
+    monkeypatch.setattr(streaming, "STREAMING_MIN_ROWS", 1)
+    result = run_query(f'index="logs/*" {pipeline}')
+    assert streamed
+    assert len(expected)
+    pd.testing.assert_frame_equal(
+        result.apply(categoricals.plain).reset_index(drop=True),
+        expected.apply(categoricals.plain).reset_index(drop=True),
+        check_dtype=False, check_like=True,
+    )
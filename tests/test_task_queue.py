@@ -0,0 +1,72 @@
+import os
+import sys
+import threading
+from queue import Full
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.task_queue import SingleFlight, TaskQueue
+
+
+def test_identical_submissions_share_one_task():
+    queue = TaskQueue(size=1, workers=1)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def run(query):
+        calls.append(query)
+        started.set()
+        release.wait(5)
+        return query.upper()
+
+    first = queue.submit_shared("q", run, "q")
+    started.wait(5)
+    # The duplicate takes no queue slot, so it is accepted while the queue is busy
+    second = queue.submit_shared("q", run, "q")
+    other = queue.submit_shared("other", run, "other")
+    with pytest.raises(Full):
+        queue.submit_shared("third", run, "third")
+    release.set()
+
+    assert second is first
+    assert first.result(5) == "Q" and other.result(5) == "OTHER"
+    assert calls == ["q", "other"]
+    assert queue.single_flight.coalesced == 1
+    # Finished tasks are forgotten, so a later submission runs again
+    assert queue.submit_shared("q", run, "q").result(5) == "Q"
+    assert calls == ["q", "other", "q"]
+
+
+def test_inline_calls_wait_for_the_running_call_and_share_its_exception():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def run():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        raise ValueError("boom")
+
+    def call():
+        try:
+            flight.run("q", run)
+        except ValueError as exc:
+            results.append(str(exc))
+
+    owner = threading.Thread(target=call)
+    owner.start()
+    started.wait(5)
+    waiters = [threading.Thread(target=call) for _ in range(3)]
+    for thread in waiters:
+        thread.start()
+    while flight.coalesced < 3:
+        threading.Event().wait(0.01)
+    release.set()
+    for thread in [owner, *waiters]:
+        thread.join(5)
+
+    assert calls == [1]
+    assert results == ["boom"] * 4
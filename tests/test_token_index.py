@@ -0,0 +1,84 @@
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pd = pytest.importorskip("pandas")
+
+import os
+import sys
+
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from handlers.SearchCmdHandler import SearchDirective
+from utils import index_layout, index_manifest, token_index
+
+
+def test_terms_match_token_phrases():
+    table = pa.table({
+        "msg": ["Connection RESET by peer", "reset connection", "resetting", None],
+        "host": ["10.1.2.3", "web", "10-1-2-3", "x"],
+        "code": [1, 2, 3, 4],
+    })
+    assert token_index.term_mask(table, "connection reset").to_pylist() == [True, False, False, False]
+    assert token_index.term_mask(table, "10.1.2.3").to_pylist() == [True, False, True, False]
+    assert token_index.term_mask(table, "reset").to_pylist() == [True, True, False, False]
+
+    df = table.to_pandas()
+    assert token_index.series_term_mask(df, "connection reset").tolist() == [True, False, False, False]
+    assert token_index.series_term_mask(df, "10.1.2.3").tolist() == [True, False, True, False]
+
+
+def test_search_directive_terms():
+    df = pd.DataFrame({"msg": ["disk full", "disk ok", "cpu hot"], "level": ["ERROR", "INFO", "ERROR"]})
+    result = SearchDirective().run_search(['"disk"', "level", "=", '"ERROR"'], df)
+    assert result["msg"].tolist() == ["disk full"]
+    assert list(result.columns) == ["msg", "level"]
+    either = SearchDirective().run_search(['"cpu"', "OR", '"ok"'], df)
+    assert either["msg"].tolist() == ["disk ok", "cpu hot"]
+
+
+def test_postings_prune_row_groups(tmp_path):
+    db = tmp_path / "manifest.db"
+    target = tmp_path / "a.parquet"
+    pq.write_table(
+        pa.table({"msg": ["disk full", "disk ok", "cpu hot", "fan loud"], "n": [1, 2, 3, 4]}),
+        target,
+        row_group_size=1,
+    )
+    assert token_index.update_file(target, db, columns=["msg"]) > 0
+    assert token_index.update_file(target, db, columns=["msg"]) == 0
+
+    lookup = lambda pred: token_index.lookup_row_groups([str(target)], pred, db)[str(target)]
+    assert lookup(("term", "disk")) == [0, 1]
+    assert lookup(("term", "DISK FULL")) == [0]
+    assert lookup(("and", ("term", "disk"), ("term", "hot"))) == []
+    assert lookup(("or", ("term", "fan"), ("term", "hot"))) == [2, 3]
+    assert lookup(("eq", "n", ["1"])) == [0, 1, 2, 3]
+
+
+def test_unindexed_text_columns_prevent_pruning(tmp_path):
+    db = tmp_path / "manifest.db"
+    target = tmp_path / "a.parquet"
+    pq.write_table(pa.table({"msg": ["disk full"], "host": ["web"]}), target)
+    token_index.update_file(target, db, columns=["msg"])
+    assert token_index.lookup_row_groups([str(target)], ("term", "web"), db) == {}
+
+
+def test_record_file_and_backfill(tmp_path, monkeypatch):
+    settings_db = tmp_path / "settings.db"
+    db = tmp_path / "manifest.db"
+    index_dir = tmp_path / "indexes" / "app"
+    index_dir.mkdir(parents=True)
+    monkeypatch.setattr(index_layout, "INDEX_SETTINGS_DB", settings_db)
+    monkeypatch.setattr(index_layout, "INDEXES_DIR", tmp_path / "indexes")
+    index_layout.set_index_settings("app", db_path=settings_db, token_columns=["msg"])
+
+    target = index_dir / "a.parquet"
+    pq.write_table(pa.table({"msg": ["disk full"]}), target)
+    index_manifest.record_file(target, db_path=db)
+    assert token_index.lookup_row_groups([str(target)], ("term", "cpu"), db) == {str(target): []}
+
+    index_manifest.forget_file(target, db_path=db)
+    assert token_index.lookup_row_groups([str(target)], ("term", "cpu"), db) == {}
+    assert token_index.backfill(tmp_path / "indexes", db, settings_db) == 1
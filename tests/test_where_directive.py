@@ -3,9 +3,12 @@ import pytest
 pytest.importorskip("antlr4")
 pytest.importorskip("pandas")
 
+import importlib.util
 import os
 import sys
 import types
+from pathlib import Path
+
 import antlr4
 import pandas as pd
 
@@ -14,7 +17,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 # Provide lightweight stand-in for so_loader
 fake_loader = types.ModuleType("functionality.so_loader")
 fake_loader.resolve_and_import_so = lambda path, name: types.SimpleNamespace(
-    process_index_calls=lambda tokens: pd.DataFrame(),
+    process_index_calls=lambda tokens, **_: pd.DataFrame(),
     parse_dates_to_epoch=lambda x: x,
 )
 sys.modules["functionality.so_loader"] = fake_loader
@@ -22,6 +25,46 @@ sys.modules["functionality.so_loader"] = fake_loader
 from lexers.antlr4_active.speakQueryLexer import speakQueryLexer
 from lexers.antlr4_active.speakQueryParser import speakQueryParser
 from lexers.speakQueryListener import speakQueryListener
+from utils import categoricals, query_plan
+
+_BUILD_DIR = Path(__file__).resolve().parents[1] / "functionality" / "cpp_index_call" / "build"
+
+
+def _load_module():
+    builds = sorted(_BUILD_DIR.glob("cpp_index_call*.so"), key=os.path.getmtime)
+    if not builds:
+        pytest.skip("cpp_index_call is not built")
+    spec = importlib.util.spec_from_file_location("cpp_index_call", builds[-1])
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def write_index(tmp_path, monkeypatch):
+    """Serve parquet files written under ``tmp_path/indexes`` through the real index scanner.
+
+    Pushed-down filters are applied by the scanner, so a stand-in that ignores
+    the index call's filter cannot be used for where directives.
+    """
+    module = _load_module()
+    monkeypatch.chdir(tmp_path)
+    scanned = []
+
+    def process_index_calls(tokens, **kwargs):
+        scanned.append(list(tokens))
+        return module.process_index_calls(tokens, **kwargs)
+
+    monkeypatch.setattr("lexers.speakQueryListener.process_index_calls", process_index_calls)
+    monkeypatch.setattr("lexers.speakQueryListener.plan_index_files", module.plan_index_files)
+
+    def write(df, name="dummy/a.parquet"):
+        path = tmp_path / "indexes" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        df.to_parquet(path, index=False)
+        return scanned
+
+    return write
 
 
 def run_query(query: str):
@@ -35,20 +78,46 @@ def run_query(query: str):
     return listener.main_df
 
 
-def test_where_basic(monkeypatch):
-    df = pd.DataFrame({"x": [1, 2, 3]})
-    monkeypatch.setattr(
-        "lexers.speakQueryListener.process_index_calls", lambda tokens: df.copy()
-    )
-    result = run_query('index="dummy" | where x > 1')
+def test_where_basic(write_index):
+    write_index(pd.DataFrame({"x": [1, 2, 3]}))
+    result = run_query('index="dummy/*" | where x > 1')
     assert result["x"].tolist() == [2, 3]
 
 
-def test_where_string(monkeypatch):
-    df = pd.DataFrame({"status": ["ok", "fail", "fail"]})
-    monkeypatch.setattr(
-        "lexers.speakQueryListener.process_index_calls", lambda tokens: df.copy()
-    )
-    result = run_query('index="dummy" | where status="fail"')
+def test_where_string(write_index):
+    write_index(pd.DataFrame({"status": ["ok", "fail", "fail"]}))
+    result = run_query('index="dummy/*" | where status="fail"')
     assert result["status"].tolist() == ["fail", "fail"]
 
+
+def test_where_string_containing_pipe(write_index):
+    write_index(pd.DataFrame({"msg": ["a|b", "a", "b"], "x": [1, 2, 3]}))
+    result = run_query('index="dummy/*" | where msg="a|b" | where x < 3')
+    assert result["x"].tolist() == [1]
+
+
+@pytest.mark.parametrize("query, pushed", [
+    ('index="dummy/*" | where x > 1', True),
+    ('index="dummy/*" | where status="fail"', True),
+    ('index="dummy/*" | where host="a" OR host="c"', True),
+    ('index="dummy/*" | where x=1 OR status="ok"', False),
+    ('index="dummy/*" | where status!="ok"', False),
+    ('index="dummy/*" OR index="other/*" | where x > 1', False),
+])
+def test_pushed_and_unpushed_filters_return_the_same_rows(write_index, monkeypatch, query, pushed):
+    write_index(pd.DataFrame({"x": [1, 2, 3], "status": ["ok", "fail", "fail"], "host": ["a", "b", "c"]}))
+    # No status column: the scanner skips files missing a filtered column
+    write_index(pd.DataFrame({"x": [4, 5], "host": ["a", "d"]}), "dummy/b.parquet")
+    scanned = write_index(pd.DataFrame({"x": [2, 6], "status": ["fail", "ok"]}), "other/c.parquet")
+
+    result = run_query(query)
+    monkeypatch.setattr(query_plan, "RULES", [r for r in query_plan.RULES if r is not query_plan.push_down_filter])
+    expected = run_query(query)
+
+    assert (len(scanned[0]) > len(scanned[1])) is pushed
+    assert len(expected)
+    pd.testing.assert_frame_equal(
+        result.apply(categoricals.plain).reset_index(drop=True),
+        expected.apply(categoricals.plain).reset_index(drop=True),
+        check_dtype=False,
+    )
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""Per-row-group Bloom filters for equality filters in index calls.
+
+Indexes can list ``bloom_columns`` in their settings (see
+:mod:`utils.index_layout`).  For every parquet file of such an index a Bloom
+filter of each configured column is kept per row group in the
+``bloom_filters`` table of the index manifest database.  Filters are built
+when a writer records the file in the manifest and by :func:`backfill` for
+files written before the column was configured.
+
+The C++ index scanner passes the equality part of an index call's filter
+(``src_ip="10.1.2.3"``, ``user IN (...)``) to :func:`lookup_row_groups` and
+only reads the row groups that may contain the value.  A filter is only
+trusted while the file's size and mtime match the values it was built from.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import os
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FALSE_POSITIVE_RATE = 0.01
+MAX_HASHES = 16
+
+
+@contextmanager
+def _connect(db_path) -> Iterator[sqlite3.Connection]:
+    """Yield a connection to the Bloom filter table that commits on success and is always closed."""
+    conn = sqlite3.connect(str(db_path), timeout=30)
+    try:
+        with conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS bloom_filters (
+                       path TEXT,
+                       column_name TEXT,
+                       row_group INTEGER,
+                       size INTEGER,
+                       mtime REAL,
+                       num_hashes INTEGER,
+                       num_bits INTEGER,
+                       bits BLOB,
+                       PRIMARY KEY (path, column_name, row_group)
+                   )"""
+            )
+            yield conn
+    finally:
+        conn.close()
+
+
+def canonical_value(value) -> Optional[str]:
+    """Return the key a column value or query literal is hashed under.
+
+    Integers and integral floats share a key so ``port=80`` finds ``80.0``;
+    this can only add false positives, never hide a match.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, np.integer)):
+        return str(int(value))
+    if isinstance(value, (float, np.floating)):
+        if math.isnan(value):
+            return None
+        return str(int(value)) if float(value).is_integer() else repr(float(value))
+    return str(value)
+
+
+def _hashes(keys: List[str]) -> np.ndarray:
+    hashes = np.empty((len(keys), 2), dtype=np.uint64)
+    for i, key in enumerate(keys):
+        digest = hashlib.blake2b(key.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        hashes[i] = np.frombuffer(digest, dtype="<u8")
+    return hashes
+
+
+def _positions(hashes: np.ndarray, num_hashes: int, num_bits: int) -> np.ndarray:
+    # Double hashing; uint64 arithmetic wraps, identically when building and probing
+    steps = np.arange(num_hashes, dtype=np.uint64)
+    return (hashes[:, :1] + steps * hashes[:, 1:2]) % np.uint64(num_bits)
+
+
+class BloomFilter:
+    """A fixed-size Bloom filter over :func:`canonical_value` keys."""
+
+    def __init__(self, num_hashes: int, num_bits: int, bits: bytes):
+        self.num_hashes = num_hashes
+        self.num_bits = num_bits
+        self.bits = np.frombuffer(bits, dtype=np.uint8)
+
+    @classmethod
+    def from_keys(cls, keys: List[str], false_positive_rate: float = FALSE_POSITIVE_RATE) -> "BloomFilter":
+        n = max(len(keys), 1)
+        num_bits = max(64, int(math.ceil(-n * math.log(false_positive_rate) / math.log(2) ** 2)))
+        num_bits = (num_bits + 7) // 8 * 8
+        num_hashes = min(MAX_HASHES, max(1, round(num_bits / n * math.log(2))))
+        bits = np.zeros(num_bits // 8, dtype=np.uint8)
+        if keys:
+            pos = _positions(_hashes(keys), num_hashes, num_bits).ravel()
+            np.bitwise_or.at(bits, pos >> np.uint64(3), (1 << (pos & np.uint64(7))).astype(np.uint8))
+        return cls(num_hashes, num_bits, bits.tobytes())
+
+    def might_contain(self, key: str) -> bool:
+        pos = _positions(_hashes([key]), self.num_hashes, self.num_bits).ravel()
+        return bool(np.all(self.bits[pos >> np.uint64(3)] & (1 << (pos & np.uint64(7))).astype(np.uint8)))
+
+
+def _indexable(data_type) -> bool:
+    import pyarrow.types as pa_types
+
+    if pa_types.is_dictionary(data_type):
+        data_type = data_type.value_type
+    return (
+        pa_types.is_string(data_type)
+        or pa_types.is_large_string(data_type)
+        or pa_types.is_integer(data_type)
+        or pa_types.is_floating(data_type)
+    )
+
+
+def build_filters(path, columns: Iterable[str]) -> Dict[tuple, BloomFilter]:
+    """Return ``{(column, row_group): BloomFilter}`` for the indexable ``columns`` of ``path``."""
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    from utils.parquet_footer_cache import get_footer
+
+    footer = get_footer(path)
+    wanted = [c for c in columns if c in footer.schema.names and _indexable(footer.schema.field(c).type)]
+    filters = {}
+    if not wanted:
+        return filters
+    parquet_file = pq.ParquetFile(footer.path, metadata=footer.metadata)
+    for rg in range(footer.num_row_groups):
+        table = parquet_file.read_row_group(rg, columns=wanted)
+        for column in wanted:
+            values = table[column]
+            if hasattr(values.type, "value_type"):
+                values = values.cast(values.type.value_type)
+            keys = {canonical_value(v) for v in pc.unique(values).to_pylist()}
+            keys.discard(None)
+            filters[(column, rg)] = BloomFilter.from_keys(sorted(keys))
+    return filters
+
+
+def _bloom_columns(path, settings_db=None, indexes_dir=None) -> List[str]:
+    from utils import index_layout
+
+    name = index_layout.index_name_for_path(path, indexes_dir or index_layout.INDEXES_DIR)
+    settings = index_layout.get_index_settings(name, db_path=settings_db or index_layout.INDEX_SETTINGS_DB)
+    return list(settings["bloom_columns"])
+
+
+def update_file(path, db_path, columns: Optional[Iterable[str]] = None, settings_db=None, indexes_dir=None) -> int:
+    """Build or refresh the filters of ``path`` and return how many were written.
+
+    ``columns`` defaults to the ``bloom_columns`` setting of the file's index.
+    Filters that are still current are kept as they are.
+    """
+    resolved = str(Path(path).resolve())
+    if columns is None:
+        columns = _bloom_columns(resolved, settings_db, indexes_dir)
+    columns = sorted(set(columns))
+    st = os.stat(resolved)
+    with _connect(db_path) as conn:
+        rows = conn.execute(
+            "SELECT DISTINCT column_name, size, mtime FROM bloom_filters WHERE path=?", (resolved,)
+        ).fetchall()
+        current = {c for c, size, mtime in rows if size == st.st_size and mtime == st.st_mtime}
+        if rows and current == set(columns) and len(rows) == len(current):
+            return 0
+        conn.execute("DELETE FROM bloom_filters WHERE path=?", (resolved,))
+        if not columns:
+            return 0
+        filters = build_filters(resolved, columns)
+        conn.executemany(
+            "INSERT INTO bloom_filters (path, column_name, row_group, size, mtime, num_hashes, num_bits, bits) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (resolved, column, rg, st.st_size, st.st_mtime, bf.num_hashes, bf.num_bits, bf.bits.tobytes())
+                for (column, rg), bf in filters.items()
+            ],
+        )
+    logger.info(f"[i] Built {len(filters)} Bloom filter(s) for {resolved}")
+    return len(filters)
+
+
+def forget_file(path, db_path) -> None:
+    """Remove the filters of a deleted or replaced file."""
+    with _connect(db_path) as conn:
+        conn.execute("DELETE FROM bloom_filters WHERE path=?", (str(Path(path).resolve()),))
+
+
+def _may_match(filters: Dict[str, BloomFilter], predicate) -> bool:
+    """Evaluate a predicate tree against one row group's filters; unknown means maybe."""
+    if predicate is None:
+        return True
+    kind = predicate[0]
+    if kind == "and":
+        return _may_match(filters, predicate[1]) and _may_match(filters, predicate[2])
+    if kind == "or":
+        return _may_match(filters, predicate[1]) or _may_match(filters, predicate[2])
+    if kind == "eq":
+        bloom = filters.get(predicate[1])
+        if bloom is None:
+            return True
+        return any(bloom.might_contain(str(value)) for value in predicate[2])
+    return True
+
+
+def lookup_row_groups(paths: Iterable[str], predicate, db_path) -> Dict[str, List[int]]:
+    """Return the row groups of each path that may satisfy ``predicate``.
+
+    ``predicate`` is a tree of ``("and", a, b)``, ``("or", a, b)`` and
+    ``("eq", column, [values])`` tuples, with ``None`` for conditions the
+    filters cannot decide.  Paths without current filters are left out, so
+    callers read them in full.
+    """
+    from utils.parquet_footer_cache import get_footer
+
+    result: Dict[str, List[int]] = {}
+    if predicate is None:
+        return result
+    with _connect(db_path) as conn:
+        for original in paths:
+            resolved = str(Path(original).resolve())
+            try:
+                st = os.stat(resolved)
+            except OSError:
+                continue
+            rows = conn.execute(
+                "SELECT column_name, row_group, size, mtime, num_hashes, num_bits, bits "
+                "FROM bloom_filters WHERE path=?",
+                (resolved,),
+            ).fetchall()
+            by_group: Dict[int, Dict[str, BloomFilter]] = {}
+            for column, rg, size, mtime, num_hashes, num_bits, bits in rows:
+                if size == st.st_size and mtime == st.st_mtime:
+                    by_group.setdefault(rg, {})[column] = BloomFilter(num_hashes, num_bits, bits)
+            if not by_group:
+                continue
+            try:
+                num_row_groups = get_footer(resolved).num_row_groups
+            except Exception:
+                continue
+            result[original] = [
+                rg for rg in range(num_row_groups) if _may_match(by_group.get(rg, {}), predicate)
+            ]
+    return result
+
+
+def backfill(indexes_dir=None, db_path=None, settings_db=None) -> int:
+    """Build missing or stale filters for every index with ``bloom_columns``.
+
+    Returns the number of files whose filters were (re)built.
+    """
+    from utils import index_layout
+    from utils.index_manifest import MANIFEST_DB
+
+    indexes_dir = Path(indexes_dir or index_layout.INDEXES_DIR)
+    db_path = db_path or MANIFEST_DB
+    settings_db = settings_db or index_layout.INDEX_SETTINGS_DB
+    updated = 0
+    for name, settings in index_layout.list_index_settings(db_path=settings_db).items():
+        if not settings["bloom_columns"]:
+            continue
+        for file_path in (indexes_dir / name).rglob("*.parquet"):
+            try:
+                if update_file(file_path, db_path, columns=settings["bloom_columns"]):
+                    updated += 1
+            except Exception as e:
+                logger.warning(f"[!] Could not build Bloom filters for {file_path}: {e}")
+    if updated:
+        logger.info(f"[i] Backfilled Bloom filters for {updated} file(s).")
+    return updated
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""Low-cardinality string columns as pandas categoricals.
+
+Index files are written with dictionary encoding for string columns with few
+distinct values (see :mod:`utils.parquet_writer`).  The C++ index scanner
+asks :func:`dictionary_columns` which columns of a file to read as Arrow
+dictionary arrays, so they reach pandas as categoricals instead of one
+Python ``str`` per row, and ``_source_file`` stays categorical as well.
+Columns are chosen automatically:
+
+* string columns whose every read row group has a dictionary page, kept
+  only while each dictionary holds at most :data:`MAX_DISTINCT_RATIO` of
+  its rows (files from other writers dictionary-encode everything);
+* the ``category_columns`` of the file's index (see
+  :mod:`utils.index_layout`), whatever their encoding or cardinality.
+
+Categories are sorted, so ``sort`` and ``stats ... by`` order rows exactly
+as they would order plain strings.  :func:`concat` keeps categoricals
+categorical when frames from different files are combined; :func:`decode`
+turns them back into plain strings once a result leaves the engine.
+"""
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Automatically chosen columns fall back to plain strings above this distinct/total ratio
+MAX_DISTINCT_RATIO = 0.2
+
+# Added by the scanner as a dictionary column in every table
+SOURCE_FILE = "_source_file"
+
+
+def _is_string(data_type) -> bool:
+    import pyarrow.types as pa_types
+
+    return pa_types.is_string(data_type) or pa_types.is_large_string(data_type)
+
+
+def forced_columns(paths: Iterable[str], indexes_dir) -> Dict[str, List[str]]:
+    """Return ``{path: category_columns}`` for the paths whose index configures any."""
+    from utils import index_layout
+
+    settings_db = Path(indexes_dir).parent / index_layout.INDEX_SETTINGS_DB.name
+    by_index: Dict[Optional[str], List[str]] = {}
+    result: Dict[str, List[str]] = {}
+    for path in paths:
+        name = index_layout.index_name_for_path(path, indexes_dir)
+        if name not in by_index:
+            by_index[name] = list(index_layout.get_index_settings(name, db_path=settings_db)["category_columns"])
+        if by_index[name]:
+            result[path] = by_index[name]
+    return result
+
+
+def dictionary_columns(metadata, schema, row_groups: Optional[List[int]], forced: Iterable[str] = ()) -> List[str]:
+    """Return the string columns of a parquet file to read as dictionary arrays.
+
+    ``row_groups`` are the row groups that will be read (``None`` for all);
+    ``forced`` are read as dictionaries whatever their encoding.
+    """
+    forced = set(forced)
+    groups = range(metadata.num_row_groups) if row_groups is None else row_groups
+    leaf_index = {metadata.schema.column(i).path: i for i in range(metadata.num_columns)}
+    columns = []
+    for field in schema:
+        if not _is_string(field.type) or field.name not in leaf_index:
+            continue
+        if field.name in forced:
+            columns.append(field.name)
+            continue
+        index = leaf_index[field.name]
+        if groups and all(metadata.row_group(rg).column(index).has_dictionary_page for rg in groups):
+            columns.append(field.name)
+    return columns
+
+
+def limit_cardinality(table, forced: Iterable[str] = ()):
+    """Decode the dictionary columns of ``table`` too distinct to be worth keeping.
+
+    A column is decoded when any of its chunks has a dictionary larger than
+    :data:`MAX_DISTINCT_RATIO` of the chunk's rows; ``forced`` columns and
+    ``_source_file`` are always kept.
+    """
+    import pyarrow.types as pa_types
+
+    keep = set(forced) | {SOURCE_FILE}
+    for i, field in enumerate(table.schema):
+        if field.name in keep or not pa_types.is_dictionary(field.type):
+            continue
+        column = table.column(i)
+        if any(len(chunk.dictionary) > max(1, MAX_DISTINCT_RATIO * len(chunk)) for chunk in column.chunks):
+            table = table.set_column(i, field.name, column.cast(field.type.value_type))
+    return table
+
+
+def unify_tables(tables: List) -> List:
+    """Decode a dictionary column wherever another table holds it as plain strings.
+
+    Arrow cannot concatenate a dictionary column with a plain one, which
+    happens when a column is dictionary-encoded in some files only.
+    """
+    import pyarrow.types as pa_types
+
+    plain = {f.name for t in tables for f in t.schema if not pa_types.is_dictionary(f.type)}
+    unified = []
+    for table in tables:
+        for i, field in enumerate(table.schema):
+            if field.name in plain and pa_types.is_dictionary(field.type):
+                table = table.set_column(i, field.name, table.column(i).cast(field.type.value_type))
+        unified.append(table)
+    return unified
+
+
+def empty_tables(schemas: List, tables: List) -> List:
+    """Empty tables with ``schemas``, dictionary-encoding each column ``tables`` hold that way.
+
+    A limited scan reads only some of the planned files; concatenating these
+    placeholders with what it read gives each column the type a full scan of
+    every file would have given it.
+    """
+    import pyarrow as pa
+    import pyarrow.types as pa_types
+
+    encoded = {f.name: f.type for t in tables for f in t.schema if pa_types.is_dictionary(f.type)}
+    empty = []
+    for schema in schemas:
+        fields = [
+            field.with_type(encoded[field.name])
+            if field.name in encoded and encoded[field.name].value_type == field.type else field
+            for field in schema
+        ]
+        empty.append(pa.schema(fields, metadata=schema.metadata).empty_table())
+    return empty
+
+
+def sort_categories(df: pd.DataFrame) -> None:
+    """Sort the categories of every categorical column of ``df`` in place."""
+    for name in df.columns[[isinstance(dtype, pd.CategoricalDtype) for dtype in df.dtypes]]:
+        categories = df[name].cat.categories
+        if not categories.is_monotonic_increasing:
+            df[name] = df[name].cat.reorder_categories(categories.sort_values())
+
+
+def concat(frames: List[pd.DataFrame], **kwargs) -> pd.DataFrame:
+    """``pandas.concat`` that keeps a column categorical when it is categorical in every frame.
+
+    ``pandas.concat`` falls back to object dtype whenever the categories
+    differ, which they do for frames read from different files.
+    """
+    frames = list(frames)
+    categorical = None
+    for frame in frames:
+        names = {c for c, dtype in frame.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)}
+        categorical = names if categorical is None else categorical & names
+    for name in categorical or ():
+        categories = frames[0][name].cat.categories
+        for frame in frames[1:]:
+            categories = categories.union(frame[name].cat.categories)
+        for i, frame in enumerate(frames):
+            if not frame[name].cat.categories.equals(categories):
+                frames[i] = frame = frame.copy(deep=False)
+                frame[name] = frame[name].cat.set_categories(categories)
+    return pd.concat(frames, **kwargs)
+
+
+def plain(series: pd.Series) -> pd.Series:
+    """Return ``series`` with categorical values decoded, for operations categoricals reject."""
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return series
+    values = series.astype(series.cat.categories.dtype)
+    if values.dtype == object and series.hasnans:
+        # Missing strings load as None, not NaN, when read without a dictionary
+        values = values.where(series.notna(), None)
+    return values
+
+
+def decode(df: pd.DataFrame) -> pd.DataFrame:
+    """Return ``df`` with every categorical column decoded by :func:`plain`.
+
+    Results leave the engine this way: callers such as the routes'
+    ``fillna('')`` are not categorical-aware.
+    """
+    positions = [i for i, dtype in enumerate(df.dtypes) if isinstance(dtype, pd.CategoricalDtype)]
+    if not positions:
+        return df
+    df = df.copy(deep=False)
+    for i in positions:
+        df.isetitem(i, plain(df.iloc[:, i]))
+    return df
+
+
+def fill(series: pd.Series, value) -> pd.Series:
+    """``Series.fillna`` that adds ``value`` as a category when ``series`` is categorical."""
+    if isinstance(series.dtype, pd.CategoricalDtype) and series.isna().any():
+        categories = series.cat.categories
+        if value not in categories:
+            try:
+                series = series.cat.set_categories(categories.append(pd.Index([value])).sort_values())
+            except TypeError:
+                series = plain(series)
+    return series.fillna(value)
@@ -4,10 +4,14 @@ import argparse
 import sqlite3
 import pandas as pd
 import pyarrow as pa
-import pyarrow.parquet as pq
 import os
+import sys
 import logging
 
+# Allow running as a script from anywhere in the project
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from utils.parquet_writer import DEFAULT_PROFILE, write_table
+
 logger = logging.getLogger(__name__)
 
 
@@ -36,11 +40,11 @@ def convert_sqlite_to_arrow(db_path, output_dir):
             df = pd.read_sql_query(f"SELECT * FROM {table_name}", conn)
 
             # Convert DataFrame to Arrow Table
-            arrow_table = pa.Table.from_pandas(df)
+            arrow_table = pa.Table.from_pandas(df, preserve_index=False)
 
             # Save Arrow Table as Parquet file
             parquet_path = os.path.join(output_dir, f"{table_name}.system4.system4.parquet")
-            pq.write_table(arrow_table, parquet_path)
+            write_table(arrow_table, parquet_path, DEFAULT_PROFILE)
 
             logging.info(f"[i] {table_name} saved to {parquet_path}")
 
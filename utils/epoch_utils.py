@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Helpers for storing a typed ``_epoch`` column at write time.
+
+Every ingestion path (scheduled inputs, repo scripts, saved-search results
+and the ``_epoch`` backfill helpers) goes through :func:`add_epoch_column` so
+that parquet files carry an int64 ``_epoch`` of UTC seconds.  The index
+scanner reads that column directly and only parses date strings for legacy
+files that predate it.
+"""
+from __future__ import annotations
+
+import logging
+import os
+from pathlib import Path
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from utils.index_layout import profile_for_path
+from utils.parquet_footer_cache import get_footer
+from utils.parquet_writer import write_frame
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DATETIME_PARSER_DIR = PROJECT_ROOT / "functionality" / "cpp_datetime_parser" / "build"
+
+# Candidate source columns, matched case-insensitively in this order.
+DEFAULT_TIME_FIELDS = ("timestamp", "_time", "time", "date", "created_at")
+
+_parser = None
+
+
+def _load_parser():
+    """Return ``parse_dates_to_epoch_array`` from the compiled parser, or ``None``."""
+    global _parser
+    if _parser is None:
+        try:
+            from functionality.so_loader import resolve_and_import_so
+
+            module = resolve_and_import_so(str(DATETIME_PARSER_DIR), "cpp_datetime_parser")
+            _parser = module.parse_dates_to_epoch_array
+        except Exception as e:
+            logger.warning(f"[!] cpp_datetime_parser unavailable, using pandas to parse dates: {e}")
+            _parser = False
+    return _parser or None
+
+
+def parse_date_strings(values: Sequence[str]) -> np.ndarray:
+    """Convert date strings to an int64 array of epoch seconds.
+
+    ``values`` may be a list, a NumPy array or a pyarrow string array.
+    Unparseable and missing values become 0.  The compiled parser is
+    preferred because it accepts exactly the formats the index scanner
+    understands; pandas is used when it is not built.
+    """
+    parser = _load_parser()
+    if parser is not None:
+        return np.asarray(parser(values), dtype="int64")
+    if hasattr(values, "to_pylist"):
+        values = values.to_pylist()
+    parsed = pd.to_datetime(pd.Series(values, dtype=object), errors="coerce", format="mixed", utc=True)
+    return _datetimes_to_epoch(parsed).to_numpy()
+
+
+def _datetimes_to_epoch(series: pd.Series) -> pd.Series:
+    if getattr(series.dt, "tz", None) is not None:
+        series = series.dt.tz_convert("UTC").dt.tz_localize(None)
+    seconds = series.astype("datetime64[s]")
+    epoch = pd.Series(seconds.to_numpy().astype("int64"), index=series.index)
+    return epoch.where(series.notna(), 0).astype("int64")
+
+
+def compute_epoch(series: pd.Series) -> pd.Series:
+    """Return an int64 series of epoch seconds for a date-like ``series``."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return _datetimes_to_epoch(series)
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return pd.to_numeric(series, errors="coerce").fillna(0).astype("int64")
+
+    values = series.astype(str)
+    digits = values.str.fullmatch(r"\d+")
+    epoch = pd.Series(0, index=series.index, dtype="int64")
+    if digits.any():
+        epoch[digits] = values[digits].astype("int64")
+    if (~digits).any():
+        epoch[~digits] = parse_date_strings(values[~digits].to_numpy(dtype=object))
+    return epoch.where(series.notna(), 0).astype("int64")
+
+
+def find_time_field(columns: Iterable[str], fields: Iterable[str] = DEFAULT_TIME_FIELDS) -> Optional[str]:
+    """Return the first column in ``columns`` matching ``fields`` case-insensitively."""
+    by_lower = {}
+    for col in columns:
+        by_lower.setdefault(str(col).lower(), col)
+    for field in fields:
+        match = by_lower.get(str(field).lower())
+        if match is not None:
+            return match
+    return None
+
+
+def add_epoch_column(df: pd.DataFrame, fields: Iterable[str] = DEFAULT_TIME_FIELDS) -> bool:
+    """Ensure ``df`` has an int64 ``_epoch`` column, modifying it in place.
+
+    An existing ``_epoch`` is coerced to int64; otherwise it is derived from
+    the first matching time field.  Returns ``False`` when no source field
+    exists so callers can decide whether that is an error.
+    """
+    if "_epoch" in df.columns:
+        if not pd.api.types.is_integer_dtype(df["_epoch"]):
+            df["_epoch"] = compute_epoch(df["_epoch"])
+        elif df["_epoch"].dtype != "int64":
+            df["_epoch"] = df["_epoch"].astype("int64")
+        return True
+
+    field = find_time_field(df.columns, fields)
+    if field is None:
+        return False
+    df["_epoch"] = compute_epoch(df[field])
+    logger.info(f"[i] Added _epoch column using {field} field.")
+    return True
+
+
+def backfill_epoch_file(path, fields: Iterable[str] = DEFAULT_TIME_FIELDS) -> bool:
+    """Rewrite the parquet file at ``path`` with a typed ``_epoch`` if it lacks one.
+
+    Returns ``True`` when the file was rewritten.
+    """
+    import pyarrow.types as pa_types
+
+    schema = get_footer(path).schema
+    if "_epoch" in schema.names and pa_types.is_int64(schema.field("_epoch").type):
+        return False
+    df = pd.read_parquet(path)
+    if not add_epoch_column(df, fields):
+        return False
+    tmp_path = f"{path}.tmp"
+    write_frame(df, tmp_path, profile_for_path(path))
+    os.replace(tmp_path, path)
+    logger.info(f"[i] Backfilled _epoch column in {path}")
+    return True
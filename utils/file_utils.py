@@ -22,10 +22,15 @@ def allowed_file(filename: str, allowed_extensions=None) -> bool:
 def get_row_count(filepath: str) -> int:
     """Return the number of rows in a dataset located at *filepath*.
 
-    Uses line counting for CSV files to avoid excessive memory usage, falling back
-    to ``pandas.read_csv`` for other formats. Errors are logged and return ``0``.
+    Uses line counting for CSV files to avoid excessive memory usage and the
+    cached footer for parquet files, falling back to ``pandas.read_csv`` for
+    other formats. Errors are logged and return ``0``.
     """
     try:
+        if str(filepath).lower().endswith(".parquet"):
+            from utils.parquet_footer_cache import get_footer
+
+            return get_footer(filepath).num_rows
         if str(filepath).lower().endswith(".csv"):
             with open(filepath, "r", encoding="utf-8", errors="ignore") as fh:
                 row_count = sum(1 for _ in fh) - 1  # subtract header
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""Evaluate parsed filter expressions as boolean masks over a DataFrame.
+
+The C++ index scanner and the ``search``/``where`` directive parse filters
+into the same small expression tree and hand it to :func:`apply`, instead of
+rendering a ``DataFrame.query`` string that pandas has to parse again:
+
+* ``("and", left, right)`` and ``("or", left, right)``
+* ``("cmp", op, left, right)`` with ``op`` one of ``= != < > <= >=``
+* ``("in", column, [values])``
+* ``("field", name)`` for a column and ``("value", v)`` for a literal
+* ``("term", text)`` for a free-text term (see :mod:`utils.token_index`)
+
+Comparisons use the same pandas operators ``DataFrame.query`` would, so
+results match the query strings this replaces; ``IN`` uses ``Series.isin``.
+A categorical column compared with a literal is compared once per category.
+``and``/``or`` only evaluate their right side on the rows the left side
+leaves undecided.  Errors (a missing column, incomparable types, a
+non-boolean condition) propagate and callers treat them as no matches.
+"""
+from __future__ import annotations
+
+import operator
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.categoricals import plain
+
+_COMPARISONS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    ">": operator.gt,
+    "<=": operator.le,
+    ">=": operator.ge,
+}
+
+
+def _operand(df: pd.DataFrame, node, rows: Optional[np.ndarray]):
+    kind = node[0]
+    if kind == "field":
+        series = df[node[1]]
+        return series if rows is None else series.iloc[rows]
+    if kind == "value":
+        return node[1]
+    return _mask(df, node, rows)
+
+
+def _category_mask(series: pd.Series, compare_values) -> np.ndarray:
+    # Missing values have code -1 and so pick the trailing None, compared like a missing string
+    values = pd.Series([*series.cat.categories, None], dtype=object)
+    return _as_mask(compare_values(values), len(values))[series.cat.codes.to_numpy()]
+
+
+def _compare(compare, left, right):
+    if isinstance(left, pd.Series) and isinstance(left.dtype, pd.CategoricalDtype):
+        if not isinstance(right, pd.Series):
+            return _category_mask(left, lambda values: compare(values, right))
+        left = plain(left)
+    if isinstance(right, pd.Series) and isinstance(right.dtype, pd.CategoricalDtype):
+        if not isinstance(left, pd.Series):
+            return _category_mask(right, lambda values: compare(left, values))
+        right = plain(right)
+    return compare(left, right)
+
+
+def _as_mask(result, length: int) -> np.ndarray:
+    if isinstance(result, (bool, np.bool_)):
+        return np.full(length, bool(result))
+    if isinstance(result, pd.Series) and (
+        pd.api.types.is_bool_dtype(result.dtype) or pd.api.types.infer_dtype(result, skipna=False) == "boolean"
+    ):
+        return result.to_numpy(dtype=bool, na_value=False)
+    if isinstance(result, np.ndarray) and result.dtype == bool:
+        return result
+    raise TypeError(f"Filter condition does not evaluate to booleans: {result!r:.80}")
+
+
+def _mask(df: pd.DataFrame, node, rows: Optional[np.ndarray]) -> np.ndarray:
+    """Return the mask of ``node`` over ``rows`` (positions into ``df``, ``None`` for all)."""
+    length = len(df) if rows is None else len(rows)
+    kind = node[0]
+    if kind in ("and", "or"):
+        left = _mask(df, node[1], rows)
+        # Only the rows the left side leaves open are evaluated on the right
+        open_rows = ~left if kind == "or" else left
+        if not open_rows.any():
+            return left
+        positions = np.flatnonzero(open_rows)
+        right = _mask(df, node[2], positions if rows is None else rows[positions])
+        result = left.copy()
+        result[positions] = right
+        return result
+    if kind == "cmp":
+        compare = _COMPARISONS.get(node[1])
+        if compare is None:
+            raise ValueError(f"Unknown operator: {node[1]}")
+        return _as_mask(_compare(compare, _operand(df, node[2], rows), _operand(df, node[3], rows)), length)
+    if kind == "in":
+        series = df[node[1]]
+        if rows is not None:
+            series = series.iloc[rows]
+        return series.isin(list(node[2])).to_numpy(dtype=bool)
+    if kind == "term":
+        from utils.token_index import series_term_mask
+
+        subset = df if rows is None else df.iloc[rows]
+        return series_term_mask(subset, node[1]).to_numpy(dtype=bool)
+    if kind in ("field", "value"):
+        return _as_mask(_operand(df, node, rows), length)
+    raise ValueError(f"Unknown filter node: {kind!r}")
+
+
+def evaluate(df: pd.DataFrame, expression) -> np.ndarray:
+    """Return a boolean numpy array marking the rows of ``df`` matching ``expression``."""
+    if expression is None:
+        return np.ones(len(df), dtype=bool)
+    return _mask(df, expression, None)
+
+
+def apply(df: pd.DataFrame, expression) -> pd.DataFrame:
+    """Return the rows of ``df`` matching ``expression`` (all rows when it is ``None``)."""
+    if expression is None:
+        return df
+    return df[evaluate(df, expression)]
+
+
+def fields(expression) -> Optional[set]:
+    """Return the columns ``expression`` reads, or ``None`` if it needs every column (free-text terms)."""
+    kind = expression[0]
+    if kind in ("and", "or"):
+        left, right = fields(expression[1]), fields(expression[2])
+        return None if left is None or right is None else left | right
+    if kind == "cmp":
+        left, right = fields(expression[2]), fields(expression[3])
+        return None if left is None or right is None else left | right
+    if kind in ("in", "field"):
+        return {expression[1]}
+    if kind == "term":
+        return None
+    return set()
+
+
+def filter_table(table, expression):
+    """Return the rows of the Arrow ``table`` matching ``expression``.
+
+    Only the columns the expression reads are converted to evaluate it, so a
+    file's other columns are converted just for the rows that match.  Errors
+    propagate like those of :func:`apply`.
+    """
+    if expression is None:
+        return table
+    import pyarrow as pa
+
+    names = fields(expression)
+    subset = table
+    if names is not None:
+        subset = table.select([i for i, name in enumerate(table.column_names) if name in names])
+    return table.filter(pa.array(evaluate(subset.to_pandas(), expression)))
+
+
+def describe(expression) -> str:
+    """Render ``expression`` in query syntax for log messages."""
+    if expression is None:
+        return "True"
+    kind = expression[0]
+    if kind in ("and", "or"):
+        return f"({describe(expression[1])} {kind.upper()} {describe(expression[2])})"
+    if kind == "cmp":
+        return f"({describe(expression[2])} {expression[1]} {describe(expression[3])})"
+    if kind == "in":
+        return f"({expression[1]} IN ({', '.join(repr(v) for v in expression[2])}))"
+    if kind == "field":
+        return expression[1]
+    if kind == "term":
+        return repr(expression[1])
+    return repr(expression[1])
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""Per-index storage settings and the optional time-partitioned layout.
+
+An index is a directory below ``indexes/``.  Indexes configured with
+``partition_by_time`` store their files Hive-style as
+``<index>/date=YYYY-MM-DD/hour=HH/<name>.parquet`` (UTC, from ``_epoch``).
+The C++ index scanner turns ``earliest``/``latest`` into a filter on those
+directory names, so a short time window only lists the matching partitions.
+Each index also carries a :class:`~utils.parquet_writer.WriterProfile`
+(codec, row-group size, sorting, ...) used for every file written into it,
+and may list ``bloom_columns`` to keep Bloom filters for (see
+:mod:`utils.bloom_filters`), ``token_columns`` to keep an inverted token
+index for (see :mod:`utils.token_index`) and ``category_columns`` to always
+load as pandas categoricals (see :mod:`utils.categoricals`).
+Settings live in the ``index_settings`` table of ``scheduled_inputs.db``.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+import pandas as pd
+
+from utils.parquet_writer import DEFAULT_PROFILE, WriterProfile, validate_profile, write_frame
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+INDEX_SETTINGS_DB = PROJECT_ROOT / "scheduled_inputs.db"
+INDEXES_DIR = PROJECT_ROOT / "indexes"
+
+DEFAULT_INDEX_SETTINGS = {
+    "partition_by_time": False,
+    "bloom_columns": (),
+    "token_columns": (),
+    "category_columns": (),
+    **DEFAULT_PROFILE._asdict(),
+}
+
+_SETTING_COLUMNS = {
+    "partition_by_time": "BOOLEAN DEFAULT 0",
+    "bloom_columns": "TEXT",
+    "token_columns": "TEXT",
+    "category_columns": "TEXT",
+    "compression": "TEXT",
+    "compression_level": "INTEGER",
+    "row_group_size": "INTEGER",
+    "sort_by_epoch": "BOOLEAN",
+    "dictionary_max_ratio": "REAL",
+    "delta_epoch": "BOOLEAN",
+    "write_statistics": "BOOLEAN",
+}
+
+
+@contextmanager
+def _connect(db_path) -> Iterator[sqlite3.Connection]:
+    """Yield a connection to the index settings that commits on success and is always closed."""
+    conn = sqlite3.connect(str(db_path), timeout=30)
+    try:
+        with conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS index_settings (
+                       index_name TEXT PRIMARY KEY,
+                       partition_by_time BOOLEAN DEFAULT 0,
+                       updated_at REAL
+                   )"""
+            )
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(index_settings)")}
+            for column, decl in _SETTING_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE index_settings ADD COLUMN {column} {decl}")
+            yield conn
+    finally:
+        conn.close()
+
+
+def _coerce_setting(key, value):
+    """Convert a setting from JSON or form input to the type of its default."""
+    default = DEFAULT_INDEX_SETTINGS[key]
+    if key == "compression_level":
+        return None if value in (None, "") else int(value)
+    if isinstance(default, tuple):
+        if isinstance(value, str):
+            value = json.loads(value) if value.startswith("[") else value.split(",")
+        return tuple(dict.fromkeys(str(v).strip() for v in value if str(v).strip()))
+    if isinstance(default, bool):
+        return value if isinstance(value, bool) else str(value).lower() in {"true", "1", "yes"}
+    if isinstance(default, int):
+        return int(value)
+    if isinstance(default, float):
+        return float(value)
+    return str(value).lower()
+
+
+def _stored_value(value):
+    return json.dumps(list(value)) if isinstance(value, tuple) else value
+
+
+def _row_to_settings(row) -> dict:
+    settings = dict(DEFAULT_INDEX_SETTINGS)
+    for key, value in row.items():
+        if key in settings and value is not None:
+            settings[key] = _coerce_setting(key, value)
+    return settings
+
+
+def normalize_index_name(index_name) -> Optional[str]:
+    """Return ``index_name`` as a relative POSIX path, or ``None`` for the indexes root."""
+    if index_name is None:
+        return None
+    name = Path(str(index_name)).as_posix().strip("/")
+    return name if name and name != "." else None
+
+
+def get_index_settings(index_name, db_path=INDEX_SETTINGS_DB) -> dict:
+    """Return the settings for ``index_name``, falling back to the defaults."""
+    settings = dict(DEFAULT_INDEX_SETTINGS)
+    name = normalize_index_name(index_name)
+    if name is None:
+        return settings
+    try:
+        with _connect(db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM index_settings WHERE index_name=?", (name,)).fetchone()
+    except sqlite3.Error as e:
+        logger.warning(f"[!] Could not read settings for index {name}: {e}")
+        return settings
+    return _row_to_settings(dict(row)) if row else settings
+
+
+def set_index_settings(index_name, db_path=INDEX_SETTINGS_DB, **settings) -> dict:
+    """Update the settings for ``index_name`` and return the stored values."""
+    name = normalize_index_name(index_name)
+    if name is None:
+        raise ValueError("Settings can only be stored for an index subdirectory.")
+    unknown = set(settings) - set(DEFAULT_INDEX_SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown index setting(s): {', '.join(sorted(unknown))}")
+    merged = get_index_settings(name, db_path=db_path)
+    try:
+        merged.update({key: _coerce_setting(key, value) for key, value in settings.items()})
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid index setting value: {e}") from e
+    validate_profile(_profile_from_settings(merged))
+    columns = list(_SETTING_COLUMNS)
+    with _connect(db_path) as conn:
+        conn.execute(
+            f"INSERT OR REPLACE INTO index_settings (index_name, {', '.join(columns)}, updated_at) "
+            f"VALUES (?, {', '.join('?' for _ in columns)}, ?)",
+            (name, *(_stored_value(merged[column]) for column in columns), time.time()),
+        )
+    logger.info(f"[i] Updated settings for index {name}: {merged}")
+    return merged
+
+
+def list_index_settings(db_path=INDEX_SETTINGS_DB) -> dict:
+    """Return ``{index_name: settings}`` for every configured index."""
+    with _connect(db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute("SELECT * FROM index_settings").fetchall()
+    return {row["index_name"]: _row_to_settings(dict(row)) for row in rows}
+
+
+def _profile_from_settings(settings: dict) -> WriterProfile:
+    return WriterProfile(**{field: settings[field] for field in WriterProfile._fields})
+
+
+def writer_profile(index_name, db_path=INDEX_SETTINGS_DB) -> WriterProfile:
+    """Return the parquet :class:`WriterProfile` configured for ``index_name``."""
+    return _profile_from_settings(get_index_settings(index_name, db_path=db_path))
+
+
+def index_name_for_path(path, indexes_dir=INDEXES_DIR) -> Optional[str]:
+    """Return the index a file below ``indexes_dir`` belongs to, ignoring time partitions."""
+    try:
+        rel = Path(path).resolve().relative_to(Path(indexes_dir).resolve())
+    except ValueError:
+        return None
+    parts = [part for part in rel.parent.parts if not part.startswith(("date=", "hour="))]
+    return normalize_index_name("/".join(parts))
+
+
+def profile_for_path(path, db_path=INDEX_SETTINGS_DB, indexes_dir=INDEXES_DIR) -> WriterProfile:
+    """Return the writer profile for a file path, the default outside ``indexes/``."""
+    return writer_profile(index_name_for_path(path, indexes_dir), db_path=db_path)
+
+
+def partition_subdir(epoch: int) -> Path:
+    """Return the ``date=YYYY-MM-DD/hour=HH`` directory holding ``epoch``."""
+    moment = datetime.fromtimestamp(int(epoch), tz=timezone.utc)
+    return Path(f"date={moment:%Y-%m-%d}") / f"hour={moment:%H}"
+
+
+def _available_path(path: Path, overwrite: bool) -> Path:
+    """Return ``path``, or a ``_<timestamp>`` variant when it exists and overwrite is off."""
+    if overwrite or not path.exists():
+        return path
+    base, ext = os.path.splitext(path.name)
+    return path.with_name(f"{base}_{int(time.time())}{ext}")
+
+
+def write_index_frame(
+    df: pd.DataFrame,
+    target_dir,
+    filename: str,
+    overwrite: bool = False,
+    index_name=None,
+    db_path=INDEX_SETTINGS_DB,
+) -> List[Path]:
+    """Write ``df`` into an index directory using that index's layout.
+
+    Time-partitioned indexes get one file per ``date=/hour=`` partition of the
+    ``_epoch`` column; otherwise ``df`` is written as ``target_dir/filename``.
+    An existing file is replaced when ``overwrite`` is set and kept alongside a
+    ``_<timestamp>`` suffixed copy otherwise.  Files use the index's writer
+    profile.  Returns the paths written.
+    """
+    target_dir = Path(target_dir)
+    settings = get_index_settings(index_name, db_path=db_path)
+    profile = _profile_from_settings(settings)
+
+    partitioned = settings["partition_by_time"]
+    if partitioned and "_epoch" not in df.columns:
+        logger.warning(f"[!] Index {index_name} is time-partitioned but results have no _epoch; writing flat.")
+        partitioned = False
+
+    written = []
+    if not partitioned:
+        output_path = _available_path(target_dir / filename, overwrite)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        write_frame(df, output_path, profile)
+        written.append(output_path)
+    else:
+        hours = pd.to_numeric(df["_epoch"], errors="coerce").fillna(0).astype("int64") // 3600
+        for hour, part in df.groupby(hours.to_numpy(), sort=True):
+            output_path = _available_path(target_dir / partition_subdir(int(hour) * 3600) / filename, overwrite)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            write_frame(part, output_path, profile)
+            written.append(output_path)
+        logger.info(f"[i] Wrote {len(written)} time partition(s) for index {index_name}.")
+    return written
+
+
+def repartition_file(path, index_dir, index_name=None, db_path=INDEX_SETTINGS_DB) -> List[Path]:
+    """Move a flat parquet file of a time-partitioned index into its partitions.
+
+    Used for files produced outside :func:`write_index_frame`, such as repo
+    script output.  Returns the new paths, or ``[path]`` when nothing moved.
+    """
+    path = Path(path)
+    if not get_index_settings(index_name, db_path=db_path)["partition_by_time"]:
+        return [path]
+    if any(part.startswith("date=") for part in path.relative_to(index_dir).parts):
+        return [path]
+    df = pd.read_parquet(path)
+    if "_epoch" not in df.columns:
+        logger.warning(f"[!] Leaving {path} unpartitioned because it has no _epoch column.")
+        return [path]
+    written = write_index_frame(df, index_dir, path.name, overwrite=True, index_name=index_name, db_path=db_path)
+    path.unlink()
+    logger.info(f"[i] Moved {path} into {len(written)} time partition(s).")
+    return written
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""Persistent catalog of the parquet files stored under ``indexes/``.
+
+Each entry records a file's size, mtime, row count, column names/types and the
+min/max ``_epoch`` taken from the parquet footer.  Writers call
+:func:`record_file` after producing a file (which also builds the file's
+Bloom filters and token postings when its index configures any) and the C++ index scanner calls
+:func:`lookup_files` to skip files with the wrong schema or time range
+without opening them.  Entries whose size or mtime no longer match the file
+on disk are refreshed transparently.
+"""
+from __future__ import annotations
+
+import calendar
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional
+
+from utils.parquet_footer_cache import get_footer, invalidate
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+MANIFEST_DB = PROJECT_ROOT / "index_manifest.db"
+
+
+@contextmanager
+def _connect(db_path) -> Iterator[sqlite3.Connection]:
+    """Yield a connection to the manifest that commits on success and is always closed."""
+    conn = sqlite3.connect(str(db_path), timeout=30)
+    try:
+        with conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS index_manifest (
+                       path TEXT PRIMARY KEY,
+                       size INTEGER,
+                       mtime REAL,
+                       num_rows INTEGER,
+                       num_row_groups INTEGER,
+                       columns TEXT,
+                       min_epoch INTEGER,
+                       max_epoch INTEGER,
+                       updated_at REAL,
+                       superseded_by TEXT
+                   )"""
+            )
+            cols = [row[1] for row in conn.execute("PRAGMA table_info(index_manifest)")]
+            if "superseded_by" not in cols:
+                conn.execute("ALTER TABLE index_manifest ADD COLUMN superseded_by TEXT")
+            yield conn
+    finally:
+        conn.close()
+
+
+def _statistic_to_epoch(value) -> Optional[int]:
+    """Convert a footer statistic (integer epoch or datetime) to epoch seconds."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if hasattr(value, "utctimetuple"):
+        return calendar.timegm(value.utctimetuple())
+    return None
+
+
+def _time_range(metadata, schema) -> tuple[Optional[int], Optional[int]]:
+    """Return the file-wide ``_epoch`` range from row-group statistics."""
+    import pyarrow.types as pa_types
+
+    names = set(schema.names)
+    if "_epoch" in names and pa_types.is_integer(schema.field("_epoch").type):
+        time_col = "_epoch"
+    elif "timestamp" in names and pa_types.is_timestamp(schema.field("timestamp").type):
+        time_col = "timestamp"
+    else:
+        return None, None
+
+    lows, highs = [], []
+    for rg in range(metadata.num_row_groups):
+        row_group = metadata.row_group(rg)
+        stats = None
+        for ci in range(row_group.num_columns):
+            column = row_group.column(ci)
+            if column.path_in_schema == time_col:
+                stats = column.statistics
+                break
+        if stats is None or not stats.has_min_max:
+            return None, None
+        low, high = _statistic_to_epoch(stats.min), _statistic_to_epoch(stats.max)
+        if low is None or high is None:
+            return None, None
+        lows.append(low)
+        highs.append(high)
+    if not lows:
+        return None, None
+    return min(lows), max(highs)
+
+
+def describe_parquet(path) -> dict:
+    """Read the footer of ``path`` (through the footer cache) and return its manifest entry."""
+    path = str(Path(path).resolve())
+    st = os.stat(path)
+    footer = get_footer(path)
+    schema = footer.schema
+    min_epoch, max_epoch = _time_range(footer.metadata, schema)
+    return {
+        "path": path,
+        "size": st.st_size,
+        "mtime": st.st_mtime,
+        "num_rows": footer.num_rows,
+        "num_row_groups": footer.num_row_groups,
+        "columns": {field.name: str(field.type) for field in schema},
+        "min_epoch": min_epoch,
+        "max_epoch": max_epoch,
+        "superseded_by": None,
+    }
+
+
+def _store(conn: sqlite3.Connection, entry: dict) -> None:
+    conn.execute(
+        # A refresh keeps superseded_by: compaction's marker must outlive footer changes
+        """INSERT INTO index_manifest (
+               path, size, mtime, num_rows, num_row_groups, columns,
+               min_epoch, max_epoch, updated_at
+           ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+           ON CONFLICT(path) DO UPDATE SET
+               size=excluded.size, mtime=excluded.mtime, num_rows=excluded.num_rows,
+               num_row_groups=excluded.num_row_groups, columns=excluded.columns,
+               min_epoch=excluded.min_epoch, max_epoch=excluded.max_epoch,
+               updated_at=excluded.updated_at""",
+        (
+            entry["path"],
+            entry["size"],
+            entry["mtime"],
+            entry["num_rows"],
+            entry["num_row_groups"],
+            json.dumps(entry["columns"]),
+            entry["min_epoch"],
+            entry["max_epoch"],
+            time.time(),
+        ),
+    )
+
+
+_ENTRY_COLUMNS = (
+    "path, size, mtime, num_rows, num_row_groups, columns, min_epoch, max_epoch, superseded_by"
+)
+
+
+def _row_to_entry(row) -> dict:
+    return {
+        "path": row[0],
+        "size": row[1],
+        "mtime": row[2],
+        "num_rows": row[3],
+        "num_row_groups": row[4],
+        "columns": json.loads(row[5]) if row[5] else {},
+        "min_epoch": row[6],
+        "max_epoch": row[7],
+        "superseded_by": row[8],
+    }
+
+
+def record_file(path, db_path=MANIFEST_DB) -> Optional[dict]:
+    """Add or refresh the manifest entry for ``path``.
+
+    Failures are logged and never propagate, so writers can call this
+    unconditionally after saving a file.
+    """
+    try:
+        entry = describe_parquet(path)
+        with _connect(db_path) as conn:
+            _store(conn, entry)
+        logger.info(f"[i] Recorded {entry['path']} in index manifest.")
+    except Exception as e:
+        logger.warning(f"[!] Could not record {path} in index manifest: {e}")
+        return None
+    try:
+        from utils import bloom_filters
+
+        bloom_filters.update_file(entry["path"], db_path)
+    except Exception as e:
+        logger.warning(f"[!] Could not build Bloom filters for {path}: {e}")
+    try:
+        from utils import token_index
+
+        token_index.update_file(entry["path"], db_path)
+    except Exception as e:
+        logger.warning(f"[!] Could not build token index for {path}: {e}")
+    return entry
+
+
+def record_directory(directory, since: float | None = None, db_path=MANIFEST_DB) -> int:
+    """Record every parquet file below ``directory`` modified after ``since``."""
+    count = 0
+    for file_path in Path(directory).rglob("*.parquet"):
+        try:
+            if since is not None and file_path.stat().st_mtime < since:
+                continue
+        except OSError:
+            continue
+        if record_file(file_path, db_path=db_path) is not None:
+            count += 1
+    return count
+
+
+def forget_file(path, db_path=MANIFEST_DB) -> None:
+    """Remove the manifest entry (and Bloom filters and token postings) for a deleted or replaced file."""
+    invalidate(path)
+    try:
+        from utils import bloom_filters, token_index
+
+        with _connect(db_path) as conn:
+            conn.execute(
+                "DELETE FROM index_manifest WHERE path=?", (str(Path(path).resolve()),)
+            )
+        bloom_filters.forget_file(path, db_path)
+        token_index.forget_file(path, db_path)
+    except Exception as e:
+        logger.warning(f"[!] Could not remove {path} from index manifest: {e}")
+
+
+def lookup_files(paths: Iterable[str], db_path=MANIFEST_DB) -> Dict[str, dict]:
+    """Return manifest entries for ``paths``, keyed by the path as given.
+
+    Missing entries and entries whose size or mtime no longer match the file
+    are rebuilt from the footer.  Files that cannot be described are left out
+    so that callers fall back to opening them directly.
+    """
+    paths = list(paths)
+    result: Dict[str, dict] = {}
+    if not paths:
+        return result
+
+    with _connect(db_path) as conn:
+        for original in paths:
+            resolved = str(Path(original).resolve())
+            try:
+                st = os.stat(resolved)
+            except OSError:
+                continue
+            row = conn.execute(
+                f"SELECT {_ENTRY_COLUMNS} FROM index_manifest WHERE path=?", (resolved,)
+            ).fetchone()
+            if row and row[1] == st.st_size and row[2] == st.st_mtime:
+                result[original] = _row_to_entry(row)
+                continue
+            try:
+                entry = describe_parquet(resolved)
+            except Exception as e:
+                logger.warning(f"[!] Could not describe {resolved} for index manifest: {e}")
+                continue
+            if row:
+                entry["superseded_by"] = row[8]
+            _store(conn, entry)
+            result[original] = entry
+    return result
+
+
+def mark_superseded(paths: Iterable, superseded_by, db_path=MANIFEST_DB) -> None:
+    """Record that ``paths`` have been merged into ``superseded_by``.
+
+    The index scanner skips a superseded file whenever the file that replaced
+    it is among its candidates, so compaction can publish the merged file
+    before deleting the originals without readers seeing rows twice.
+    """
+    target = str(Path(superseded_by).resolve())
+    with _connect(db_path) as conn:
+        for path in paths:
+            resolved = str(Path(path).resolve())
+            if conn.execute("SELECT 1 FROM index_manifest WHERE path=?", (resolved,)).fetchone() is None:
+                _store(conn, describe_parquet(resolved))
+            conn.execute(
+                "UPDATE index_manifest SET superseded_by=? WHERE path=?", (target, resolved)
+            )
+
+
+def superseded_entries(db_path=MANIFEST_DB) -> list:
+    """Return the manifest entries of every file marked as superseded."""
+    with _connect(db_path) as conn:
+        rows = conn.execute(
+            f"SELECT {_ENTRY_COLUMNS} FROM index_manifest WHERE superseded_by IS NOT NULL"
+        ).fetchall()
+    return [_row_to_entry(row) for row in rows]
+
+
+def clear_superseded(path, db_path=MANIFEST_DB) -> None:
+    """Make ``path`` visible to the scanner again."""
+    with _connect(db_path) as conn:
+        conn.execute(
+            "UPDATE index_manifest SET superseded_by=NULL WHERE path=?", (str(Path(path).resolve()),)
+        )
+
+
+def prune_missing(db_path=MANIFEST_DB) -> int:
+    """Drop entries for files that no longer exist and return how many were removed."""
+    with _connect(db_path) as conn:
+        rows = conn.execute("SELECT path FROM index_manifest").fetchall()
+        missing = [(p,) for (p,) in rows if not os.path.exists(p)]
+        conn.executemany("DELETE FROM index_manifest WHERE path=?", missing)
+    if missing:
+        logger.info(f"[i] Pruned {len(missing)} missing file(s) from index manifest.")
+    return len(missing)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Answer aggregate-only pipelines from the index manifest.
+
+``index="x/**" | stats count`` needs nothing but row counts, which every
+parquet footer (and therefore every index manifest entry) already holds.
+:func:`answer` computes such a ``stats`` from the manifest entries of the
+files an index call would read, without decoding any column data.
+
+Supported are unfiltered index calls followed by ``stats`` with only
+``count``, ``min(_epoch)`` and ``max(_epoch)``, optionally ``by
+_source_file``.  ``earliest``/``latest`` are not: they take the first and
+last value in read order, which footer statistics do not record.  Anything
+else returns ``None`` so the caller runs the query normally.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_EPOCH_FUNCS = {"min": "min_epoch", "max": "max_epoch"}
+
+
+def is_unfiltered(index_tokens: List[str]) -> bool:
+    """Return ``True`` when ``index_tokens`` hold only ``index=<pattern>`` clauses."""
+    if not index_tokens or len(index_tokens) % 3:
+        return False
+    return all(
+        index_tokens[i].lower() == "index" and index_tokens[i + 1] == "="
+        for i in range(0, len(index_tokens), 3)
+    )
+
+
+def parse_stats(segment: str) -> Optional[tuple]:
+    """Return ``(specs, group_fields)`` if the ``stats`` segment can be answered from metadata."""
+    from handlers.StatsHandler import StatsHandler
+
+    tokens = segment.split(None, 1)
+    if not tokens or tokens[0].lower() != "stats":
+        return None
+    try:
+        specs, group_fields = StatsHandler().parse_clause(tokens[1] if len(tokens) > 1 else "")
+    except ValueError:
+        return None
+    if not specs or group_fields not in ([], ["_source_file"]):
+        return None
+    for spec in specs:
+        if spec["func"] == "count" and spec["field"] is None:
+            continue
+        if spec["func"] in _EPOCH_FUNCS and spec["field"] == "_epoch":
+            continue
+        return None
+    return specs, group_fields
+
+
+def _has_integer_epoch(entry: dict) -> bool:
+    return str(entry["columns"].get("_epoch", "")).startswith(("int", "uint"))
+
+
+def answer(planned: Iterable[dict], specs: List[dict], group_fields: List[str], db_path=None):
+    """Compute ``stats`` over the files in ``planned`` from their manifest entries.
+
+    ``planned`` is the output of the index scanner's ``plan_index_files``.
+    Returns a DataFrame shaped like ``StatsHandler.run_stats`` output, or
+    ``None`` when a file is only partially read, has no manifest entry, or
+    lacks the ``_epoch`` statistics a spec needs.
+    """
+    import pandas as pd
+
+    from utils.index_manifest import MANIFEST_DB, lookup_files
+
+    planned = list(planned)
+    if not planned or any(item["row_groups"] is not None for item in planned):
+        return None
+    entries = lookup_files([item["path"] for item in planned], db_path=db_path or MANIFEST_DB)
+    if len(entries) != len(planned):
+        return None
+
+    needs_epoch = any(spec["func"] in _EPOCH_FUNCS for spec in specs)
+    rows = []
+    for item in planned:
+        entry = entries[item["path"]]
+        row = {"_source_file": item["source_file"], "count": entry["num_rows"]}
+        if needs_epoch and _has_integer_epoch(entry):
+            if entry["min_epoch"] is None or entry["max_epoch"] is None:
+                return None
+            row["min_epoch"], row["max_epoch"] = entry["min_epoch"], entry["max_epoch"]
+        rows.append(row)
+    files = pd.DataFrame(rows)
+    if not files["count"].sum():
+        return None
+    if needs_epoch and "min_epoch" not in files.columns:
+        # No file has an _epoch column; let the full query report it
+        return None
+
+    reducers = {"count": "sum", "min_epoch": "min", "max_epoch": "max"}
+    if group_fields:
+        files = files[files["count"] > 0]
+        data = {}
+        for spec in specs:
+            column = "count" if spec["field"] is None else _EPOCH_FUNCS[spec["func"]]
+            data[spec["alias"]] = files.groupby("_source_file")[column].agg(reducers[column])
+        result = pd.DataFrame(data).reset_index()
+        for spec in specs:
+            if not result[spec["alias"]].isna().any():
+                result[spec["alias"]] = result[spec["alias"]].astype("int64")
+    else:
+        data = {}
+        for spec in specs:
+            column = "count" if spec["field"] is None else _EPOCH_FUNCS[spec["func"]]
+            data[spec["alias"]] = [files[column].agg(reducers[column])]
+        result = pd.DataFrame(data)
+    logger.info(f"[i] Answered stats from metadata of {len(planned)} file(s).")
+    return result
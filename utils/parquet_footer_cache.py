@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Process-wide LRU cache of parsed parquet footers.
+
+Opening a parquet file only to learn its schema, row groups or column
+statistics costs a read and a Thrift decode of the footer.  The C++ index
+scanner, the index manifest and the inspection helpers all go through
+:func:`get_footer`, so on hot indexes those checks are answered from memory.
+Entries are keyed by resolved path and are only reused while the file's size
+and mtime are unchanged, so rewritten files are picked up automatically.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 4096
+
+
+class Footer(NamedTuple):
+    path: str
+    size: int
+    mtime_ns: int
+    metadata: object  # pyarrow.parquet.FileMetaData
+    schema: object  # pyarrow.Schema
+
+    @property
+    def num_rows(self) -> int:
+        return self.metadata.num_rows
+
+    @property
+    def num_row_groups(self) -> int:
+        return self.metadata.num_row_groups
+
+
+class ParquetFooterCache:
+    """Thread-safe LRU of :class:`Footer` entries validated by (size, mtime)."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, Footer] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path) -> Footer:
+        """Return the footer of ``path``, reading it only when not cached or stale."""
+        resolved = str(Path(path).resolve())
+        st = os.stat(resolved)
+        with self._lock:
+            entry = self._entries.get(resolved)
+            if entry is not None and entry.size == st.st_size and entry.mtime_ns == st.st_mtime_ns:
+                self._entries.move_to_end(resolved)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        import pyarrow.parquet as pq
+
+        metadata = pq.read_metadata(resolved)
+        entry = Footer(resolved, st.st_size, st.st_mtime_ns, metadata, metadata.schema.to_arrow_schema())
+        with self._lock:
+            self._entries[resolved] = entry
+            self._entries.move_to_end(resolved)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, path) -> None:
+        """Drop the entry for ``path`` if present."""
+        with self._lock:
+            self._entries.pop(str(Path(path).resolve()), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_cache = ParquetFooterCache()
+
+
+def get_footer(path) -> Footer:
+    """Return the cached :class:`Footer` for ``path`` from the shared cache."""
+    return _cache.get(path)
+
+
+def invalidate(path) -> None:
+    """Forget ``path`` in the shared cache, e.g. after deleting the file."""
+    _cache.invalidate(path)
+
+
+def cache_info() -> dict:
+    """Return entry and hit/miss counts for the shared cache."""
+    return _cache.info()
+
+
+def clear_cache() -> None:
+    """Empty the shared cache and reset its counters."""
+    _cache.clear()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Shared parquet writer used by every path that produces index files.
+
+A :class:`WriterProfile` describes how a file is laid out on disk: codec,
+dictionary encoding for low-cardinality strings, ``DELTA_BINARY_PACKED`` for
+the integer ``_epoch`` column, column statistics, row-group size, and whether
+rows are sorted by ``_epoch`` first.  Sorted row groups carry tight
+``_epoch`` min/max statistics, which is what lets the index scanner skip them
+for a time window.  Per-index profiles are stored with the other index
+settings (see :func:`utils.index_layout.writer_profile`).
+"""
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_CODECS = ("zstd", "lz4", "snappy", "gzip", "brotli", "none")
+
+
+class WriterProfile(NamedTuple):
+    compression: str = "zstd"
+    compression_level: Optional[int] = None
+    row_group_size: int = 128 * 1024
+    sort_by_epoch: bool = True
+    # String columns whose distinct/total ratio is at most this are dictionary
+    # encoded; 0 disables dictionary encoding
+    dictionary_max_ratio: float = 0.2
+    delta_epoch: bool = True
+    write_statistics: bool = True
+
+
+DEFAULT_PROFILE = WriterProfile()
+# Saved search results keep the row order the query produced
+RESULTS_PROFILE = DEFAULT_PROFILE._replace(sort_by_epoch=False)
+
+
+def validate_profile(profile: WriterProfile) -> WriterProfile:
+    """Return ``profile`` or raise ``ValueError`` if it cannot be written."""
+    import pyarrow as pa
+
+    if profile.compression not in SUPPORTED_CODECS:
+        raise ValueError(f"Unsupported compression {profile.compression!r}; use one of {', '.join(SUPPORTED_CODECS)}.")
+    if profile.compression != "none" and not pa.Codec.is_available(profile.compression):
+        raise ValueError(f"Compression {profile.compression!r} is not available in this pyarrow build.")
+    if profile.row_group_size <= 0:
+        raise ValueError("row_group_size must be positive.")
+    if not 0 <= profile.dictionary_max_ratio <= 1:
+        raise ValueError("dictionary_max_ratio must be between 0 and 1.")
+    return profile
+
+
+def _dictionary_columns(table, max_ratio: float) -> list:
+    """Return the string columns of ``table`` with few enough distinct values."""
+    import pyarrow.compute as pc
+    import pyarrow.types as pa_types
+
+    if max_ratio <= 0 or table.num_rows == 0:
+        return []
+    limit = max(1, int(table.num_rows * max_ratio))
+    columns = []
+    for field in table.schema:
+        if pa_types.is_dictionary(field.type):
+            columns.append(field.name)
+        elif pa_types.is_string(field.type) or pa_types.is_large_string(field.type):
+            if pc.count_distinct(table[field.name]).as_py() <= limit:
+                columns.append(field.name)
+    return columns
+
+
+def write_options(table, profile: WriterProfile = DEFAULT_PROFILE) -> dict:
+    """Return the ``pyarrow.parquet.write_table`` keyword arguments for ``table``."""
+    import pyarrow.types as pa_types
+
+    options = {
+        "compression": profile.compression,
+        "row_group_size": profile.row_group_size,
+        "write_statistics": profile.write_statistics,
+        "use_dictionary": _dictionary_columns(table, profile.dictionary_max_ratio),
+    }
+    if profile.compression_level is not None:
+        options["compression_level"] = profile.compression_level
+    if (
+        profile.delta_epoch
+        and "_epoch" in table.column_names
+        and pa_types.is_integer(table.schema.field("_epoch").type)
+    ):
+        options["column_encoding"] = {"_epoch": "DELTA_BINARY_PACKED"}
+    return options
+
+
+def prepare_table(table, profile: WriterProfile = DEFAULT_PROFILE):
+    """Return ``table`` sorted by ``_epoch`` when the profile asks for it."""
+    if profile.sort_by_epoch and "_epoch" in table.column_names and table.num_rows > 1:
+        table = table.sort_by("_epoch")
+    return table
+
+
+def write_table(table, path, profile: WriterProfile = DEFAULT_PROFILE) -> Path:
+    """Write a ``pyarrow.Table`` to ``path`` using ``profile``."""
+    import pyarrow.parquet as pq
+
+    table = prepare_table(table, profile)
+    pq.write_table(table, str(path), **write_options(table, profile))
+    return Path(path)
+
+
+def write_frame(df, path, profile: WriterProfile = DEFAULT_PROFILE) -> Path:
+    """Write a ``pandas.DataFrame`` to ``path`` using ``profile``; the index is not stored."""
+    import pyarrow as pa
+
+    return write_table(pa.Table.from_pandas(df, preserve_index=False), path, profile)
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""Static analysis helpers for speakQuery pipelines.
+
+These helpers inspect the raw ``| command ...`` segments that follow an index
+call and work out which fields the rest of the pipeline can observe and how
+many rows it keeps.  The results are handed to ``process_index_calls`` so the
+C++ scanner only decodes the columns that are actually used and stops reading
+once a leading ``head`` is satisfied.
+"""
+from __future__ import annotations
+
+import re
+import shlex
+from typing import Iterable, List, Optional, Set
+
+# Columns the scanner always keeps because time handling depends on them.
+TIME_FIELDS = ("_epoch", "timestamp", "_time")
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_.]*")
+_DOUBLE_QUOTED = re.compile(r'"(?:[^"\\]|\\.)*"')
+_SINGLE_QUOTED = re.compile(r"'((?:[^'\\]|\\.)*)'")
+
+# Commands that only read the fields they mention and pass everything else on.
+_PASS_THROUGH = {
+    "search",
+    "where",
+    "eval",
+    "eventstats",
+    "streamstats",
+    "head",
+    "limit",
+    "sort",
+    "reverse",
+    "rex",
+    "regex",
+    "rename",
+    "fillnull",
+    "base64",
+    "bin",
+    "dedup",
+    "join",
+    "append",
+    "lookup",
+    "coalesce",
+    "mvexpand",
+    "mvreverse",
+    "mvcombine",
+    "mvdedup",
+    "mvappend",
+    "mvfilter",
+    "mvcount",
+    "mvdc",
+    "mvfind",
+    "mvzip",
+    "mvjoin",
+    "mvindex",
+    "spath",
+}
+
+# Commands that replace the column set with the fields they reference.
+_BARRIERS = {"stats", "timechart"}
+
+# Commands that observe every column of their input.
+_NEEDS_ALL = {"fieldsummary", "outputlookup", "outputnew", "appendpipe", "multisearch"}
+
+# Commands that keep every input row, in order, so a ``head`` after them can
+# be applied to the index scan instead.
+_ROW_PRESERVING = {"eval", "rename", "fields", "table", "fillnull", "base64", "bin"}
+
+DEFAULT_HEAD_COUNT = 5
+
+
+def referenced_identifiers(segment: str) -> Set[str]:
+    """Return every identifier-like word mentioned in ``segment``.
+
+    Double-quoted strings are treated as literals and ignored, while
+    single-quoted strings are field references as in ``eval``.  The result is
+    deliberately generous: keywords and function names are included, which
+    only means a column of the same name is read if it exists.
+    """
+    text = _SINGLE_QUOTED.sub(lambda m: f" {m.group(1)} ", segment)
+    text = _DOUBLE_QUOTED.sub(" ", text)
+    names = set(_IDENTIFIER.findall(text))
+    names.update(m.group(1) for m in _SINGLE_QUOTED.finditer(segment))
+    return names
+
+
+def _field_list(tokens: Iterable[str]) -> Optional[List[str]]:
+    """Split ``table``/``fields`` arguments, returning ``None`` on wildcards."""
+    fields = []
+    for tok in tokens:
+        for part in tok.split(","):
+            part = part.strip().lstrip("+-").strip()
+            if not part:
+                continue
+            if "*" in part or "?" in part:
+                return None
+            fields.append(part)
+    return fields
+
+
+def required_fields(segment_strs: List[str]) -> Optional[List[str]]:
+    """Work out which input fields a pipeline can observe.
+
+    ``segment_strs`` are the raw segments following the index call, e.g.
+    ``["where status=500", "stats count by host"]``.  The pipeline is walked
+    backwards: ``table``, ``fields`` and ``stats`` reset the set of needed
+    columns, other known commands add the fields they reference.  ``None`` is
+    returned whenever every column may be needed (no projecting command, a
+    macro, an unknown command or a wildcard field list).
+    """
+    needed: Optional[Set[str]] = None
+
+    for seg in reversed(segment_strs):
+        seg = seg.strip()
+        if not seg:
+            continue
+        if seg.startswith("`"):
+            return None
+        try:
+            tokens = shlex.split(seg)
+        except ValueError:
+            return None
+        if not tokens:
+            continue
+
+        cmd = tokens[0].split("(")[0].lower()
+        args = tokens[1:]
+
+        if cmd == "table" or (
+            cmd == "fields" and not any(t.startswith("-") for t in args)
+        ):
+            fields = _field_list(args)
+            needed = set(fields) if fields else None
+        elif cmd == "fields":
+            # ``fields -`` only removes columns, the downstream set is unchanged
+            continue
+        elif cmd == "maketable":
+            needed = set()
+        elif cmd in _BARRIERS:
+            needed = referenced_identifiers(seg[len(tokens[0]):])
+            if cmd == "timechart":
+                needed.add("_time")
+        elif cmd in _NEEDS_ALL:
+            needed = None
+        elif cmd in _PASS_THROUGH:
+            if needed is not None:
+                needed |= referenced_identifiers(seg[len(tokens[0]):])
+        else:
+            return None
+
+    if needed is None:
+        return None
+    return sorted(needed)
+
+
+def head_limit(segment_strs: List[str]) -> Optional[int]:
+    """Return the row count of a ``head``/``limit`` the index scan can apply.
+
+    The pipeline qualifies when ``head N`` (or ``limit N``) is its first
+    segment, or is preceded only by commands that keep every row.  ``None``
+    is returned when no such ``head`` exists or its count is not a positive
+    integer.
+    """
+    for seg in segment_strs:
+        seg = seg.strip()
+        if not seg or seg.startswith("`"):
+            return None
+        try:
+            tokens = shlex.split(seg)
+        except ValueError:
+            return None
+        if not tokens:
+            return None
+
+        cmd = tokens[0].split("(")[0].lower()
+        if cmd in ("head", "limit"):
+            if len(tokens) == 1:
+                return DEFAULT_HEAD_COUNT
+            if len(tokens) == 2 and tokens[1].isdigit() and int(tokens[1]) > 0:
+                return int(tokens[1])
+            return None
+        if cmd not in _ROW_PRESERVING:
+            return None
+    return None
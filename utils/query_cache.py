@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Process-wide LRU cache of compiled queries.
+
+Running a query normally lexes and parses it with the pure-Python ANTLR
+runtime, walks the parse tree into the directives the listener executes and
+plans them (:mod:`utils.query_plan`).  Saved searches and dashboard panels
+send the same text over and over, so :func:`get_compiled` keeps the result
+of that work, a :class:`CompiledQuery`, keyed by the normalized query text
+(:func:`normalize_query`).  A hit skips lexing, parsing and planning; the
+listener runs the cached plan directly and never modifies it.  Queries with
+syntax errors are compiled every time so the parser keeps reporting them.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, NamedTuple, Optional, Tuple
+
+from utils.query_plan import Directive, LogicalPlan
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 1024
+
+
+class CompiledQuery(NamedTuple):
+    query: str
+    tokens: Tuple[str, ...]  # flattened parse tree, without <EOF> and a leading pipe
+    directives: Tuple[Directive, ...]  # the ``| command ...`` lines after the initial sequence
+    plan: Optional[LogicalPlan]  # optimized plan; None when the index call did not parse cleanly
+    syntax_errors: int = 0
+
+
+def normalize_query(query: str) -> str:
+    """Return the cache key for ``query``: unix newlines, no trailing spaces or blank edges."""
+    lines = query.replace("\r\n", "\n").strip().split("\n")
+    return "\n".join(line.rstrip() for line in lines) + "\n"
+
+
+class QueryCache:
+    """Thread-safe LRU of :class:`CompiledQuery` entries keyed by normalized text."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, CompiledQuery] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, query: str, compile_query: Callable[[str], CompiledQuery]) -> CompiledQuery:
+        """Return the compiled form of ``query``, calling ``compile_query`` only on a miss."""
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        entry = compile_query(key)
+        if entry.syntax_errors:
+            return entry
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_cache = QueryCache()
+
+
+def get_compiled(query: str, compile_query: Callable[[str], CompiledQuery]) -> CompiledQuery:
+    """Return the :class:`CompiledQuery` for ``query`` from the shared cache.
+
+    ``compile_query`` receives the normalized text and is only called on a miss.
+    """
+    return _cache.get(query, compile_query)
+
+
+def cache_info() -> dict:
+    """Return entry and hit/miss counts for the shared cache."""
+    return _cache.info()
+
+
+def clear_cache() -> None:
+    """Empty the shared cache and reset its counters."""
+    _cache.clear()
@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+"""Logical plans for index-call pipelines and the rules that optimize them.
+
+:func:`build` turns an index call and the :class:`Directive` records the
+listener takes from the parse tree into a :class:`LogicalPlan`: an
+:class:`IndexScan` followed by one :class:`PlanNode` per directive, classified as filter, project, eval,
+aggregate, sort, limit, join or subsearch (anything else is an opaque
+command).  :func:`optimize` rewrites the plan with rules that never change
+the rows a query returns:
+
+* **filter reordering** - a ``search``/``where`` moves ahead of ``sort``
+  and of ``eval`` directives that do not assign a field it reads;
+* **filter merging** - adjacent filters become one ``where (a) AND (b)``;
+* **predicate pushdown** - a leading filter built only from literal
+  comparisons joins the index call's own filter, so the scanner prunes
+  files and row groups with it (see :func:`pushable`);
+* **constant folding** - arithmetic on numeric literals inside ``eval`` is
+  computed once, e.g. ``ttl=60*60*24`` becomes ``ttl=86400``;
+* **projection pruning** - ``eval`` assignments no later directive can
+  observe are dropped (the scan itself is projected with
+  :func:`utils.pipeline_analysis.required_fields`);
+* **top-K** - a ``sort`` directly followed by ``head N`` records ``N`` on
+  the sort node, so only the rows that can reach the head are sorted.
+  ``sort`` is stable (tied rows keep their input order), which is what
+  lets the partial sort pick the same tied rows as the full one.
+
+The listener executes ``plan.steps`` directly: every node carries the
+tokens its handler receives.  Nodes also keep the position of the directive
+they came from (``source``); rewritten nodes have none.
+"""
+from __future__ import annotations
+
+import ast
+import logging
+import math
+import re
+from typing import List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from utils.pipeline_analysis import DEFAULT_HEAD_COUNT, referenced_identifiers, required_fields
+
+logger = logging.getLogger(__name__)
+
+# Node kinds
+SCAN = "scan"
+FILTER = "filter"
+PROJECT = "project"
+EVAL = "eval"
+AGGREGATE = "aggregate"
+SORT = "sort"
+LIMIT = "limit"
+JOIN = "join"
+SUBSEARCH = "subsearch"
+COMMAND = "command"
+
+_KINDS = {
+    "search": FILTER,
+    "where": FILTER,
+    "fields": PROJECT,
+    "table": PROJECT,
+    "rename": PROJECT,
+    "eval": EVAL,
+    "stats": AGGREGATE,
+    "eventstats": AGGREGATE,
+    "streamstats": AGGREGATE,
+    "timechart": AGGREGATE,
+    "sort": SORT,
+    "head": LIMIT,
+    "limit": LIMIT,
+    "join": JOIN,
+    "append": JOIN,
+    "appendpipe": JOIN,
+    "multisearch": JOIN,
+    "lookup": JOIN,
+}
+
+# Identifiers the index call parser treats specially and so cannot be pushed into it
+_INDEX_KEYWORDS = {"index", "earliest", "latest"}
+
+_FOLDABLE = {
+    ast.Add: lambda a, b: a + b,
+    ast.Sub: lambda a, b: a - b,
+    ast.Mult: lambda a, b: a * b,
+    ast.Div: lambda a, b: a / b,
+}
+
+
+class Directive(NamedTuple):
+    """One ``| command ...`` of a parsed query.
+
+    ``text`` is the directive's source text and ``tokens`` what its handler
+    receives: the parser's tokens for ``search``/``where``, ``eval`` and the
+    stats directives, the shell-style split of ``text`` for the rest.
+    """
+    command: str
+    text: str
+    tokens: Tuple[str, ...]
+
+
+class PlanNode:
+    """One pipeline directive of a :class:`LogicalPlan`."""
+
+    def __init__(self, kind: str, segment: str, source: Optional[int] = None,
+                 tokens: Sequence[str] = ()):
+        self.kind = kind
+        self.segment = segment
+        self.source = source
+        self.tokens = tuple(tokens)
+        # Set on sort nodes by the top-K rule: only this many leading rows are used
+        self.limit: Optional[int] = None
+
+    @property
+    def command(self) -> str:
+        return self.segment.split(None, 1)[0].split("(")[0].lower()
+
+    @property
+    def arguments(self) -> str:
+        return self.segment[len(self.segment.split(None, 1)[0]):].strip()
+
+    def __repr__(self):
+        label = f"{self.kind}[{self.segment}]"
+        return f"{label}(top {self.limit})" if self.limit is not None else label
+
+
+class IndexScan:
+    """The index call feeding a plan, as the tokens handed to the C++ scanner."""
+
+    def __init__(self, tokens: List[str]):
+        self.tokens = list(tokens)
+        self.kind = SCAN
+
+    @property
+    def has_subsearch(self) -> bool:
+        return "[" in self.tokens
+
+    def __repr__(self):
+        return f"scan[{' '.join(self.tokens)}]"
+
+
+class LogicalPlan:
+    """An index scan followed by the pipeline's directives, in execution order."""
+
+    def __init__(self, scan: IndexScan, steps: List[PlanNode]):
+        self.scan = scan
+        self.steps = steps
+
+    def segments(self) -> List[str]:
+        """Return the raw segment of every step, as the analysis helpers expect."""
+        return [step.segment for step in self.steps]
+
+    def describe(self) -> str:
+        return " -> ".join(repr(node) for node in [self.scan, *self.steps])
+
+
+def classify(segment: str) -> str:
+    """Return the node kind of a raw pipeline segment."""
+    if "[" in segment:
+        return SUBSEARCH
+    words = segment.split(None, 1)
+    if not words or segment.startswith("`"):
+        return COMMAND
+    return _KINDS.get(words[0].split("(")[0].lower(), COMMAND)
+
+
+def build(index_tokens: List[str], directives: Sequence[Directive]) -> LogicalPlan:
+    """Build the unoptimized plan of an index call and its pipeline directives."""
+    steps = [
+        PlanNode(classify(directive.text), directive.text, i, directive.tokens)
+        for i, directive in enumerate(directives)
+    ]
+    return LogicalPlan(IndexScan(index_tokens), steps)
+
+
+# ---------------------------------------------------------------------------
+# Filters
+# ---------------------------------------------------------------------------
+def filter_expression(node: PlanNode):
+    """Parse a filter node's tokens into a :mod:`utils.filter_mask` tree, or ``None``.
+
+    ``None`` is returned for anything the rules must leave alone: an empty
+    expression, a parse error or tokens the parser would silently ignore.
+    """
+    from handlers.SearchCmdHandler import SearchDirective
+
+    if len(node.tokens) < 2:
+        return None
+    directive = SearchDirective()
+    try:
+        parser = directive.Parser(directive.tokenize_query_tokens(list(node.tokens[1:])))
+        root = parser.parse_expression()
+        if parser.has_next():
+            return None
+        return directive.to_expression(root)
+    except (ValueError, IndexError):
+        return None
+
+
+def _fields(expression) -> Tuple[Set[str], bool]:
+    """Return the fields an expression reads and whether it contains free-text terms."""
+    kind = expression[0]
+    if kind in ("and", "or"):
+        left, left_terms = _fields(expression[1])
+        right, right_terms = _fields(expression[2])
+        return left | right, left_terms or right_terms
+    if kind == "cmp":
+        names = {side[1] for side in expression[2:] if side[0] == "field"}
+        return names, False
+    if kind == "in":
+        return {expression[1]}, False
+    if kind == "term":
+        return set(), True
+    if kind == "field":
+        return {expression[1]}, False
+    return set(), False
+
+
+def _literal(value) -> Optional[str]:
+    # Only literals both parsers read back identically
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return str(value) if value >= 0 else None
+    if isinstance(value, str) and not set(value) & {'"', "'", "\\"}:
+        return f'"{value}"'
+    return None
+
+
+def _sources(expression) -> Optional[Set[str]]:
+    """Return the columns a pushable condition reads ("" for terms), or ``None``."""
+    kind = expression[0]
+    if kind in ("and", "or"):
+        left, right = _sources(expression[1]), _sources(expression[2])
+        return None if left is None or right is None else left | right
+    if kind == "cmp":
+        _, op, left, right = expression
+        if op == "!=" or left[0] != "field" or right[0] != "value" or _literal(right[1]) is None:
+            return None
+        return {left[1]}
+    if kind == "in":
+        if not expression[2] or any(_literal(v) is None for v in expression[2]):
+            return None
+        return {expression[1]}
+    if kind == "term":
+        return {""} if _literal(expression[1]) is not None else None
+    return None
+
+
+def pushable(expression) -> bool:
+    """Whether an index call can apply ``expression`` with the same result.
+
+    The scanner skips files lacking any column its filter reads, where a
+    ``where`` would see missing values instead.  The two agree when the
+    expression is a conjunction of conditions that are each false on a
+    missing value and read a single column (or only free-text terms): so
+    literal comparisons other than ``!=``, ``IN`` lists and terms, with
+    ``OR`` only between conditions on the same column.
+    """
+    if expression[0] == "and":
+        return pushable(expression[1]) and pushable(expression[2])
+    sources = _sources(expression)
+    return sources is not None and len(sources) == 1 and not sources & _INDEX_KEYWORDS
+
+
+def _index_tokens(expression) -> List[str]:
+    """Render a pushable expression as index call tokens."""
+    kind = expression[0]
+    if kind in ("and", "or"):
+        return ["(", *_index_tokens(expression[1]), kind.upper(), *_index_tokens(expression[2]), ")"]
+    if kind == "cmp":
+        return [expression[2][1], expression[1], _literal(expression[3][1])]
+    if kind == "in":
+        values = []
+        for value in expression[2]:
+            values += [",", _literal(value)] if values else [_literal(value)]
+        return [expression[1], "IN", "(", *values, ")"]
+    return [_literal(expression[1])]
+
+
+# ---------------------------------------------------------------------------
+# Eval assignments
+# ---------------------------------------------------------------------------
+def _split_assignments(text: str) -> List[str]:
+    """Split eval arguments on the commas outside quotes and parentheses."""
+    parts, current, depth, quote = [], "", 0, None
+    for char in text:
+        if quote:
+            quote = None if char == quote else quote
+        elif char in "\"'":
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(current.strip())
+            current = ""
+            continue
+        current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+def _assignments(node: PlanNode) -> Optional[List[Tuple[str, str]]]:
+    """Split an eval node into ``(field, expression)`` pairs, or ``None``."""
+    pairs = []
+    for assignment in _split_assignments(node.arguments):
+        field, sep, expression = assignment.partition("=")
+        field = field.strip()
+        if not sep or expression.startswith("=") or not re.fullmatch(r"[A-Za-z_]\w*", field):
+            return None
+        pairs.append((field, expression.strip()))
+    return pairs or None
+
+
+def _eval_node(pairs: List[Tuple[str, str]]) -> PlanNode:
+    arguments = ", ".join(f"{field}={expression}" for field, expression in pairs)
+    return PlanNode(EVAL, f"eval {arguments}", tokens=("eval", arguments))
+
+
+def _fold(node):
+    """Return the value of a constant arithmetic tree, or ``None``."""
+    if isinstance(node, ast.Constant):
+        value = node.value
+        return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        value = _fold(node.operand)
+        if value is None:
+            return None
+        return -value if isinstance(node.op, ast.USub) else value
+    if isinstance(node, ast.BinOp) and type(node.op) in _FOLDABLE:
+        left, right = _fold(node.left), _fold(node.right)
+        if left is None or right is None:
+            return None
+        try:
+            value = _FOLDABLE[type(node.op)](left, right)
+        except (ZeroDivisionError, OverflowError):
+            return None
+        return value if math.isfinite(value) else None
+    return None
+
+
+def fold_constants(expression: str) -> str:
+    """Replace every arithmetic sub-expression of numeric literals with its value.
+
+    Expressions that are not valid Python syntax are returned unchanged.
+    """
+    # Offsets below are columns of a single line of ASCII text
+    if not expression.isascii() or "\n" in expression:
+        return expression
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError:
+        return expression
+
+    spans = []
+
+    def visit(node):
+        if isinstance(node, ast.BinOp):
+            value = _fold(node)
+            if value is not None:
+                spans.append((node.col_offset, node.end_col_offset, value))
+                return
+        for child in ast.iter_child_nodes(node):
+            visit(child)
+
+    visit(tree.body)
+    for start, end, value in sorted(spans, reverse=True):
+        text = repr(value)
+        if value < 0 and not (expression[start - 1:start] == "(" and expression[end:end + 1] == ")"):
+            text = f"({text})"
+        expression = expression[:start] + text + expression[end:]
+    return expression
+
+
+# ---------------------------------------------------------------------------
+# Rules
+# ---------------------------------------------------------------------------
+def _can_pass(filter_node: PlanNode, node: PlanNode) -> bool:
+    """Whether ``filter_node`` can run before ``node`` with the same result."""
+    expression = filter_expression(filter_node)
+    if expression is None:
+        return False
+    if node.kind == SORT:
+        return True
+    if node.kind != EVAL:
+        return False
+    fields, has_terms = _fields(expression)
+    # Terms match any string field, including the ones eval creates
+    if has_terms:
+        return False
+    pairs = _assignments(node)
+    return pairs is not None and not fields & {field for field, _ in pairs}
+
+
+def reorder_filters(plan: LogicalPlan) -> bool:
+    steps, changed = plan.steps, False
+    for i in range(1, len(steps)):
+        j = i
+        while steps[j].kind == FILTER and j > 0 and _can_pass(steps[j], steps[j - 1]):
+            steps[j - 1], steps[j] = steps[j], steps[j - 1]
+            j -= 1
+            changed = True
+    return changed
+
+
+def merge_filters(plan: LogicalPlan) -> bool:
+    steps, changed, i = plan.steps, False, 0
+    while i + 1 < len(steps):
+        first, second = steps[i], steps[i + 1]
+        if (first.kind == FILTER and second.kind == FILTER
+                and filter_expression(first) is not None
+                and filter_expression(second) is not None):
+            tokens = ("where", "(", *first.tokens[1:], ")", "AND", "(", *second.tokens[1:], ")")
+            steps[i:i + 2] = [PlanNode(FILTER, f"where ({first.arguments}) AND ({second.arguments})", tokens=tokens)]
+            changed = True
+        else:
+            i += 1
+    return changed
+
+
+def push_down_filter(plan: LogicalPlan) -> bool:
+    if not plan.steps or plan.steps[0].kind != FILTER:
+        return False
+    # Tokens after an OR would bind to its right-hand side, and subsearches are resolved separately
+    if plan.scan.has_subsearch or any(token.upper() == "OR" for token in plan.scan.tokens):
+        return False
+    expression = filter_expression(plan.steps[0])
+    if expression is None or not pushable(expression):
+        return False
+    plan.scan.tokens += ["(", *_index_tokens(expression), ")"]
+    del plan.steps[0]
+    return True
+
+
+def fold_eval_constants(plan: LogicalPlan) -> bool:
+    changed = False
+    for i, node in enumerate(plan.steps):
+        if node.kind != EVAL:
+            continue
+        pairs = _assignments(node)
+        if pairs is None:
+            continue
+        folded = [(field, fold_constants(expression)) for field, expression in pairs]
+        if folded != pairs:
+            plan.steps[i] = _eval_node(folded)
+            changed = True
+    return changed
+
+
+def prune_evals(plan: LogicalPlan) -> bool:
+    changed = False
+    for i in range(len(plan.steps) - 1, -1, -1):
+        node = plan.steps[i]
+        if node.kind != EVAL:
+            continue
+        needed = required_fields(plan.segments()[i + 1:])
+        pairs = _assignments(node) if needed is not None else None
+        if pairs is None:
+            continue
+        needed = set(needed)
+        kept = []
+        for field, expression in reversed(pairs):
+            if field in needed:
+                kept.append((field, expression))
+                needed |= referenced_identifiers(expression)
+        if len(kept) == len(pairs):
+            continue
+        if kept:
+            plan.steps[i] = _eval_node(kept[::-1])
+        else:
+            del plan.steps[i]
+        changed = True
+    return changed
+
+
+def head_count(node: PlanNode) -> Optional[int]:
+    """Return the row count of a ``head``/``limit`` node, or ``None``."""
+    tokens = node.tokens
+    if len(tokens) == 1:
+        return DEFAULT_HEAD_COUNT
+    if len(tokens) == 2 and tokens[1].isdigit() and int(tokens[1]) > 0:
+        return int(tokens[1])
+    return None
+
+
+def top_k(plan: LogicalPlan) -> bool:
+    changed = False
+    for node, following in zip(plan.steps, plan.steps[1:]):
+        if node.kind == SORT and following.kind == LIMIT and node.limit is None:
+            count = head_count(following)
+            if count is not None and len(node.segment.split()) > 1:
+                node.limit = count
+                changed = True
+    return changed
+
+
+RULES = [
+    reorder_filters,
+    merge_filters,
+    push_down_filter,
+    fold_eval_constants,
+    prune_evals,
+    top_k,
+]
+
+
+def optimize(plan: LogicalPlan) -> LogicalPlan:
+    """Apply :data:`RULES` to ``plan`` in order, rewriting it in place."""
+    for rule in RULES:
+        if rule(plan):
+            logger.info(f"[i] Plan rule '{rule.__name__}' applied: {plan.describe()}")
+    return plan
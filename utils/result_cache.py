@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""Process-wide cache of query results.
+
+Dashboards and saved searches re-run the same query against data that has
+not changed since the last run.  :func:`lookup` returns the stored result of
+such a query instead of executing it again.  Entries are keyed by the
+normalized query text (:func:`utils.query_cache.normalize_query`) and record
+every input file the run depended on as ``(path, size, mtime_ns)``: the files
+the query's index calls resolve to and the lookup/loadjob files read while it
+ran (see :func:`record_input`).  An entry is only reused while the index
+calls still resolve to the same files and none of the inputs changed, so new,
+rewritten or deleted files invalidate it automatically.
+
+Results are kept as zstd-compressed Arrow IPC streams, at most ``max_bytes``
+of them, evicting the least recently used.  Queries that write files
+(``outputlookup``, ``outputnew``) or draw random numbers are never cached,
+nor are results Arrow cannot round-trip exactly (nested values such as
+multivalue lists, non-string column names).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+from utils.query_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# (path, size, mtime_ns) of every input file, sorted by path; missing files have size and mtime -1
+Fingerprint = Tuple[Tuple[str, int, int], ...]
+
+_UNCACHEABLE = re.compile(r"\|\s*output(?:lookup|new)\b|\brandom(?:ize)?\s*\(", re.IGNORECASE)
+_INDEX_PATTERN = re.compile(r'\bindex\s*=\s*("[^"]*"|[^\s\[\]()|]+)')
+
+_recording = threading.local()
+
+
+def is_cacheable(query: str) -> bool:
+    """Whether running ``query`` twice on unchanged inputs gives the same result and no side effects."""
+    return _UNCACHEABLE.search(query) is None
+
+
+def index_patterns(query: str) -> List[str]:
+    """Return the ``index=`` patterns of every index call in ``query``, subsearches included."""
+    return list(dict.fromkeys(_INDEX_PATTERN.findall(query)))
+
+
+def _stat(path: str) -> Tuple[int, int]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return -1, -1
+    return st.st_size, st.st_mtime_ns
+
+
+def fingerprint(paths: Iterable) -> Fingerprint:
+    """Return the :data:`Fingerprint` of ``paths`` as they are on disk now."""
+    return tuple((path, *_stat(path)) for path in sorted({os.path.abspath(str(p)) for p in paths}))
+
+
+@contextmanager
+def recording() -> Iterator[Dict[str, Tuple[int, int]]]:
+    """Collect the files passed to :func:`record_input` by this thread.
+
+    Yields a dict mapping each path to its ``(size, mtime_ns)`` when it was first recorded.
+    """
+    previous = getattr(_recording, "files", None)
+    files: Dict[str, Tuple[int, int]] = {}
+    _recording.files = files
+    try:
+        yield files
+    finally:
+        _recording.files = previous
+
+
+def record_input(path) -> None:
+    """Note that the running query reads ``path``; called before the file is opened."""
+    files = getattr(_recording, "files", None)
+    if files is not None:
+        resolved = os.path.abspath(str(path))
+        files.setdefault(resolved, _stat(resolved))
+
+
+def encode(df: pd.DataFrame) -> Optional[bytes]:
+    """Return ``df`` as a compressed Arrow IPC stream, or ``None`` if Arrow cannot round-trip it."""
+    import pyarrow as pa
+
+    if not all(isinstance(column, str) for column in df.columns) or df.columns.has_duplicates:
+        return None
+    try:
+        table = pa.Table.from_pandas(df)
+    except (pa.ArrowException, ValueError, TypeError) as e:
+        logger.debug(f"[DEBUG] Result not cached, Arrow cannot convert it: {e}")
+        return None
+    if any(pa.types.is_nested(field.type) for field in table.schema):
+        return None
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression="zstd")
+    with pa.ipc.new_stream(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def decode(payload: bytes) -> pd.DataFrame:
+    """Return the DataFrame stored by :func:`encode`."""
+    import pyarrow as pa
+
+    return pa.ipc.open_stream(payload).read_all().to_pandas()
+
+
+class CachedResult(NamedTuple):
+    payload: bytes  # see encode()
+    index_inputs: Fingerprint  # files the index calls resolved to
+    read_inputs: Fingerprint  # lookup/loadjob files read while running
+
+
+class ResultCache:
+    """Thread-safe LRU of query results bounded by their encoded size."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, CachedResult] = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def lookup(self, query: str, index_inputs: Fingerprint) -> Optional[pd.DataFrame]:
+        """Return the cached result of ``query`` if none of its inputs changed, else ``None``.
+
+        ``index_inputs`` is the :func:`fingerprint` of the files the query's index calls resolve to now.
+        """
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and (entry.index_inputs != index_inputs
+                                  or fingerprint(path for path, _, _ in entry.read_inputs) != entry.read_inputs):
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self._drop(key)
+                    self.invalidations += 1
+            entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.hits += 1
+        return decode(entry.payload)
+
+    def store(self, query: str, df: pd.DataFrame, index_inputs: Fingerprint,
+              read_inputs: Mapping[str, Tuple[int, int]]) -> bool:
+        """Cache ``df`` as the result of ``query``; returns whether it was stored.
+
+        ``read_inputs`` is the dict collected by :func:`recording` while the query ran.
+        """
+        payload = encode(df)
+        if payload is None or len(payload) > self.max_bytes:
+            return False
+        read = tuple((path, *stat) for path, stat in sorted(read_inputs.items()))
+        key = normalize_query(query)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = CachedResult(payload, tuple(index_inputs), read)
+            self.bytes += len(payload)
+            while self.bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+        return True
+
+    def _drop(self, key: str) -> None:
+        self.bytes -= len(self._entries.pop(key).payload)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.invalidations = 0
+
+    def info(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+_cache = ResultCache()
+
+
+def lookup(query: str, index_inputs: Fingerprint) -> Optional[pd.DataFrame]:
+    """Return the cached result of ``query`` from the shared cache, or ``None``."""
+    return _cache.lookup(query, index_inputs)
+
+
+def store(query: str, df: pd.DataFrame, index_inputs: Fingerprint,
+          read_inputs: Mapping[str, Tuple[int, int]]) -> bool:
+    """Cache ``df`` as the result of ``query`` in the shared cache."""
+    return _cache.store(query, df, index_inputs, read_inputs)
+
+
+def cache_info() -> dict:
+    """Return entry, size and hit/miss counts for the shared cache."""
+    return _cache.info()
+
+
+def clear_cache() -> None:
+    """Empty the shared cache and reset its counters."""
+    _cache.clear()
+
+
+def cache_requested(value) -> bool:
+    """Interpret a request's ``cache`` field; anything but an explicit false keeps caching on."""
+    return str(value).strip().lower() not in ("false", "0", "no", "off")
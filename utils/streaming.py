@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""Streaming execution of pipelines over large index calls.
+
+Normally an index call is materialised into one DataFrame before the first
+``| command`` runs.  For index calls that plan to read more than
+:data:`STREAMING_MIN_ROWS` rows the listener instead asks the C++ scanner
+for ``scan_index_batches``, an iterator yielding one filtered DataFrame per
+row group, and runs the pipeline over those batches:
+
+* the leading row-wise commands (:data:`STREAMABLE`) are applied to every
+  batch as it arrives;
+* the first command after them consumes the stream with bounded state:
+  ``stats`` merges per-batch partial aggregates (:class:`StatsAccumulator`),
+  ``head`` stops reading once enough rows arrived and a plain ``dedup``
+  drops rows whose key was already seen (:class:`DedupFilter`);
+* any other command (``sort``, ``eventstats``, ...) and the commands after
+  the consumer run as usual on the concatenated output of the stream.
+
+Every batch is first given the columns of the files it does not come from
+(:func:`conform`), so commands see the same columns as on the materialised
+result.  Memory is then bounded by one wave of row groups plus the consumer's state
+(one entry per group, distinct key or kept row) instead of by the raw index
+call result.  ``stats`` with ``median``, ``mode`` or ``*`` fields cannot be
+merged from partials and are computed over the concatenated stream.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from typing import Iterable, List, Optional
+
+import pandas as pd
+
+from utils import categoricals
+
+logger = logging.getLogger(__name__)
+
+# Index calls planned to read fewer rows are materialised as before
+STREAMING_MIN_ROWS = 2_000_000
+
+# Commands that transform each row independently and can run batch by batch
+STREAMABLE = {
+    "search",
+    "where",
+    "eval",
+    "rex",
+    "regex",
+    "fields",
+    "table",
+    "rename",
+    "spath",
+    "fillnull",
+    "base64",
+    "bin",
+    "coalesce",
+    "mvexpand",
+    "mvreverse",
+    "mvcombine",
+    "mvdedup",
+    "mvappend",
+    "mvfilter",
+    "mvcount",
+    "mvdc",
+    "mvfind",
+    "mvzip",
+    "mvjoin",
+    "mvindex",
+}
+
+# Commands that consume the stream with bounded state
+CONSUMERS = {"stats", "head", "limit", "dedup"}
+
+_MERGEABLE = {
+    "count", "sum", "avg", "mean", "min", "max", "range",
+    "dc", "distinctcount", "values", "earliest", "first", "latest", "last",
+}
+
+
+def _command(segment: str) -> str:
+    word = segment.split(None, 1)[0] if segment.strip() else ""
+    return word.split("(")[0].lower()
+
+
+def streamable_prefix(segment_strs: Iterable[str]) -> int:
+    """Return how many leading segments can run batch by batch."""
+    count = 0
+    for segment in segment_strs:
+        if _command(segment) not in STREAMABLE:
+            break
+        count += 1
+    return count
+
+
+def worth_streaming(segment_strs: List[str]) -> bool:
+    """Return ``True`` when streaming reduces what has to be held in memory.
+
+    That is the case when a row-wise command or a bounded consumer follows
+    the index call; a pipeline starting with ``sort`` gains nothing.
+    """
+    if not segment_strs:
+        return False
+    prefix = streamable_prefix(segment_strs)
+    return prefix > 0 or _command(segment_strs[0]) in CONSUMERS
+
+
+def planned_rows(planned: Iterable[dict]) -> int:
+    """Return the number of rows the files of ``plan_index_files`` hold in the row groups read."""
+    from utils.parquet_footer_cache import get_footer
+
+    total = 0
+    for item in planned:
+        metadata = get_footer(item["path"]).metadata
+        if item["row_groups"] is None:
+            total += metadata.num_rows
+        else:
+            total += sum(metadata.row_group(rg).num_rows for rg in item["row_groups"])
+    return total
+
+
+def planned_schema(planned: Iterable[dict], columns: Optional[List[str]] = None):
+    """Return the schema of the materialised result of the files of ``plan_index_files``.
+
+    That is the union of the files' schemas (restricted to ``columns`` when
+    the scan is projected), promoted the way the scanner's
+    ``concat_tables(promote_options="permissive")`` promotes them, or ``None``
+    when the files' schemas cannot be unified.
+    """
+    import pyarrow as pa
+
+    from utils.parquet_footer_cache import get_footer
+
+    schemas = []
+    for item in planned:
+        schema = get_footer(item["path"]).schema
+        fields = [f for f in schema if not f.name.startswith("__index_level_")]
+        if columns is not None:
+            fields = [f for f in fields if f.name in columns]
+        schemas.append(pa.schema(fields))
+    if not schemas:
+        return pa.schema([])
+    try:
+        return pa.unify_schemas(schemas, promote_options="permissive")
+    except (pa.ArrowException, ValueError, TypeError) as e:
+        logger.debug(f"[DEBUG] Planned files have incompatible schemas: {e}")
+        return None
+
+
+def conform(df: pd.DataFrame, schema) -> pd.DataFrame:
+    """Add the columns of ``schema`` that ``df`` lacks, as nulls.
+
+    Batches keep the schema of the file they were read from; conformed, a
+    batch from a file without some column sees that column as missing values,
+    like the same rows in the materialised result.
+    """
+    missing = [field for field in schema if field.name not in df.columns]
+    if not missing:
+        return df
+    import pyarrow as pa
+
+    nulls = pa.table({field.name: pa.nulls(len(df), field.type) for field in missing}).to_pandas()
+    nulls.index = df.index
+    return pd.concat([df, nulls], axis=1)
+
+
+class StatsAccumulator:
+    """Compute a ``stats`` result from a stream of DataFrames.
+
+    Each batch is reduced to partial aggregates per group, which are merged
+    into the running state, so only one entry per group (or one per distinct
+    value for ``dc`` and ``values``) is kept.  :meth:`result` matches what
+    ``StatsHandler.run_stats`` returns for the concatenated batches.
+    """
+
+    done = False
+
+    def __init__(self, specs: List[dict], group_fields: List[str]):
+        self.specs = specs
+        self.group_fields = list(group_fields)
+        self._state = {}
+        self._distinct = {}
+        self._rows = 0
+        self._empty = None
+
+    @classmethod
+    def supports(cls, specs: List[dict]) -> bool:
+        """Return ``True`` when every spec can be merged from partial aggregates."""
+        return bool(specs) and all(
+            spec["func"] in _MERGEABLE and spec["field"] != "*" and spec["alias"] != "*" for spec in specs
+        )
+
+    def _keys(self, df: pd.DataFrame):
+        if self.group_fields:
+            return [df[field] for field in self.group_fields]
+        return pd.Series(0, index=df.index, name="_group")
+
+    def _key_index(self, df: pd.DataFrame) -> pd.Index:
+        if not self.group_fields:
+            return pd.Index([0] * len(df), name="_group")
+        if len(self.group_fields) == 1:
+            return pd.Index(df[self.group_fields[0]], name=self.group_fields[0])
+        return pd.MultiIndex.from_frame(df[self.group_fields])
+
+    def _merge(self, name: str, partial: pd.Series, how: str) -> None:
+        state = self._state.get(name)
+        if state is None:
+            self._state[name] = partial
+        elif how == "first":
+            self._state[name] = pd.concat([state, partial[~partial.index.isin(state.index)]])
+        elif how == "last":
+            self._state[name] = pd.concat([state[~state.index.isin(partial.index)], partial])
+        else:
+            combined = pd.concat([state, partial])
+            levels = list(range(combined.index.nlevels))
+            self._state[name] = getattr(combined.groupby(level=levels, observed=True), how)()
+
+    def _merge_distinct(self, field: str, df: pd.DataFrame) -> None:
+        columns = self.group_fields + [field] if field not in self.group_fields else self.group_fields
+        pairs = df[columns].dropna(subset=[field]).drop_duplicates()
+        state = self._distinct.get(field)
+        self._distinct[field] = pairs if state is None else pd.concat([state, pairs]).drop_duplicates()
+
+    def update(self, df: pd.DataFrame) -> None:
+        """Fold one batch into the running aggregates."""
+        missing = [c for c in self.group_fields if c not in df.columns]
+        if missing:
+            logging.error(f"[x] Missing group fields: {missing}")
+            raise KeyError(f"Group fields not in DataFrame: {missing}")
+        if self._empty is None:
+            self._empty = df.iloc[:0]
+        if self.group_fields:
+            df = df.dropna(subset=self.group_fields)
+        if df.empty:
+            return
+        self._rows += len(df)
+        keys = self._keys(df)
+        # Specs sharing a partial (sum and avg, min and range, ...) fold it in once
+        partials = {"size": ("size", None, "sum")}
+        for spec in self.specs:
+            func, field = spec["func"], spec["field"]
+            if field is None:
+                continue
+            if func in ("count", "avg", "mean"):
+                partials[f"count:{field}"] = ("count", field, "sum")
+            if func in ("sum", "avg", "mean"):
+                partials[f"sum:{field}"] = ("sum", field, "sum")
+            if func in ("min", "range"):
+                partials[f"min:{field}"] = ("min", field, "min")
+            if func in ("max", "range"):
+                partials[f"max:{field}"] = ("max", field, "max")
+            if func in ("earliest", "first"):
+                partials[f"first:{field}"] = ("first", field, "first")
+            if func in ("latest", "last"):
+                partials[f"last:{field}"] = ("last", field, "last")
+            if func in ("dc", "distinctcount", "values"):
+                partials[f"distinct:{field}"] = ("distinct", field, None)
+        for name, (kind, field, how) in partials.items():
+            if kind == "size":
+                self._merge(name, df.groupby(keys, observed=True).size(), how)
+            elif kind == "distinct":
+                self._merge_distinct(field, df)
+            elif kind in ("first", "last"):
+                rows = df[~self._key_index(df).duplicated(keep=kind)]
+                self._merge(name, pd.Series(rows[field].to_numpy(), index=self._key_index(rows)), how)
+            else:
+                # Unordered categoricals have no min/max, their values do
+                values = categoricals.plain(df[field]) if kind in ("min", "max") else df[field]
+                self._merge(name, getattr(values.groupby(keys, observed=True), kind)(), how)
+
+    def _distinct_values(self, field: str, index: pd.Index) -> pd.Series:
+        pairs = self._distinct.get(field)
+        if pairs is None or pairs.empty:
+            return pd.Series([[] for _ in range(len(index))], index=index)
+        if self.group_fields:
+            grouped = pairs.groupby(self.group_fields, observed=True)[field].agg(list)
+        else:
+            grouped = pd.Series([pairs[field].tolist()], index=pd.Index([0], name="_group"))
+        return grouped.reindex(index).apply(lambda v: v if isinstance(v, list) else [])
+
+    def _aggregate(self, spec: dict, index: pd.Index) -> pd.Series:
+        func, field = spec["func"], spec["field"]
+        state = self._state
+        if func == "count":
+            return state["size"] if field is None else state[f"count:{field}"]
+        if func == "sum":
+            return state[f"sum:{field}"]
+        if func in ("avg", "mean"):
+            return state[f"sum:{field}"] / state[f"count:{field}"].where(state[f"count:{field}"] > 0)
+        if func == "min":
+            return state[f"min:{field}"]
+        if func == "max":
+            return state[f"max:{field}"]
+        if func == "range":
+            return state[f"max:{field}"] - state[f"min:{field}"]
+        if func in ("dc", "distinctcount"):
+            return self._distinct_values(field, index).apply(len)
+        if func == "values":
+            return self._distinct_values(field, index)
+        how = "first" if func in ("earliest", "first") else "last"
+        return state[f"{how}:{field}"]
+
+    def result(self) -> pd.DataFrame:
+        """Return the ``stats`` result over every batch seen so far."""
+        from handlers.StatsHandler import StatsHandler
+
+        if not self._rows:
+            # Nothing to merge; the handler's own edge cases apply to the empty input
+            empty = self._empty if self._empty is not None else pd.DataFrame()
+            return StatsHandler()._do_stats(empty, self.specs, self.group_fields)
+
+        index = self._state["size"].sort_index().index
+        data = {spec["alias"]: self._aggregate(spec, index).reindex(index) for spec in self.specs}
+        result = pd.DataFrame(data, index=index)
+        if self.group_fields:
+            result = result.reset_index()
+        else:
+            result = result.reset_index(drop=True)
+        logging.info(f"[i] stats result shape: {result.shape}")
+        return result
+
+
+class Collector:
+    """Concatenate the batches of a stream; the base of the row-keeping consumers."""
+
+    done = False
+
+    def __init__(self):
+        self._frames = []
+        self._empty = None
+
+    def keep(self, df: pd.DataFrame) -> None:
+        if self._empty is None:
+            self._empty = df.iloc[:0]
+        if len(df):
+            self._frames.append(df)
+
+    def update(self, df: pd.DataFrame) -> None:
+        """Keep every row of ``df``."""
+        self.keep(df)
+
+    def result(self) -> Optional[pd.DataFrame]:
+        """Return the kept rows as one DataFrame."""
+        if self._frames:
+            return categoricals.concat(self._frames, ignore_index=True)
+        return self._empty.reset_index(drop=True) if self._empty is not None else pd.DataFrame()
+
+
+class HeadLimit(Collector):
+    """Streaming ``head N``: keep the first ``count`` rows and report when done."""
+
+    def __init__(self, count: int):
+        super().__init__()
+        self.remaining = count
+
+    def update(self, df: pd.DataFrame) -> None:
+        self.keep(df.head(self.remaining))
+        self.remaining -= min(self.remaining, len(df))
+        self.done = self.remaining == 0
+
+
+class DedupFilter(Collector):
+    """Streaming ``dedup f1, f2``: keep the first row of every key across batches.
+
+    Like ``GeneralHandler.execute_dedup`` the result is ``None`` when a field
+    is missing.
+    """
+
+    def __init__(self, fields: List[str]):
+        super().__init__()
+        self.fields = list(fields)
+        self._seen = set()
+        self._failed = False
+
+    def update(self, df: pd.DataFrame) -> None:
+        missing = [field for field in self.fields if field not in df.columns]
+        if missing:
+            logging.error(f"[x] Missing fields in DataFrame: {missing}")
+            self._failed = self.done = True
+            return
+        df = df.drop_duplicates(subset=self.fields, keep="first")
+        keys = df[self.fields].astype(object).where(df[self.fields].notna(), None)
+        keys = list(keys.itertuples(index=False, name=None))
+        unseen = [key not in self._seen for key in keys]
+        self._seen.update(keys)
+        self.keep(df[unseen])
+
+    def result(self) -> Optional[pd.DataFrame]:
+        return None if self._failed else super().result()
+
+
+def dedup_fields(seg_tokens: List[str]) -> Optional[List[str]]:
+    """Return the fields of a plain ``dedup`` that keeps one row per key.
+
+    ``None`` for a count or ``consecutive`` option, which need the whole input.
+    """
+    tokens = seg_tokens[1:]
+    if not tokens or any(re.fullmatch(r"\d+", t) or t.startswith("consecutive") for t in tokens):
+        return None
+    return [part for token in tokens for part in token.split(",") if part]
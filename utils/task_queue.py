@@ -2,9 +2,53 @@
 import threading
 from queue import Queue, Full
 from concurrent.futures import Future
+from typing import Callable, Dict, Hashable
 import logging
 
 
+class SingleFlight:
+    """Share one execution among concurrent calls with the same key.
+
+    A call made while another with the same key is queued or running gets
+    that call's future instead of starting its own, so identical work is done
+    once and every caller receives the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Future] = {}
+        self.coalesced = 0
+
+    def attach(self, key: Hashable, start: Callable[[], Future]) -> Future:
+        """Return the in-flight future for ``key``, or the one ``start()`` returns if there is none."""
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                logging.info("[i] Attaching to in-flight task with the same key.")
+                return future
+            future = start()
+            self._in_flight[key] = future
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    def run(self, key: Hashable, func, *args, **kwargs):
+        """Call ``func`` in this thread unless a call with ``key`` is in flight, and return the result."""
+        future = Future()
+        attached = self.attach(key, lambda: future)
+        if attached is future:
+            try:
+                future.set_result(func(*args, **kwargs))
+            except Exception as exc:
+                future.set_exception(exc)
+        return attached.result()
+
+    def _forget(self, key: Hashable, future: Future) -> None:
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+
 class TaskQueue:
     """Simple threaded task queue with fixed worker count."""
 
@@ -12,6 +56,7 @@ class TaskQueue:
         self.size = size
         self.workers = workers
         self.queue = Queue(maxsize=size)
+        self.single_flight = SingleFlight()
         self._start_workers()
 
     def _start_workers(self):
@@ -40,3 +85,11 @@ class TaskQueue:
             logging.warning("[!] Task queue full; rejecting new task")
             raise
         return future
+
+    def submit_shared(self, key: Hashable, func, *args, **kwargs) -> Future:
+        """Submit a callable unless a task with the same ``key`` is queued or running.
+
+        Duplicates get the future of the task already in flight and take no
+        queue slot.  Raises queue.Full if a new task does not fit.
+        """
+        return self.single_flight.attach(key, lambda: self.submit(func, *args, **kwargs))
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""Free-text search terms and the optional inverted token index behind them.
+
+A bare quoted string in an index call or ``search`` directive, such as
+``index="app_logs/*" "connection reset"``, is a free-text term.  It matches a
+row when one of the row's string columns contains the term's tokens in order.
+Tokens are runs of ASCII letters, digits and underscores, compared case
+insensitively, so ``"10.1.2.3"`` is the phrase ``10 1 2 3``.
+
+Indexes can list ``token_columns`` in their settings (see
+:mod:`utils.index_layout`).  For their parquet files a token → (file, column,
+row group) posting list is kept in the index manifest database.  It is
+maintained when writers record a file and by :func:`backfill`.  The C++ index
+scanner asks :func:`lookup_row_groups` for the row groups that can contain
+every token of a term and reads only those.  A file is only pruned when the
+postings cover all of its string columns and were built from its current
+size and mtime.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"[a-z0-9_]+")
+_BREAK = "[^a-z0-9_]"
+
+
+@contextmanager
+def _connect(db_path) -> Iterator[sqlite3.Connection]:
+    """Yield a connection to the token index tables that commits on success and is always closed."""
+    conn = sqlite3.connect(str(db_path), timeout=30)
+    try:
+        with conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS token_index_files (
+                       path TEXT PRIMARY KEY,
+                       size INTEGER,
+                       mtime REAL,
+                       columns TEXT
+                   )"""
+            )
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS token_postings (
+                       token TEXT,
+                       path TEXT,
+                       column_name TEXT,
+                       row_group INTEGER,
+                       PRIMARY KEY (token, path, column_name, row_group)
+                   ) WITHOUT ROWID"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS token_postings_path ON token_postings (path)")
+            yield conn
+    finally:
+        conn.close()
+
+
+def tokenize(text) -> List[str]:
+    """Return the lower-cased tokens of ``text`` in order."""
+    return TOKEN_RE.findall(str(text).lower())
+
+
+def term_pattern(term: str) -> str:
+    """Return a case-insensitive regex (RE2 and ``re`` compatible) matching ``term``.
+
+    Terms without tokens fall back to a literal substring match.
+    """
+    tokens = tokenize(term)
+    if not tokens:
+        return re.escape(str(term))
+    return f"(?:^|{_BREAK})" + f"{_BREAK}+".join(tokens) + f"(?:{_BREAK}|$)"
+
+
+def _is_text(data_type) -> bool:
+    import pyarrow.types as pa_types
+
+    if pa_types.is_dictionary(data_type):
+        data_type = data_type.value_type
+    return pa_types.is_string(data_type) or pa_types.is_large_string(data_type)
+
+
+def text_columns(schema) -> List[str]:
+    """Return the names of the string columns a term is matched against."""
+    return [field.name for field in schema if _is_text(field.type)]
+
+
+def term_mask(table, term: str):
+    """Return a boolean Arrow array marking the rows of ``table`` that contain ``term``."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    pattern = term_pattern(term)
+    mask = None
+    for name in text_columns(table.schema):
+        column = table[name]
+        if pa.types.is_dictionary(column.type):
+            column = column.cast(column.type.value_type)
+        matched = pc.fill_null(pc.match_substring_regex(column, pattern, ignore_case=True), False)
+        mask = matched if mask is None else pc.or_(mask, matched)
+    if mask is None:
+        return pa.array([False] * table.num_rows, type=pa.bool_())
+    return mask
+
+
+def series_term_mask(df, term: str):
+    """pandas counterpart of :func:`term_mask`, used by the ``search`` directive."""
+    import pandas as pd
+
+    pattern = term_pattern(term)
+    mask = pd.Series(False, index=df.index)
+    for name in df.columns:
+        series = df[name]
+        if pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series) or isinstance(
+            series.dtype, pd.CategoricalDtype
+        ):
+            matched = series.astype("string").str.contains(pattern, case=False, regex=True, na=False)
+            mask |= matched.astype(bool)
+    return mask
+
+
+def _row_group_tokens(values) -> List[str]:
+    import pyarrow.compute as pc
+
+    if hasattr(values.type, "value_type"):
+        values = values.cast(values.type.value_type)
+    pieces = pc.split_pattern_regex(pc.utf8_lower(pc.unique(values)), pattern=f"{_BREAK}+")
+    tokens = pc.unique(pc.list_flatten(pieces)).to_pylist()
+    return [t for t in tokens if t]
+
+
+def build_postings(path, columns: Iterable[str]) -> tuple:
+    """Return ``(indexed_columns, {(token, column, row_group), ...})`` for ``path``."""
+    import pyarrow.parquet as pq
+
+    from utils.parquet_footer_cache import get_footer
+
+    footer = get_footer(path)
+    wanted = [c for c in columns if c in footer.schema.names and _is_text(footer.schema.field(c).type)]
+    postings = set()
+    if wanted:
+        parquet_file = pq.ParquetFile(footer.path, metadata=footer.metadata)
+        for rg in range(footer.num_row_groups):
+            table = parquet_file.read_row_group(rg, columns=wanted)
+            for column in wanted:
+                postings.update((token, column, rg) for token in _row_group_tokens(table[column]))
+    return wanted, postings
+
+
+def _token_columns(path, settings_db=None, indexes_dir=None) -> List[str]:
+    from utils import index_layout
+
+    name = index_layout.index_name_for_path(path, indexes_dir or index_layout.INDEXES_DIR)
+    settings = index_layout.get_index_settings(name, db_path=settings_db or index_layout.INDEX_SETTINGS_DB)
+    return list(settings["token_columns"])
+
+
+def update_file(path, db_path, columns: Optional[Iterable[str]] = None, settings_db=None, indexes_dir=None) -> int:
+    """Build or refresh the postings of ``path`` and return how many were written.
+
+    ``columns`` defaults to the ``token_columns`` setting of the file's index.
+    Postings that are still current are kept as they are.
+    """
+    resolved = str(Path(path).resolve())
+    if columns is None:
+        columns = _token_columns(resolved, settings_db, indexes_dir)
+    columns = sorted(set(columns))
+    st = os.stat(resolved)
+    with _connect(db_path) as conn:
+        row = conn.execute(
+            "SELECT size, mtime, columns FROM token_index_files WHERE path=?", (resolved,)
+        ).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime and json.loads(row[2]) == columns:
+            return 0
+        conn.execute("DELETE FROM token_postings WHERE path=?", (resolved,))
+        conn.execute("DELETE FROM token_index_files WHERE path=?", (resolved,))
+        if not columns:
+            return 0
+        _, postings = build_postings(resolved, columns)
+        conn.executemany(
+            "INSERT INTO token_postings (token, path, column_name, row_group) VALUES (?, ?, ?, ?)",
+            [(token, resolved, column, rg) for token, column, rg in postings],
+        )
+        conn.execute(
+            "INSERT INTO token_index_files (path, size, mtime, columns) VALUES (?, ?, ?, ?)",
+            (resolved, st.st_size, st.st_mtime, json.dumps(columns)),
+        )
+    logger.info(f"[i] Indexed {len(postings)} token posting(s) for {resolved}")
+    return len(postings)
+
+
+def forget_file(path, db_path) -> None:
+    """Remove the postings of a deleted or replaced file."""
+    resolved = str(Path(path).resolve())
+    with _connect(db_path) as conn:
+        conn.execute("DELETE FROM token_postings WHERE path=?", (resolved,))
+        conn.execute("DELETE FROM token_index_files WHERE path=?", (resolved,))
+
+
+def _term_row_groups(conn, path: str, columns: List[str], term: str, all_groups: set) -> set:
+    tokens = tokenize(term)
+    if not tokens:
+        return all_groups
+    per_column = {column: None for column in columns}
+    for token in dict.fromkeys(tokens):
+        found: Dict[str, set] = {}
+        for column, rg in conn.execute(
+            "SELECT column_name, row_group FROM token_postings WHERE token=? AND path=?", (token, path)
+        ):
+            found.setdefault(column, set()).add(rg)
+        for column in per_column:
+            groups = found.get(column, set())
+            per_column[column] = groups if per_column[column] is None else per_column[column] & groups
+    return set().union(*per_column.values()) if per_column else set()
+
+
+def _candidates(conn, path: str, columns: List[str], predicate, all_groups: set) -> set:
+    if predicate is None:
+        return all_groups
+    kind = predicate[0]
+    if kind == "and":
+        return _candidates(conn, path, columns, predicate[1], all_groups) & _candidates(
+            conn, path, columns, predicate[2], all_groups
+        )
+    if kind == "or":
+        return _candidates(conn, path, columns, predicate[1], all_groups) | _candidates(
+            conn, path, columns, predicate[2], all_groups
+        )
+    if kind == "term":
+        return _term_row_groups(conn, path, columns, predicate[1], all_groups)
+    return all_groups
+
+
+def lookup_row_groups(paths: Iterable[str], predicate, db_path) -> Dict[str, List[int]]:
+    """Return the row groups of each path that may satisfy the ``("term", text)`` leaves of ``predicate``.
+
+    ``predicate`` has the shape used by :func:`utils.bloom_filters.lookup_row_groups`;
+    leaves other than terms never prune.  Paths without usable postings are
+    left out, so callers read them in full.
+    """
+    from utils.parquet_footer_cache import get_footer
+
+    result: Dict[str, List[int]] = {}
+    if predicate is None:
+        return result
+    with _connect(db_path) as conn:
+        for original in paths:
+            resolved = str(Path(original).resolve())
+            try:
+                st = os.stat(resolved)
+            except OSError:
+                continue
+            row = conn.execute(
+                "SELECT size, mtime, columns FROM token_index_files WHERE path=?", (resolved,)
+            ).fetchone()
+            if not row or row[0] != st.st_size or row[1] != st.st_mtime:
+                continue
+            try:
+                footer = get_footer(resolved)
+            except Exception:
+                continue
+            indexed = json.loads(row[2])
+            if not set(text_columns(footer.schema)) <= set(indexed):
+                # A term could match a string column without postings
+                continue
+            all_groups = set(range(footer.num_row_groups))
+            result[original] = sorted(_candidates(conn, resolved, text_columns(footer.schema), predicate, all_groups))
+    return result
+
+
+def backfill(indexes_dir=None, db_path=None, settings_db=None) -> int:
+    """Build missing or stale postings for every index with ``token_columns``.
+
+    Returns the number of files whose postings were (re)built.
+    """
+    from utils import index_layout
+    from utils.index_manifest import MANIFEST_DB
+
+    indexes_dir = Path(indexes_dir or index_layout.INDEXES_DIR)
+    db_path = db_path or MANIFEST_DB
+    settings_db = settings_db or index_layout.INDEX_SETTINGS_DB
+    updated = 0
+    for name, settings in index_layout.list_index_settings(db_path=settings_db).items():
+        if not settings["token_columns"]:
+            continue
+        for file_path in (indexes_dir / name).rglob("*.parquet"):
+            try:
+                if update_file(file_path, db_path, columns=settings["token_columns"]):
+                    updated += 1
+            except Exception as e:
+                logger.warning(f"[!] Could not build token index for {file_path}: {e}")
+    if updated:
+        logger.info(f"[i] Backfilled token index for {updated} file(s).")
+    return updated